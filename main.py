@@ -12,7 +12,7 @@ from PyQt6.QtWidgets import QApplication, QMessageBox
 # src/ ディレクトリをパスに追加
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 
-from core import GameMonitor, State
+from core import GameMonitor
 import setup_ui
 import keyboard
 import update_manager
@@ -141,8 +141,7 @@ if __name__ == "__main__":
     monitor.start()
     
     def on_settings_close():
-        monitor.load_config()
-        monitor.reset_state()
+        monitor.reload_config()
         if 'icon' in globals():
             update_icon_menu(icon, monitor)
             
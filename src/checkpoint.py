@@ -0,0 +1,62 @@
+import os
+import json
+
+
+def write_json_atomic(path, data, indent=None):
+    """一時ファイルに書いて fsync してから置き換える（途中で落ちても壊れたファイルが残らない）"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    """読めなければ None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read {path}: {e}")
+        return None
+
+
+class Checkpoint:
+    """日課の進行状況を小さなファイルに残し、再起動後に続きから再開できるようにする
+
+    内容が前回と同じなら（保存時刻以外）書かないので、1回の遷移で書くのは多くても1回。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.writes = 0
+        self._last = None
+
+    def load(self):
+        state = read_json(self.path)
+        if not isinstance(state, dict) or state.get("version") != self.VERSION:
+            return None
+        self._last = state
+        return state
+
+    def save(self, state):
+        state = dict(state, version=self.VERSION)
+        if self._last is not None and _without_time(state) == _without_time(self._last):
+            return False
+        try:
+            write_json_atomic(self.path, state)
+        except OSError as e:
+            print(f"Failed to write checkpoint: {e}")
+            return False
+        self._last = state
+        self.writes += 1
+        return True
+
+
+def _without_time(state):
+    return {k: v for k, v in state.items() if k != "saved_at"}
@@ -1,41 +1,274 @@
 import json
 import time
-import psutil
 import subprocess
 import threading
+import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import os
 import ctypes
+import math
+from ctypes import wintypes
 from enum import Enum
+from collections import deque, namedtuple
 
-from datetime import datetime
+from datetime import date, timedelta
 
-class State(Enum):
-    STANDBY = 0
-    STAR_RAIL = 1
-    GENSHIN = 2
-    WUTHERING_WAVES = 3
+from process_provider import ProcessTable, create_provider
+from scheduler import Scheduler, SystemClock
+from process_matcher import ProcessMatcher, game_patterns, split_patterns
+from readiness import ReadinessGate, SIGNALS, create_sampler, learned_interval, memory_available_mb
+from cpu_sampler import CpuSampler
+from prewarm import Prewarmer, MB
+from log_watch import LogFollower, LogWatchRule
+from priority import PriorityManager, RestoreJournal
+from suspend import SuspendManager
+from session_stats import SessionSeries
+from history import HistoryStore, routine_day
+from checkpoint import Checkpoint, read_json, write_json_atomic
+
+class Phase(Enum):
+    STANDBY = "standby"        # 最初のゲームの起動待ち
+    INTERVAL = "interval"      # 次のゲームを起動するまでのインターバル
+    SMART_WAIT = "smart_wait"  # 負荷が下がるのを待っている
+    LAUNCHING = "launching"    # 起動済み、プロセスが現れるのを待っている
+    PLAYING = "playing"        # プレイ中（終了を監視）
+
+class Event(Enum):
+    DETECTED = "detected"                  # 現在のゲームのプロセスを確認した
+    EXITED = "exited"                      # 現在のゲームが終了した
+    INTERVAL_ELAPSED = "interval_elapsed"
+    READY = "ready"                        # スマート待機の条件を満たした
+    START = "start"                        # 指定したゲームから開始
+    SKIP = "skip"
+    RESET = "reset"
+    GAVE_UP = "gave_up"                    # 再試行しても起動を確認できなかった
+
+# 遷移先が ADVANCE のときは次のエントリへ進む（最後なら完了して STANDBY に戻る）
+ADVANCE = "advance"
+
+# (現在のフェーズ, イベント) -> 遷移先。表にない組み合わせのイベントは無視する
+TRANSITIONS = {
+    (Phase.STANDBY, Event.DETECTED): Phase.PLAYING,
+    (Phase.INTERVAL, Event.INTERVAL_ELAPSED): Phase.SMART_WAIT,
+    (Phase.SMART_WAIT, Event.READY): Phase.LAUNCHING,
+    (Phase.SMART_WAIT, Event.DETECTED): Phase.PLAYING,
+    (Phase.LAUNCHING, Event.DETECTED): Phase.PLAYING,
+    (Phase.PLAYING, Event.EXITED): ADVANCE,
+    (Phase.LAUNCHING, Event.GAVE_UP): ADVANCE,
+}
+for _phase in Phase:
+    TRANSITIONS[(_phase, Event.START)] = Phase.LAUNCHING
+    TRANSITIONS[(_phase, Event.RESET)] = Phase.STANDBY
+    if _phase is not Phase.STANDBY:
+        TRANSITIONS[(_phase, Event.SKIP)] = ADVANCE
+
+# main.py などが変化の検知に使う (フェーズ, 何番目のゲームか) の組
+RoutineState = namedtuple("RoutineState", ["phase", "index"])
+
+# プレイ中を抜けたときのイベント -> セッションの結果 (history に記録する)
+SESSION_RESULTS = {
+    Event.EXITED: "exited",
+    Event.SKIP: "skipped",
+    Event.RESET: "cancelled",
+    Event.START: "restarted",
+}
+
+# 起動待ちを抜けたときのイベント -> 起動の結果 (launch_history に記録する)
+LAUNCH_OUTCOMES = {
+    Event.DETECTED: "started",
+    Event.GAVE_UP: "timed_out",
+    Event.SKIP: "skipped",
+    Event.RESET: "cancelled",
+    Event.START: "restarted",
+}
+
+def parse_kill_target(target):
+    # "HoYoPlay (hoyoplay.exe)" のような表示名から実際のプロセス名を取り出す
+    if not target or target == "なし":
+        return None
+    if "(" in target and ")" in target:
+        target = target.split("(")[-1].split(")")[0]
+    return target.strip().casefold() or None
+
+def compile_kill_targets(targets):
+    return frozenset(name for name in map(parse_kill_target, targets) if name)
+
+# ShellExecuteExW (起動したプロセスのハンドルを受け取るため)
+SEE_MASK_NOCLOSEPROCESS = 0x00000040
+
+class SHELLEXECUTEINFOW(ctypes.Structure):
+    _fields_ = [
+        ("cbSize", wintypes.DWORD),
+        ("fMask", ctypes.c_ulong),
+        ("hwnd", wintypes.HWND),
+        ("lpVerb", wintypes.LPCWSTR),
+        ("lpFile", wintypes.LPCWSTR),
+        ("lpParameters", wintypes.LPCWSTR),
+        ("lpDirectory", wintypes.LPCWSTR),
+        ("nShow", ctypes.c_int),
+        ("hInstApp", wintypes.HINSTANCE),
+        ("lpIDList", ctypes.c_void_p),
+        ("lpClass", wintypes.LPCWSTR),
+        ("hkeyClass", wintypes.HKEY),
+        ("dwHotKey", wintypes.DWORD),
+        ("hIconOrMonitor", wintypes.HANDLE),
+        ("hProcess", wintypes.HANDLE),
+    ]
+
+# ProcessMatcher のキー
+KILL_TARGETS_KEY = "kill"
+SUSPEND_KEY = "suspend"
+
+def game_key(index):
+    return ("game", index)
+
+def launcher_key(index):
+    return ("launcher", index)
+
+def background_key(index):
+    return ("background", index)
+
+class ProcessSnapshot:
+    """1回のプロセス一覧スキャンから 名前(casefold) -> PID一覧 と マッチャーのキー -> PID一覧 の索引を作る"""
+
+    def __init__(self, processes, matcher=None, scan_time=0.0, parents=None):
+        self.parents = parents or {}
+        self._children = None
+        self.by_name = {}
+        self.names = {}
+        for pid, name in processes:
+            if name:
+                self.by_name.setdefault(name.casefold(), []).append(pid)
+                self.names[pid] = name
+        self.by_key = matcher.index(processes) if matcher else {}
+        self.scan_time = scan_time
+
+    @classmethod
+    def capture(cls, table, matcher=None):
+        start = time.perf_counter()
+        processes = table.refresh()
+        parents = table.parents()
+        return cls(processes, matcher, time.perf_counter() - start, parents)
+
+    def pids_for(self, key):
+        return self.by_key.get(key, [])
+
+    @property
+    def children(self):
+        # ppid -> 子PID一覧 の索引は必要になったときだけ作る
+        if self._children is None:
+            self._children = {}
+            for pid, ppid in self.parents.items():
+                self._children.setdefault(ppid, []).append(pid)
+        return self._children
+
+    def descendants(self, pid, include_self=True):
+        """pid 以下のプロセスツリーを幅優先で返す"""
+        result = [pid] if include_self else []
+        pending = deque([pid])
+        seen = {pid}
+        while pending:
+            for child in self.children.get(pending.popleft(), []):
+                if child not in seen:
+                    seen.add(child)
+                    result.append(child)
+                    pending.append(child)
+        return result
+
+    def pids(self, process_name):
+        return self.by_name.get(process_name.casefold(), [])
+
+    def contains(self, process_name):
+        return process_name.casefold() in self.by_name
+
+class ExitWaiter:
+    """追跡中のプロセスの終了をブロッキングで待ち、終了したら on_exit を呼ぶ"""
+
+    def __init__(self, provider, pid, create_time, on_exit):
+        self.provider = provider
+        self.pid = pid
+        self.create_time = create_time
+        self.on_exit = on_exit
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _run(self):
+        try:
+            # キャンセルを確認できるよう1秒ごとに区切って待つ
+            while not self._cancelled.is_set():
+                if self.provider.wait_for_exit(self.pid, self.create_time, 1.0):
+                    break
+        except Exception as e:
+            print(f"Exit waiter error: {e}")
+            return
+        if not self._cancelled.is_set():
+            self.on_exit(self.pid)
 
 class GameMonitor:
-    def __init__(self, config_path=None):
+    # プロセス確認の間隔 (秒)。ゲーム終了は ExitWaiter が即座に知らせる
+    POLL_INTERVAL = 3
+    SMART_WAIT_STEP = 0.5
+    DAILY_RESET_HOUR = 5
+    # スリープ復帰などで単調時計がずれても日次リセットを取りこぼさないよう、最大でもこの間隔で再確認する
+    DAILY_RESET_RECHECK = 900
+    # 学習した待ち時間: 記録する件数と、負荷が落ち着いたとみなす既定のディスク I/O (MB/s)
+    SETTLE_HISTORY = 20
+    SETTLE_DISK_THRESHOLD = 20
+    SETTLE_MAX = 300
+    # 起動結果を記録する件数
+    LAUNCH_HISTORY = 50
+    # プレイ中のゲームの CPU 時間・I/O を読む間隔 (秒)
+    IDLE_STEP = 10
+    # プレイ中のゲームのメモリ使用量を読む間隔 (秒) と、記録するセッション数
+    RSS_STEP = 5
+    PEAK_RSS_HISTORY = 10
+
+    def __init__(self, config_path=None, provider=None, clock=None, samplers=None):
         if config_path is None:
             self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
         else:
             self.config_path = config_path
-        self.state = State.STANDBY
-        self.waiting_for_launch = False
-        self.launch_sleep_remaining = 0
+        # 日課の進行状況（cursor は games のインデックス、STANDBY 中は None）
+        self.phase = Phase.STANDBY
+        self.cursor = None
+        self._launch_result = None
+
+        # Scheduler (インターバル・スマート待機・日次リセット・ポーリングを期限付きタイマーで駆動)
+        self.clock = clock or SystemClock()
+        self.scheduler = Scheduler(self.clock)
+        self._poll_timer = None
+        self._interval_timer = None
+        self._smart_wait_timer = None
+        self._reset_timer = None
+        self._smart_wait_started = 0.0
         
-        # Config
+        # Config (games / kill_targets を代入するとマッチャーを作り直す)
+        self._games = []
+        self._kill_targets = []
+        self._background_policy = []
+        self._suspend_list = []
+        self.matcher = ProcessMatcher({})
         self.games = []
         self.launch_interval = 5
         self.kill_targets = []
+        self.kill_timeout = 5
         
         # Tracking
         self.chain_launch_active = True
-        self.last_reset_date = datetime.now().date()
+        # 直近のリセット時刻の日付（リセット前に起動したら前日）
+        self.last_reset_date = date.fromisoformat(routine_day(self.clock.wall(), self.DAILY_RESET_HOUR))
         
         self._running = False
         self._thread = None
+        # stop() の片付けを済ませたか (監視ループの終わりと stop() の両方から呼ばれる)
+        self._shut_down = True
+        self._shutdown_lock = threading.Lock()
         self.auto_exit_after_completion = False
         self.on_completion_callback = None
         
@@ -47,10 +280,161 @@ class GameMonitor:
         self.smart_wait_enabled = False
         self.cpu_threshold = 30
         self.smart_wait_timeout = 60
-        self.smart_wait_timer = 0
-        self._force_skip = False
+        # 準備完了の状態がこの秒数続いたら起動する（一瞬の谷で起動しない）
+        self.cpu_hold_time = 3
+        # 判定に使う値。None なら EWMA、数値なら保持時間ぶんのサンプルのパーセンタイル
+        self.cpu_percentile = None
+        # プロファイルごとの指標の閾値と重み（readiness.ReadinessGate を参照）
+        self.readiness = {}
+        # 指標名 -> サンプラー（テストでは差し替えられる）
+        self.samplers = dict(samplers or {})
+        self._gate = None
+        self._ready_since = None
+
+        # Learned interval (前のゲーム終了から CPU・ディスクが落ち着くまでの秒数を記録する)
+        # settle_times: プロファイル名 -> ゲーム名 -> [秒, ...]
+        self.settle_times = {}
+        # 学習した記録 (settle_times / peak_rss) は設定とは別の learned.json に置く
+        self.learned_path = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "learned.json")
+        self._learned_lock = threading.Lock()
+        self.adaptive_interval = False
+        self.adaptive_floor = 1
+        self.adaptive_cap = 60
+        self._settle_gate = None
+        self._settle_timer = None
+        self._settle_index = None
+        self._settle_started = 0.0
+        self._settle_ready_since = None
+
+        # Prewarm (インターバル中に次のゲームのファイルをページキャッシュへ読み込む)
+        self.prewarm_enabled = False
+        self.prewarm_rate_mb = 64
+        self.prewarm_max_mb = 2048
+        self._prewarmer = None
+        self.last_prewarm = None
+
+        # Launcher warm-up (プレイ中に次以降のゲームのランチャーを先に起動しておく)
+        # warm_launchers: "off" / "next" (次のゲームだけ) / "all" (残り全部)
+        self.warm_launchers = "off"
+        self.warm_max_concurrent = 2
+        self.warm_memory_mb = 4096
+        # ゲームのインデックス -> (pid, create_time)
+        self.warmed = {}
+
+        # Launch deadline (起動してもプロセスが現れなければ再試行し、それでもだめならスキップする)
+        # launch_timeout は秒 (0 で無効)。ゲームごとに launch_timeout で上書きできる
+        self.launch_timeout = 120
+        self.launch_retries = 2
+        # 再試行までの待ち時間。1回目はこの秒数、以降は倍々に延ばす
+        self.launch_retry_delay = 10
+        self._launch_timer = None
+        self._launch_attempts = 0
+        self._launch_started = 0.0
+        # [{"game", "result", "attempts", "seconds", "time"}, ...] 古いものから順
+        self.launch_history = []
+
+        # Idle auto-complete (プレイ中のゲームの CPU と I/O が閾値を下回り続けたら終わったとみなす)
+        # ゲーム設定の idle_complete / idle_cpu_percent / idle_io_kb / idle_seconds で上書きできる
+        self.idle_complete = False
+        self.idle_cpu_percent = 2
+        self.idle_io_kb = 64
+        self.idle_seconds = 300
+        self._idle_timer = None
+        self._idle_last = None
+        self._idle_since = None
+
+        # Log watch (ゲーム設定 log_watch のログに読み込み完了・終了・エラーの行が出たら遷移する)
+        self._log_follower = None
+        self._log_rule = None
+        self._log_index = None
+        self._awaiting_process = False
+        # [{"game", "kind", "line", "time"}, ...] 直近のもののみ
+        self.log_events = []
+
+        # Priority policy (プレイ中だけ裏方アプリの優先度・CPU アフィニティを下げ、ゲームの優先度を上げる)
+        # background_policy: [{"process": "discord.exe", "priority": "idle", "affinity": [0, 1]}, ...]
+        # game_priority はゲーム設定の priority で上書きできる。変更は journal_path に記録してから行う
+        self.game_priority = None
+        self.journal_path = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "restore_journal.json")
+        self._journal = None
+        self._priorities = None
+
+        # Suspend list (プレイ中だけ一時停止するアプリ。同期クライアント・ブラウザなど)
+        # 停止したものは restore_journal.json に記録し、クラッシュ後も次の起動時に再開する
+        self._suspender = None
+
+        # Memory admission (ゲームごとのピーク RSS を記録し、空きメモリが足りるまで起動を待つ)
+        # peak_rss: プロファイル名 -> ゲーム名 -> [MB, ...]
+        self.peak_rss = {}
+        self.memory_admission = False
+        self.memory_margin_mb = 1024
+        self.memory_timeout = 120
+        # 空きメモリ (MB) を返す関数（テストでは差し替えられる）
+        self.memory_available = memory_available_mb
+        self._rss_timer = None
+        self._rss_peak = 0
+        self._rss_index = None
+        self._admission_started = 0.0
+
+        # Session stats (プレイ中のゲームの CPU%・RSS・I/O・スレッド数を記録し、終了時にファイルへ書く)
+        self.session_stats = False
+        self.stats_interval = 2
+        self.stats_buckets = 720
+        self.stats_dir = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "sessions")
+        self.last_session_file = None
+        self._stats = None
+        self._stats_timer = None
+        self._stats_index = None
+        self._stats_started = None
+        # 基準点を取った PID (別の PID に移ったら取り直す)
+        self._stats_pid = None
+        # 前回のサンプルの時刻・CPU 秒・I/O バイト（サンプルごとに dict を作らないよう個別に持つ）
+        self._stats_time = 0.0
+        self._stats_cpu = 0.0
+        self._stats_io = 0
+
+        # History (プレイ・起動・スキップ・終了させたプロセスを SQLite に記録する)
+        # history_path が None なら、設定ファイルがあるときだけ設定と同じ場所の history.db を使う
+        self.history_path = None
+        self.history = None
+        self._playing_started = 0.0
+        # 監視側で終わらせたときの理由 (idle / log)。自然に終了したときは None
+        self._finish_reason = None
+
+        # Checkpoint (遷移ごとに進行状況を保存し、落ちても同じリセット期間内なら続きから再開する)
+        # checkpoint_path が None なら、設定ファイルがあるときだけ設定と同じ場所の routine_state.json を使う
+        self.checkpoint_path = None
+        self._checkpoint = None
+        # 遷移の中でさらに遷移したとき（スマート待機が無効など）は一番外側でまとめて保存する
+        self._fire_depth = 0
+
+        # 他スレッド（トレイ・ホットキー・Qt）からの操作は監視スレッドが順に処理する
+        self._commands = queue.SimpleQueue()
+
+        # Process backend (None の場合は設定 process_backend から選ぶ)
+        self.provider = provider
+        self.process_backend = "auto"
+
+        # Process snapshot (1ティックにつき1回だけスキャンする)
+        self._snapshot = None
+        self.last_scan_time = 0.0
+        self.scan_count = 0
+
+        # PID pinning (起動を確認したゲームはPIDで生存確認する)
+        self.tracked_pid = None
+        self.tracked_create_time = None
+        self._exit_waiter = None
+        self._tracked_exited = False
+        # launch_game で起動したプロセスのPID（子孫からゲーム本体を探す）
+        self.launched_pid = None
+        # ゲーム終了などでループを即座に起こすためのイベント
+        self._wake = threading.Event()
         
         self.load_config()
+        if self.provider is None:
+            self.provider = create_provider(self.process_backend)
+        # PID表はティックをまたいで保持し、新しいPIDだけを調べる
+        self.process_table = ProcessTable(self.provider)
 
     def load_config(self):
         try:
@@ -96,6 +480,11 @@ class GameMonitor:
                 self.smart_wait_enabled = sw_cfg.get("enabled", False)
                 self.cpu_threshold = sw_cfg.get("cpu_threshold", 30)
                 self.smart_wait_timeout = sw_cfg.get("timeout", 60)
+                self.cpu_hold_time = sw_cfg.get("hold_time", 3)
+                self.cpu_percentile = sw_cfg.get("cpu_percentile")
+
+                self.process_backend = config.get("process_backend", "auto")
+                self._load_learned(config)
 
                 # アクティブプロファイルの適用
                 self.apply_profile(self.active_profile)
@@ -110,6 +499,32 @@ class GameMonitor:
             self.games = p.get("games", [])
             self.launch_interval = p.get("launch_interval", 5)
             self.kill_targets = p.get("kill_targets", [])
+            self.kill_timeout = p.get("kill_timeout", 5)
+            self.readiness = p.get("readiness", {})
+            self.adaptive_interval = p.get("adaptive_interval", False)
+            self.adaptive_floor = p.get("adaptive_floor", 1)
+            self.adaptive_cap = p.get("adaptive_cap", 60)
+            self.prewarm_enabled = p.get("prewarm", False)
+            self.prewarm_rate_mb = p.get("prewarm_rate_mb", 64)
+            self.prewarm_max_mb = p.get("prewarm_max_mb", 2048)
+            self.warm_launchers = p.get("warm_launchers", "off")
+            self.warm_max_concurrent = p.get("warm_max_concurrent", 2)
+            self.warm_memory_mb = p.get("warm_memory_mb", 4096)
+            self.launch_timeout = p.get("launch_timeout", 120)
+            self.launch_retries = p.get("launch_retries", 2)
+            self.launch_retry_delay = p.get("launch_retry_delay", 10)
+            self.idle_complete = p.get("idle_complete", False)
+            self.idle_cpu_percent = p.get("idle_cpu_percent", 2)
+            self.idle_io_kb = p.get("idle_io_kb", 64)
+            self.idle_seconds = p.get("idle_seconds", 300)
+            self.background_policy = p.get("background_policy", [])
+            self.game_priority = p.get("game_priority")
+            self.suspend_list = p.get("suspend_list", [])
+            self.memory_admission = p.get("memory_admission", False)
+            self.memory_margin_mb = p.get("memory_margin_mb", 1024)
+            self.memory_timeout = p.get("memory_timeout", 120)
+            self.session_stats = p.get("session_stats", False)
+            self.stats_interval = p.get("stats_interval", 2)
             self.auto_exit_after_completion = p.get("auto_exit_after_completion", False)
             print(f"Profile applied: {profile_name}")
             return True
@@ -117,58 +532,316 @@ class GameMonitor:
 
     def save_config(self):
         try:
-            # 現在のアクティブプロファイルを同期
-            self.profiles[self.active_profile] = {
+            # 現在のアクティブプロファイルを同期（未知のキーは保持する）
+            self.profiles.setdefault(self.active_profile, {}).update({
                 "games": self.games,
                 "launch_interval": self.launch_interval,
                 "kill_targets": self.kill_targets,
+                "kill_timeout": self.kill_timeout,
+                "readiness": self.readiness,
+                "adaptive_interval": self.adaptive_interval,
+                "adaptive_floor": self.adaptive_floor,
+                "adaptive_cap": self.adaptive_cap,
+                "prewarm": self.prewarm_enabled,
+                "prewarm_rate_mb": self.prewarm_rate_mb,
+                "prewarm_max_mb": self.prewarm_max_mb,
+                "warm_launchers": self.warm_launchers,
+                "warm_max_concurrent": self.warm_max_concurrent,
+                "warm_memory_mb": self.warm_memory_mb,
+                "launch_timeout": self.launch_timeout,
+                "launch_retries": self.launch_retries,
+                "launch_retry_delay": self.launch_retry_delay,
+                "idle_complete": self.idle_complete,
+                "idle_cpu_percent": self.idle_cpu_percent,
+                "idle_io_kb": self.idle_io_kb,
+                "idle_seconds": self.idle_seconds,
+                "background_policy": self.background_policy,
+                "game_priority": self.game_priority,
+                "suspend_list": self.suspend_list,
+                "memory_admission": self.memory_admission,
+                "memory_margin_mb": self.memory_margin_mb,
+                "memory_timeout": self.memory_timeout,
+                "session_stats": self.session_stats,
+                "stats_interval": self.stats_interval,
                 "auto_exit_after_completion": self.auto_exit_after_completion
-            }
+            })
 
-            config_data = {
+            # このクラスが扱わないキーを消さないよう、既存の設定に上書きする
+            config_data = self._read_config_file()
+            config_data.setdefault("smart_wait", {}).update({
+                "enabled": self.smart_wait_enabled,
+                "cpu_threshold": self.cpu_threshold,
+                "timeout": self.smart_wait_timeout,
+                "hold_time": self.cpu_hold_time,
+                "cpu_percentile": self.cpu_percentile
+            })
+            config_data.update({
                 "active_profile": self.active_profile,
                 "profiles": self.profiles,
-                "smart_wait": {
-                    "enabled": self.smart_wait_enabled,
-                    "cpu_threshold": self.cpu_threshold,
-                    "timeout": self.smart_wait_timeout
-                }
-            }
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+                "process_backend": self.process_backend
+            })
+            # 古い形式で設定に入っていた記録は learned.json に移す
+            self._write_learned()
+            config_data.pop("settle_times", None)
+            config_data.pop("peak_rss", None)
+            write_json_atomic(self.config_path, config_data, indent=2)
         except Exception as e:
             print(f"Failed to save config: {e}")
 
-    def is_process_running(self, process_name):
-        for proc in psutil.process_iter(['name']):
+    def _read_config_file(self):
+        if os.path.exists(self.config_path):
             try:
-                if proc.info['name'].lower() == process_name.lower():
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
                 pass
+        return {}
+
+    def _load_learned(self, config):
+        # learned.json がまだなければ、古い形式で設定ファイルに入っている記録を引き継ぐ
+        learned = read_json(self.learned_path)
+        if not isinstance(learned, dict):
+            learned = config
+        self.settle_times = learned.get("settle_times", {})
+        self.peak_rss = learned.get("peak_rss", {})
+
+    def _save_learned(self):
+        # 記録は設定ファイルとは別に書くので、設定画面の保存とぶつからない
+        # 設定ファイルがまだない（設定画面で一度も保存していない）ときは作らない
+        if os.path.exists(self.config_path):
+            self._write_learned()
+
+    def _write_learned(self):
+        # 監視スレッド (記録) と UI スレッド (save_config) の両方から呼ばれる
+        with self._learned_lock:
+            try:
+                write_json_atomic(self.learned_path, {"settle_times": self.settle_times, "peak_rss": self.peak_rss}, indent=2)
+            except Exception as e:
+                print(f"Failed to save learned records: {e}")
+
+    def save_settle_times(self):
+        self._save_learned()
+
+    def save_peak_rss(self):
+        self._save_learned()
+
+    def get_snapshot(self):
+        # 同じティック内では最初の呼び出し時のスキャン結果を使い回す
+        if self._snapshot is None:
+            self._snapshot = ProcessSnapshot.capture(self.process_table, self.matcher)
+            self.last_scan_time = self._snapshot.scan_time
+            self.scan_count += 1
+        return self._snapshot
+
+    def is_process_running(self, process_name):
+        return self.get_snapshot().contains(process_name)
+
+    def is_game_running(self, index):
+        return bool(self.get_snapshot().pids_for(game_key(index)))
+
+    def find_launched_game(self, index):
+        """起動したプロセスの子孫からゲーム本体のPIDを探す（見つからなければ None）"""
+        if self.launched_pid is None:
+            return None
+        snapshot = self.get_snapshot()
+        matches = set(snapshot.pids_for(game_key(index)))
+        for pid in snapshot.descendants(self.launched_pid):
+            if pid in matches:
+                return pid
+        return None
+
+    def pin_game_process(self, index):
+        # スナップショットから一致したPIDを記憶し、以降は名前検索をしない
+        # 自分で起動したプロセスの子孫にいるものを優先する
+        candidates = list(self.get_snapshot().pids_for(game_key(index)))
+        launched = self.find_launched_game(index)
+        if launched is not None:
+            candidates.remove(launched)
+            candidates.insert(0, launched)
+        for pid in candidates:
+            create_time = self.process_table.create_time(pid)
+            if create_time is None or not self.provider.is_alive(pid, create_time):
+                continue
+            self.tracked_pid = pid
+            self.tracked_create_time = create_time
+            self._start_exit_waiter(pid, create_time)
+            return True
         return False
+
+    def _start_exit_waiter(self, pid, create_time):
+        if self._exit_waiter:
+            self._exit_waiter.cancel()
+            self._exit_waiter = None
+        # 同期駆動 (テスト) のときは待機スレッドを使わず、ポーリングだけで判定する
+        if self._thread is None:
+            return
+        self._exit_waiter = ExitWaiter(self.provider, pid, create_time, self._on_tracked_exit)
+        self._exit_waiter.start()
+
+    def _on_tracked_exit(self, pid):
+        if pid == self.tracked_pid:
+            self._tracked_exited = True
+            self._wake.set()
+
+    def clear_tracked_process(self):
+        if self._exit_waiter:
+            self._exit_waiter.cancel()
+            self._exit_waiter = None
+        self._tracked_exited = False
+        self.tracked_pid = None
+        self.tracked_create_time = None
+
+    def is_tracked_running(self):
+        # create_time も照合するので PID 再利用に騙されない
+        if self._tracked_exited:
+            return False
+        return self.provider.is_alive(self.tracked_pid, self.tracked_create_time)
+
+    def is_game_alive(self, index):
+        if self.tracked_pid is None:
+            # PIDを特定できていない場合は従来どおり名前で確認
+            if not self.is_game_running(index):
+                return False
+            self.pin_game_process(index)
+            return True
+        if self.is_tracked_running():
+            return True
+        # 再起動・別名での再実行などで別PIDに移っている可能性があるので、終了時だけ名前で再確認
+        self.clear_tracked_process()
+        return self.is_game_running(index) and self.pin_game_process(index)
         
+    @property
+    def games(self):
+        return self._games
+
+    @games.setter
+    def games(self, games):
+        self._games = games
+        self.compile_matcher()
+
+    @property
+    def kill_targets(self):
+        return self._kill_targets
+
+    @kill_targets.setter
+    def kill_targets(self, targets):
+        # 表示名のパースは設定変更時の1回だけ行う
+        self._kill_targets = targets
+        self.kill_target_names = compile_kill_targets(targets)
+        self.compile_matcher()
+
+    @property
+    def background_policy(self):
+        return self._background_policy
+
+    @background_policy.setter
+    def background_policy(self, policy):
+        self._background_policy = list(policy or [])
+        self.compile_matcher()
+
+    @property
+    def suspend_list(self):
+        return self._suspend_list
+
+    @suspend_list.setter
+    def suspend_list(self, patterns):
+        self._suspend_list = split_patterns(patterns)
+        self.compile_matcher()
+
+    def compile_matcher(self):
+        """全ゲームと裏方アプリのパターンを1つのマッチャーにまとめる"""
+        entries = {game_key(i): game_patterns(game) for i, game in enumerate(self._games)}
+        for i, game in enumerate(self._games):
+            if game.get("launcher_process"):
+                entries[launcher_key(i)] = split_patterns(game["launcher_process"])
+        for i, rule in enumerate(getattr(self, "_background_policy", ())):
+            entries[background_key(i)] = split_patterns(rule.get("process"))
+        entries[SUSPEND_KEY] = list(getattr(self, "_suspend_list", ()))
+        entries[KILL_TARGETS_KEY] = list(getattr(self, "kill_target_names", ()))
+        self.matcher = ProcessMatcher(entries)
+        self._snapshot = None
+
+    def terminate_game(self, index, include_tree=None):
+        """ゲームを終了させる。include_tree (省略時はゲーム設定の kill_tree) なら子孫ごと終了"""
+        if include_tree is None:
+            include_tree = self.games[index].get("kill_tree", False)
+        snapshot = self.get_snapshot()
+        roots = [self.tracked_pid] if self.tracked_pid is not None else snapshot.pids_for(game_key(index))
+        pids = []
+        for root in roots:
+            for pid in (snapshot.descendants(root) if include_tree else [root]):
+                if pid not in pids:
+                    pids.append(pid)
+        self.clear_tracked_process()
+        return self.terminate_processes([(pid, snapshot.names.get(pid, "")) for pid in pids], self.kill_timeout)
+
     def kill_target_processes(self):
-        # Create a list of actual process names to kill (e.g., extracting "hoyoplay.exe" from "HoYoPlay (hoyoplay.exe)")
-        actual_targets = []
-        for target in self.kill_targets:
-            if not target or target == "なし":
+        snapshot = self.get_snapshot()
+        # 次以降のゲームのために温めているランチャーは閉じない
+        protected = self.protected_launcher_pids(snapshot)
+        procs = [(pid, snapshot.names.get(pid, "")) for pid in snapshot.pids_for(KILL_TARGETS_KEY) if pid not in protected]
+        report = self.terminate_processes(procs, self.kill_timeout)
+        for entry in report:
+            self.record_history("kill", self.cursor, result=entry["result"], detail=entry["name"])
+        return report
+
+    def terminate_processes(self, procs, timeout):
+        """terminate をまとめて送り、timeout 秒待っても残ったものだけ kill する
+
+        戻り値は {"pid", "name", "result"} のリスト
+        (result: terminated / killed / failed / gone)
+        """
+        report = []
+        pending = []
+        for pid, name in procs:
+            create_time = self.process_table.create_time(pid)
+            entry = {"pid": pid, "name": name, "result": "gone"}
+            report.append(entry)
+            if create_time is None:
                 continue
-            # Try to extract from parentheses
-            if "(" in target and ")" in target:
-                proc_name = target.split("(")[-1].split(")")[0]
-                actual_targets.append(proc_name.strip().lower())
-            else:
-                actual_targets.append(target.strip().lower())
+            print(f"Auto-killing process: {name} (pid {pid})")
+            if self.provider.terminate(pid):
+                entry["result"] = "terminated"
+                pending.append((entry, create_time))
+            elif self.provider.is_alive(pid, create_time):
+                entry["result"] = "failed"
 
-        for proc in psutil.process_iter(['name']):
-            try:
-                name = proc.info.get('name')
-                if name and name.lower() in actual_targets:
-                    print(f"Auto-killing process: {name}")
-                    proc.terminate()
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
+        survivors = self.provider.wait_procs([(e["pid"], ct) for e, ct in pending], timeout)
+        if survivors:
+            for entry, create_time in pending:
+                if (entry["pid"], create_time) not in survivors:
+                    continue
+                print(f"Process did not exit in {timeout}s. Killing: {entry['name']} (pid {entry['pid']})")
+                entry["result"] = "killed" if self.provider.kill(entry["pid"]) else "failed"
+            still_alive = self.provider.wait_procs(survivors, 1)
+            for entry, create_time in pending:
+                if (entry["pid"], create_time) in still_alive:
+                    entry["result"] = "failed"
+        return report
+
+    def shell_execute(self, path):
+        """path を開き (成功したか, エラーメッセージ, PID) を返す。PID が取れなければ None"""
+        # Extract the parent directory to use as current working directory (cwd)
+        cwd = os.path.dirname(path)
+        
+        # Use ShellExecuteExW to correctly launch games that require Admin privileges (WinError 740)
+        # This handles UAC prompt and allows specifying the working directory (cwd).
+        # SEE_MASK_NOCLOSEPROCESS で起動したプロセスのハンドルを受け取り、PIDを記録する
+        info = SHELLEXECUTEINFOW()
+        info.cbSize = ctypes.sizeof(info)
+        info.fMask = SEE_MASK_NOCLOSEPROCESS
+        info.lpVerb = "open"
+        info.lpFile = path
+        info.lpDirectory = cwd
+        info.nShow = 1
+        
+        if ctypes.windll.shell32.ShellExecuteExW(ctypes.byref(info)):
+            pid = None
+            if info.hProcess:
+                pid = ctypes.windll.kernel32.GetProcessId(info.hProcess) or None
+                ctypes.windll.kernel32.CloseHandle(info.hProcess)
+            return True, "", pid
+        return False, f"ShellExecute failed with error code: {ctypes.GetLastError()}", None
 
     def launch_game(self, game_index):
         if game_index < len(self.games):
@@ -178,19 +851,13 @@ class GameMonitor:
                     msg = f"Failed to launch {self.games[game_index]['name']}: Invalid path or file not found."
                     print(msg)
                     return False, msg
-                # Extract the parent directory to use as current working directory (cwd)
-                cwd = os.path.dirname(path)
-                
-                # Use ShellExecuteW to correctly launch games that require Admin privileges (WinError 740)
-                # This handles UAC prompt and allows specifying the working directory (cwd).
-                # hwnd=0, op="open", file=path, params=None, dir=cwd, nShow=1
-                ret = ctypes.windll.shell32.ShellExecuteW(0, "open", path, None, cwd, 1)
-                
-                if ret > 32:
-                    print(f"Launched: {self.games[game_index]['name']} (cwd: {cwd})")
+                self.launched_pid = None
+                ok, msg, pid = self.shell_execute(path)
+                if ok:
+                    self.launched_pid = pid
+                    print(f"Launched: {self.games[game_index]['name']} (cwd: {os.path.dirname(path)}, pid: {self.launched_pid})")
                     return True, ""
                 else:
-                    msg = f"ShellExecute failed with error code: {ret}"
                     print(msg)
                     return False, msg
             except Exception as e:
@@ -199,186 +866,1184 @@ class GameMonitor:
                 return False, msg
         return False, "Invalid game index."
 
+    def launch_launcher(self, index):
+        """ゲームのランチャーを先に起動する。起動したプロセスの PID を返す（失敗・不明なら None）"""
+        game = self.games[index]
+        path = game.get("launcher_path")
+        try:
+            if not path or not os.path.exists(path):
+                print(f"Launcher for {game['name']} not found: {path}")
+                return None
+            ok, msg, pid = self.shell_execute(path)
+            if not ok:
+                print(msg)
+                return None
+            print(f"Warming launcher for {game['name']} (pid: {pid})")
+            return pid
+        except Exception as e:
+            print(f"Failed to warm launcher for {game['name']}: {e}")
+            return None
+
+    # ---- Launcher warm-up ----
+
+    def upcoming_launchers(self):
+        """ランチャーを温める対象のゲーム（現在のゲームより後ろ）のインデックス"""
+        if self.warm_launchers not in ("next", "all") or self.cursor is None or not self.chain_launch_active:
+            return []
+        end = self.cursor + 2 if self.warm_launchers == "next" else len(self.games)
+        return [i for i in range(self.cursor + 1, min(end, len(self.games))) if self.games[i].get("launcher_path")]
+
+    def protected_launcher_pids(self, snapshot):
+        pids = set()
+        for index in self.upcoming_launchers():
+            pids.update(snapshot.pids_for(launcher_key(index)))
+            if index in self.warmed:
+                # ランチャーが起動した子プロセス（アップデーターなど）も含める
+                pids.update(snapshot.descendants(self.warmed[index][0]))
+        return pids
+
+    def warmed_memory(self, snapshot):
+        total = 0
+        for pid, _ in self.warmed.values():
+            for child in snapshot.descendants(pid):
+                total += self.provider.rss(child) or 0
+        return total
+
+    def warm_upcoming_launchers(self):
+        """同時に温める数とメモリ予算の範囲で、次以降のゲームのランチャーを起動する"""
+        upcoming = self.upcoming_launchers()
+        # 現在のゲームに追いついたもの・終了したものは数えない
+        self.warmed = {i: (pid, ct) for i, (pid, ct) in self.warmed.items()
+                       if i in upcoming and self.provider.is_alive(pid, ct)}
+        if not upcoming:
+            return
+        snapshot = self.get_snapshot()
+        warming_paths = {self.games[i]["launcher_path"] for i in self.warmed}
+        for index in upcoming:
+            path = self.games[index]["launcher_path"]
+            # 同じランチャーを使うゲーム・既に起動しているランチャーは起動しない
+            if index in self.warmed or path in warming_paths or snapshot.pids_for(launcher_key(index)):
+                continue
+            if len(self.warmed) >= self.warm_max_concurrent:
+                break
+            used = self.warmed_memory(snapshot)
+            if used >= self.warm_memory_mb * MB:
+                print(f"Launcher warm-up paused: {used / MB:.0f} MB in use (budget {self.warm_memory_mb} MB)")
+                break
+            pid = self.launch_launcher(index)
+            if pid is None:
+                continue
+            create_time = self.provider.create_time(pid)
+            if create_time is not None:
+                self.warmed[index] = (pid, create_time)
+                warming_paths.add(path)
+            # 起動したランチャーのメモリを次の判定に含めるため取り直す
+            self._snapshot = None
+            snapshot = self.get_snapshot()
+
     def get_status_text(self):
-        if self.state == State.STANDBY:
+        if self.phase is Phase.STANDBY:
             if not self.games:
                 return "待機中 (ゲームが登録されていません)"
             return f"待機中 ({self.games[0]['name']}の起動待ち)"
         
-        # 動的な状態テキストの生成（state は 1以降が各ゲームに対応）
-        if self.state != State.STANDBY and int(self.state.value) <= len(self.games):
-            current_game_index = int(self.state.value) - 1
-            current_name = self.games[current_game_index]['name']
-            
-            if self.launch_sleep_remaining > 0:
-                return f"インターバル待機中... ({self.launch_sleep_remaining}秒後)"
-            
-            if current_game_index + 1 < len(self.games):
-                next_name = self.games[current_game_index + 1]['name']
-                if self.chain_launch_active:
-                    return f"{current_name} プレイ中 (終了後に {next_name} を起動)"
-                else:
-                    return f"{current_name} プレイ中 (単独起動)"
+        index = self.cursor
+        if index is None or index >= len(self.games):
+            return "不明"
+        current_name = self.games[index]['name']
+        
+        if self.phase is Phase.INTERVAL:
+            return f"インターバル待機中... ({self.launch_sleep_remaining}秒後)"
+
+        if self.phase is Phase.LAUNCHING and self._launch_attempts > 1:
+            return f"{current_name} の起動を再試行中 ({self._launch_attempts - 1}/{self.launch_retries})"
+        
+        if index + 1 < len(self.games):
+            next_name = self.games[index + 1]['name']
+            if self.chain_launch_active:
+                return f"{current_name} プレイ中 (終了後に {next_name} を起動)"
             else:
-                return f"{current_name} プレイ中 (これで最後です)"
-                
-        return "不明"
+                return f"{current_name} プレイ中 (単独起動)"
+        else:
+            return f"{current_name} プレイ中 (これで最後です)"
+
+    @property
+    def state(self):
+        return RoutineState(self.phase, self.cursor)
+
+    @property
+    def waiting_for_launch(self):
+        return self.phase in (Phase.SMART_WAIT, Phase.LAUNCHING)
         
+    @property
+    def launch_sleep_remaining(self):
+        # インターバル待機の残り秒数（タイマーの期限から計算）
+        timer = self._interval_timer
+        if timer is None or timer.cancelled:
+            return 0
+        return max(0, math.ceil(timer.deadline - self.clock.now()))
+
+    # ---- Routine state machine ----
+
+    def fire(self, event, index=None):
+        """遷移表に従ってフェーズを進める。表にない組み合わせなら何もせず False を返す
+
+        次のエントリへ進むのは cursor + 1 だけなので、ゲーム数に関係なく1回の遷移は O(1)。
+        """
+        target = TRANSITIONS.get((self.phase, event))
+        if target is None:
+            return False
+        if index is None:
+            index = self.cursor
+        completed = False
+        if target == ADVANCE:
+            index += 1
+            if self.chain_launch_active and index < len(self.games):
+                target = Phase.INTERVAL
+            else:
+                target, completed = Phase.STANDBY, True
+        self._fire_depth += 1
+        try:
+            self._leave_phase(event)
+            self._cancel_launch_timers()
+            self.phase = target
+            self.cursor = None if target is Phase.STANDBY else index
+            self._enter_phase(target)
+            self._update_log_watch()
+        finally:
+            self._fire_depth -= 1
+        if self._fire_depth == 0:
+            self.save_checkpoint()
+        if completed:
+            self._handle_completion()
+        return True
+
+    def _leave_phase(self, event):
+        if self.phase is Phase.LAUNCHING:
+            self.record_launch(self.cursor, LAUNCH_OUTCOMES.get(event, event.value))
+        elif self.phase is Phase.PLAYING:
+            self.record_history("session", self.cursor, result=self._finish_reason or SESSION_RESULTS.get(event, event.value),
+                                duration=self.clock.now() - self._playing_started)
+            self.restore_priorities()
+            self.resume_background()
+            self._finish_rss_watch()
+            self._finish_session_stats()
+
+    def _enter_phase(self, phase):
+        self._awaiting_process = False
+        self._finish_reason = None
+        if phase is Phase.STANDBY:
+            self._cancel_settle_probe()
+            self.warmed = {}
+            self.clear_tracked_process()
+            self.launched_pid = None
+        elif phase is Phase.INTERVAL:
+            self._interval_timer = self.scheduler.call_later(self.interval_for(self.cursor), self._on_interval_elapsed)
+            self._start_prewarm(self.cursor)
+        elif phase is Phase.SMART_WAIT:
+            self._start_admission()
+        elif phase is Phase.LAUNCHING:
+            # 起動すると負荷が上がるので、落ち着く前ならここで計測を打ち切る
+            self._finish_settle_probe(self.clock.now(), censored=True)
+            self._launch_attempts = 0
+            self._launch_started = self.clock.now()
+            self._attempt_launch()
+        elif phase is Phase.PLAYING:
+            self._playing_started = self.clock.now()
+            self.pin_game_process(self.cursor)
+            self.warm_upcoming_launchers()
+            self._on_game_tracked()
+
+    def _on_game_tracked(self):
+        # プレイ中のゲームの PID が分かったら、PID を使う処理をまとめて始める
+        self.apply_priorities()
+        self.suspend_background()
+        self._start_idle_watch()
+        self._start_rss_watch()
+        self._start_session_stats()
+
     def start_specific_game(self, index, chain_launch=True):
+        result = self._call("start", index, chain_launch)
+        if result is None:
+            return False, "監視スレッドが応答しません。"
+        return result
+
+    def _do_start(self, index, chain_launch):
         self.chain_launch_active = chain_launch
         if index < len(self.games):
-            self.state = State(index + 1)
-            self.launch_sleep_remaining = 0
-            self.waiting_for_launch = True
+            self.clear_tracked_process()
             # Launch immediately
-            return self.launch_game(index)
+            self._launch_result = None
+            self.fire(Event.START, index)
+            return self._launch_result
         return False, "Invalid game index."
 
     def _handle_completion(self):
-        self.state = State.STANDBY
-        self.waiting_for_launch = False
         print("デイリー完了！待機状態に戻ります。")
+        self.record_history("completion", None)
         if self.auto_exit_after_completion and self.on_completion_callback:
             print("Auto-exit is enabled. Triggering completion callback.")
             self.on_completion_callback()
 
+    # ---- Scheduler driven loop ----
 
     def _monitor_loop(self):
         while self._running:
-            try:
-                # 5 AM reset check
-                now = datetime.now()
-                if now.hour == 5 and now.date() > self.last_reset_date:
-                    print("5 AM reached. Resetting daily state.")
-                    self.reset_state()
-                    self.last_reset_date = now.date()
-
-                # 強制スキップの判定
-                if self._force_skip:
-                    self._force_skip = False
-                    current_idx = int(self.state.value) - 1
-                    if current_idx < len(self.games):
-                        print(f"Force skipping {self.games[current_idx]['name']}...")
-                        self.kill_target_processes()
-                        
-                        next_idx = current_idx + 1
-                        if self.chain_launch_active and next_idx < len(self.games):
-                            self.state = State(next_idx + 1)
-                            self.launch_sleep_remaining = self.launch_interval
-                            self.waiting_for_launch = True
-                        else:
-                            self._handle_completion()
-                    continue
+            self.run_once()
+        self._shutdown()
 
-                # Interval Wait Routine
-                if self.launch_sleep_remaining > 0:
-                    self.launch_sleep_remaining -= 1
-                    if self.launch_sleep_remaining <= 0:
-                        # スマート待機（CPU負荷検知）の開始
-                        if self.smart_wait_enabled:
-                            print("Starting Smart Wait (Checking CPU load)...")
-                            self.smart_wait_timer = 0
-                        else:
-                            # 通常起動
-                            current_idx = int(self.state.value) - 1
-                            if current_idx < len(self.games):
-                                self.launch_game(current_idx)
-                                self.waiting_for_launch = True
-                    time.sleep(1)
-                    continue
+    def run_once(self, max_wait=None):
+        """次のタイマーの期限（または起こされるまで）待ち、期限が来たタイマーを実行する"""
+        delay = self.scheduler.time_until_next()
+        if max_wait is not None:
+            delay = max_wait if delay is None else min(delay, max_wait)
+        if self.clock.wait(self._wake, delay):
+            self._wake.clear()
+            self._drain_commands()
+            # ゲーム終了などはすぐに処理する
+            self._schedule_poll(0)
+        self.scheduler.run_due()
 
-                # スマート待機中のロジック
-                if self.smart_wait_enabled and self.state != State.STANDBY and self.waiting_for_launch and self.launch_sleep_remaining <= 0:
-                    # まだゲームを起動していない（インターバル終了直後）場合のみ負荷チェック
-                    current_idx = int(self.state.value) - 1
-                    current_proc = self.games[current_idx]["process_name"]
-                    
-                    if not self.is_process_running(current_proc):
-                        cpu_usage = psutil.cpu_percent(interval=0.5)
-                        self.smart_wait_timer += 0.5
-                        
-                        if cpu_usage <= self.cpu_threshold or self.smart_wait_timer >= self.smart_wait_timeout:
-                            if self.smart_wait_timer >= self.smart_wait_timeout:
-                                print(f"Smart Wait Timeout ({self.smart_wait_timeout}s). Force launching...")
-                            else:
-                                print(f"CPU usage ({cpu_usage}%) is below threshold ({self.cpu_threshold}%). Launching...")
-                            
-                            self.launch_game(current_idx)
-                            # self.waiting_for_launch はそのままTrueで、起動監視へ移る
-                        else:
-                            # 負荷が高いので待機継続
-                            time.sleep(0.5)
-                            continue
-                    
-                # ゲームが未登録の場合は待機のみ
-                if not self.games:
-                    time.sleep(3)
-                    continue
+    def run_for(self, seconds):
+        """seconds 秒ぶんループを同期的に回す（仮想時計なら一瞬で終わる）"""
+        end = self.clock.now() + seconds
+        while True:
+            self.run_once(max_wait=max(0.0, end - self.clock.now()))
+            if self.clock.now() >= end and not self.scheduler.has_due() and not self._wake.is_set():
+                break
 
-                if self.state == State.STANDBY:
-                    # 待機中：最初のゲームが起動したらState 1へ
-                    first_proc = self.games[0]["process_name"]
-                    if self.is_process_running(first_proc):
-                        self.state = State(1)
-                        self.waiting_for_launch = False
-                        self.kill_target_processes()
-                        print(f"State changed to: 1 ({first_proc})")
-                else:
-                    # ゲームプレイ中の処理（stateは1以上）
-                    current_idx = int(self.state.value) - 1
-                    
-                    if current_idx >= len(self.games):
-                        self.reset_state()
-                        continue
-                        
-                    current_proc = self.games[current_idx]["process_name"]
-
-                    if self.waiting_for_launch:
-                        # 起動待機中：プロセスが立ち上がるのを待つ
-                        if self.is_process_running(current_proc):
-                            self.waiting_for_launch = False
-                            print(f"{current_proc} is running.")
-                    else:
-                        # 監視中：プロセスが終了したら次のゲームへ
-                        if not self.is_process_running(current_proc):
-                            print(f"{current_proc} has exited.")
-                            self.kill_target_processes()
-                            
-                            next_idx = current_idx + 1
-                            if self.chain_launch_active and next_idx < len(self.games):
-                                # 次のゲームがある場合
-                                next_name = self.games[next_idx]["name"]
-                                print(f"Preparing to launch {next_name} in {self.launch_interval}s...")
-                                self.state = State(next_idx + 1)
-                                self.launch_sleep_remaining = self.launch_interval
-                            else:
-                                # これが最後のゲームだった場合、または連鎖OFF
-                                print("Sequence completed or single play finished!")
-                                self._handle_completion()
+    def _schedule_poll(self, delay):
+        self.scheduler.cancel(self._poll_timer)
+        self._poll_timer = self.scheduler.call_later(delay, self._poll)
+
+    def _poll(self):
+        # プロセス一覧はティックごとに取り直す
+        self._snapshot = None
+        try:
+            self._tick()
+        except Exception as e:
+            print(f"Monitor error: {e}")
+        if self._poll_timer is None or self._poll_timer.cancelled:
+            self._schedule_poll(self.POLL_INTERVAL)
+
+    def _is_pending(self, timer):
+        return timer is not None and not timer.cancelled
+
+    def _cancel_launch_timers(self):
+        self.scheduler.cancel(self._interval_timer)
+        self.scheduler.cancel(self._smart_wait_timer)
+        self.scheduler.cancel(self._launch_timer)
+        self.scheduler.cancel(self._idle_timer)
+        self.scheduler.cancel(self._rss_timer)
+        self.scheduler.cancel(self._stats_timer)
+        self._interval_timer = None
+        self._smart_wait_timer = None
+        self._launch_timer = None
+        self._idle_timer = None
+        self._rss_timer = None
+        self._stats_timer = None
+        if self._gate is not None:
+            self._gate.stop()
+            self._gate = None
+        self._stop_prewarm()
+
+    def _on_interval_elapsed(self):
+        self.fire(Event.INTERVAL_ELAPSED)
+
+    def sampler(self, name):
+        if name not in self.samplers:
+            self.samplers[name] = create_sampler(name, self.SMART_WAIT_STEP)
+        return self.samplers[name]
+
+    @property
+    def cpu_sampler(self):
+        return self.sampler("cpu")
+
+    def readiness_gate(self):
+        """プロファイルの readiness 設定から判定器を作る。cpu の閾値は cpu_threshold が既定値
+
+        設定例: {"min_score": 1.0, "signals": {"disk_io": {"threshold": 30, "weight": 1},
+                 "memory": {"threshold": 4096, "weight": 2}}}
+        閾値を設定していない指標は判定に使わない。
+        """
+        config = self.readiness or {}
+        signals = []
+        for name in SIGNALS:
+            options = config.get("signals", {}).get(name, {})
+            threshold = options.get("threshold", self.cpu_threshold if name == "cpu" else None)
+            if threshold is not None:
+                signals.append((name, threshold, options.get("weight", 1)))
+        window = max(1, int(self.cpu_hold_time / self.SMART_WAIT_STEP))
+        samplers = {name: self.sampler(name) for name, _, _ in signals}
+        return ReadinessGate(signals, samplers, config.get("min_score", 1.0), self.cpu_percentile, window)
+
+    def _start_smart_wait(self):
+        # スマート待機（負荷検知）の開始。無効なら通常起動
+        if not self.smart_wait_enabled:
+            self.fire(Event.READY)
+            return
+        self._gate = self.readiness_gate()
+        print(f"Starting Smart Wait (Checking {', '.join(name for name, _, _ in self._gate.signals)})...")
+        self._smart_wait_started = self.clock.now()
+        self._ready_since = None
+        # 同期駆動 (テスト) のときはスレッドを使わず、各ステップで1回ずつ計測する
+        self._gate.start(threaded=self._thread is not None)
+        self._smart_wait_timer = self.scheduler.call_later(self.SMART_WAIT_STEP, self._smart_wait_step)
+
+    def _smart_wait_step(self):
+        if self.phase is not Phase.SMART_WAIT or self._gate is None:
+            return
+        self._snapshot = None
+        # 既に手動で起動されていれば負荷チェックは不要
+        if self.is_game_running(self.cursor):
+            self.fire(Event.DETECTED)
+            return
+        gate = self._gate
+        if not gate.running:
+            gate.sample()
+        score, values = gate.evaluate()
+        now = self.clock.now()
+        elapsed = now - self._smart_wait_started
+        # 条件を外れたら保持時間を数え直す
+        if gate.is_ready(score):
+            if self._ready_since is None:
+                self._ready_since = now
+        else:
+            self._ready_since = None
+        held = self._ready_since is not None and now - self._ready_since >= self.cpu_hold_time
+        if held or elapsed >= self.smart_wait_timeout:
+            if elapsed >= self.smart_wait_timeout:
+                print(f"Smart Wait Timeout ({self.smart_wait_timeout}s). Force launching...")
+            else:
+                print(f"Readiness {score:.2f} ({gate.describe(values)}) held for {self.cpu_hold_time}s. Launching...")
+            self.fire(Event.READY)
+        else:
+            # 負荷が高いので待機継続
+            self._smart_wait_timer = self.scheduler.call_later(self.SMART_WAIT_STEP, self._smart_wait_step)
+
+    # ---- Checkpoint ----
+
+    def open_checkpoint(self):
+        path = self.checkpoint_path
+        if path is None:
+            if not os.path.exists(self.config_path):
+                return
+            path = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "routine_state.json")
+        self._checkpoint = Checkpoint(path)
+
+    def checkpoint_state(self):
+        return {
+            "day": routine_day(self.clock.wall(), self.DAILY_RESET_HOUR),
+            "profile": self.active_profile,
+            "phase": self.phase.value,
+            "cursor": self.cursor,
+            "chain_launch_active": self.chain_launch_active,
+            "tracked_pid": self.tracked_pid,
+            "tracked_create_time": self.tracked_create_time,
+            "saved_at": self.clock.wall().isoformat(timespec="seconds"),
+        }
+
+    def save_checkpoint(self):
+        if self._checkpoint is not None:
+            self._checkpoint.save(self.checkpoint_state())
+
+    def resume_from_checkpoint(self):
+        """同じリセット期間内のチェックポイントがあれば続きから再開する。再開したら True"""
+        state = self._checkpoint.load() if self._checkpoint else None
+        if not state:
+            return False
+        if state.get("day") != routine_day(self.clock.wall(), self.DAILY_RESET_HOUR) or state.get("profile") != self.active_profile:
+            print("Checkpoint is from an earlier reset window or another profile. Starting fresh.")
+            return False
+        try:
+            phase = Phase(state.get("phase"))
+        except ValueError:
+            return False
+        index = state.get("cursor")
+        if phase is Phase.STANDBY or index is None or index >= len(self.games):
+            return False
+        self.chain_launch_active = state.get("chain_launch_active", True)
+        self.cursor = index
+        self._snapshot = None
+        name = self.games[index]["name"]
+        pid, create_time = state.get("tracked_pid"), state.get("tracked_create_time")
+        if pid is not None and create_time is not None and self.provider.is_alive(pid, create_time):
+            # 落ちる前と同じプロセスに付け直す
+            self.phase = Phase.PLAYING
+            self._playing_started = self.clock.now()
+            self.tracked_pid, self.tracked_create_time = pid, create_time
+            self._start_exit_waiter(pid, create_time)
+            self.warm_upcoming_launchers()
+            self._on_game_tracked()
+            print(f"Resumed routine: re-attached to {name} (pid {pid})")
+        elif phase is Phase.PLAYING or self.is_game_running(index):
+            # 別のプロセスになっている・もう終わっている場合は通常の監視に任せる（終わっていれば次へ進む）
+            self.phase = Phase.PLAYING
+            self._enter_phase(Phase.PLAYING)
+            print(f"Resumed routine: {name} was playing")
+        else:
+            # 起動する前に落ちていた場合はインターバルからやり直す
+            self.phase = Phase.INTERVAL
+            self._enter_phase(Phase.INTERVAL)
+            print(f"Resumed routine: launching {name} next")
+        self._update_log_watch()
+        self.save_checkpoint()
+        return True
+
+    # ---- History ----
+
+    def open_history(self):
+        if self.history is not None:
+            return
+        path = self.history_path
+        if path is None:
+            if not os.path.exists(self.config_path):
+                return
+            path = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "history.db")
+        try:
+            self.history = HistoryStore(path)
+        except Exception as e:
+            print(f"Failed to open history: {e}")
+
+    def close_history(self):
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+
+    def record_history(self, kind, index, **fields):
+        if self.history is None:
+            return
+        game = self.games[index].get("name", "") if index is not None and index < len(self.games) else None
+        wall = self.clock.wall()
+        self.history.record(wall.timestamp(), routine_day(wall, self.DAILY_RESET_HOUR), self.active_profile,
+                            kind, game, **fields)
+
+    def routine_today(self):
+        return date.fromisoformat(routine_day(self.clock.wall(), self.DAILY_RESET_HOUR))
+
+    def average_durations(self, days=30):
+        """直近 days 日のゲームごとの平均プレイ時間 {ゲーム名: (秒, 回数)}"""
+        if self.history is None:
+            return {}
+        return self.history.average_durations(self.active_profile, self.routine_today(), days)
+
+    def completion_streak(self):
+        if self.history is None:
+            return 0
+        return self.history.completion_streak(self.active_profile, self.routine_today())
+
+    # ---- Launch deadline ----
+
+    def launch_timeout_for(self, index):
+        return self.games[index].get("launch_timeout", self.launch_timeout)
+
+    def _attempt_launch(self):
+        if self.phase is not Phase.LAUNCHING:
+            return
+        self._launch_attempts += 1
+        if self._launch_attempts > 1:
+            # 待っている間に起動していれば二重に起動しない
+            self._snapshot = None
+            if self.is_game_running(self.cursor):
+                self.fire(Event.DETECTED)
+                return
+            print(f"Retrying launch of {self.games[self.cursor]['name']} "
+                  f"({self._launch_attempts - 1}/{self.launch_retries})...")
+        self._launch_result = self.launch_game(self.cursor)
+        timeout = self.launch_timeout_for(self.cursor)
+        if self._launch_result and not self._launch_result[0]:
+            self._launch_failed()
+        elif timeout:
+            self._launch_timer = self.scheduler.call_later(timeout, self._on_launch_deadline)
+
+    def _on_launch_deadline(self):
+        if self.phase is not Phase.LAUNCHING:
+            return
+        self._snapshot = None
+        if self.is_game_running(self.cursor):
+            self.fire(Event.DETECTED)
+            return
+        print(f"{self.games[self.cursor]['name']} did not start within {self.launch_timeout_for(self.cursor)}s.")
+        self._launch_failed()
+
+    def _launch_failed(self):
+        # 再試行の回数が残っていれば待ち時間を倍々に延ばして起動し直す。尽きたら次のゲームへ
+        # (起動処理の途中から遷移しないよう、どちらもタイマー経由で行う)
+        if self._launch_attempts > self.launch_retries:
+            self._launch_timer = self.scheduler.call_later(0, self._give_up_launch)
+            return
+        delay = self.launch_retry_delay * 2 ** (self._launch_attempts - 1)
+        self._launch_timer = self.scheduler.call_later(delay, self._attempt_launch)
+
+    def _give_up_launch(self):
+        if self.phase is not Phase.LAUNCHING:
+            return
+        print(f"Giving up on {self.games[self.cursor]['name']} after {self._launch_attempts} attempts.")
+        self._skip(Event.GAVE_UP)
+
+    def record_launch(self, index, result):
+        if index is None or index >= len(self.games):
+            return
+        entry = {
+            "game": self.games[index].get("name", ""),
+            "result": result,
+            "attempts": self._launch_attempts,
+            "seconds": round(self.clock.now() - self._launch_started, 1),
+            "time": self.clock.wall().isoformat(timespec="seconds"),
+        }
+        self.launch_history.append(entry)
+        del self.launch_history[:-self.LAUNCH_HISTORY]
+        self.record_history("launch", index, result=result, duration=entry["seconds"], attempts=entry["attempts"])
+        print(f"Launch {result}: {entry['game']} (attempts: {entry['attempts']}, {entry['seconds']}s)")
+
+    # ---- Idle auto-complete ----
+
+    def idle_setting(self, index, key):
+        return self.games[index].get(key, getattr(self, key))
+
+    def _start_idle_watch(self):
+        # PID が分かり直したときにも呼ばれるので、前の監視は止めてから始める
+        self.scheduler.cancel(self._idle_timer)
+        self._idle_timer = None
+        self._idle_last = None
+        self._idle_since = None
+        if not self.idle_setting(self.cursor, "idle_complete"):
+            return
+        self._idle_step()
+
+    def _idle_step(self):
+        # 固定した PID の累計値を読むだけなのでプロセス一覧のスキャンはしない
+        if self.phase is not Phase.PLAYING:
+            return
+        pid = self.tracked_pid
+        counters = self.provider.activity(pid) if pid is not None else None
+        if counters is None:
+            # PID を特定し直している途中・一時的に読めないだけなので、止めずに次の回で読み直す
+            self._idle_timer = self.scheduler.call_later(self.IDLE_STEP, self._idle_step)
+            return
+        now = self.clock.now()
+        last, self._idle_last = self._idle_last, (now, counters, pid)
+        if last is not None and last[2] != pid:
+            # 別の PID に移った。前のプロセスの累計値とは比べられないので、ここを基準点にする
+            last = None
+            self._idle_since = None
+        if last is not None and now > last[0]:
+            elapsed = now - last[0]
+            cpu = (counters[0] - last[1][0]) / elapsed * 100
+            io_kb = (counters[1] - last[1][1]) / elapsed / 1024
+            index = self.cursor
+            if cpu <= self.idle_setting(index, "idle_cpu_percent") and io_kb <= self.idle_setting(index, "idle_io_kb"):
+                if self._idle_since is None:
+                    self._idle_since = last[0]
+            else:
+                self._idle_since = None
+            idle_seconds = self.idle_setting(index, "idle_seconds")
+            if self._idle_since is not None and now - self._idle_since >= idle_seconds:
+                print(f"{self.games[index]['name']} has been idle for {idle_seconds}s "
+                      f"(cpu {cpu:.1f}%, io {io_kb:.0f} KB/s). Treating it as done.")
+                self._finish_game(index, "idle")
+                return
+        self._idle_timer = self.scheduler.call_later(self.IDLE_STEP, self._idle_step)
+
+    # ---- Log watch ----
+
+    def _update_log_watch(self):
+        # 起動してからプレイが終わるまで、現在のゲームのログだけを追いかける
+        index = self.cursor if self.phase in (Phase.LAUNCHING, Phase.PLAYING) else None
+        if index is not None and not self.games[index].get("log_watch", {}).get("path"):
+            index = None
+        if index == self._log_index:
+            return
+        self._stop_log_watch()
+        if index is None:
+            return
+        rule = LogWatchRule(self.games[index]["log_watch"])
+        follower = LogFollower(rule.path, on_line=lambda line: self._on_log_line(index, rule, line))
+        self._log_rule = rule
+        self._log_follower = follower
+        self._log_index = index
+        # 同期駆動 (テスト) のときはスレッドを使わず、ティックごとに check() する
+        if self._thread is not None:
+            follower.start()
+
+    def _stop_log_watch(self):
+        if self._log_follower is not None:
+            self._log_follower.stop()
+        self._log_follower = None
+        self._log_rule = None
+        self._log_index = None
+
+    def _on_log_line(self, index, rule, line):
+        # 追跡スレッドから呼ばれるので、遷移は監視スレッドのコマンドとして行う
+        kind = rule.classify(line)
+        if kind is not None:
+            self._post("log", index, kind, line)
+
+    def _do_log(self, index, kind, line):
+        if index != self.cursor or index >= len(self.games):
+            return
+        name = self.games[index]["name"]
+        self.log_events.append({"game": name, "kind": kind, "line": line,
+                                "time": self.clock.wall().isoformat(timespec="seconds")})
+        del self.log_events[:-self.LAUNCH_HISTORY]
+        print(f"Log {kind} for {name}: {line}")
+        if kind == "loaded":
+            # プロセスが見つかるより先に読み込み完了が分かればプレイ中とみなす
+            if self.fire(Event.DETECTED) and self.tracked_pid is None:
+                self._awaiting_process = True
+        elif kind == "done" and self.phase is Phase.PLAYING:
+            # プロセスの終了を待たずに次へ進む
+            self._finish_game(index, "log")
+        elif kind == "error" and self.phase is Phase.LAUNCHING:
+            # 起動の失敗として再試行する
+            self.scheduler.cancel(self._launch_timer)
+            self._launch_failed()
+
+    # ---- Priority policy ----
+
+    @property
+    def journal(self):
+        if self._journal is None:
+            self._journal = RestoreJournal(self.journal_path)
+        return self._journal
+
+    @property
+    def priorities(self):
+        if self._priorities is None:
+            self._priorities = PriorityManager(self.provider, self.journal)
+        return self._priorities
+
+    @property
+    def suspender(self):
+        if self._suspender is None:
+            self._suspender = SuspendManager(self.provider, self.journal)
+        return self._suspender
+
+    def apply_priorities(self):
+        index = self.cursor
+        game_priority = self.games[index].get("priority", self.game_priority)
+        if not self._background_policy and not game_priority:
+            return
+        snapshot = self.get_snapshot()
+        targets = []
+        if game_priority and self.tracked_pid is not None:
+            targets.append((self.tracked_pid, self.tracked_create_time, game_priority, None))
+        for i, rule in enumerate(self._background_policy):
+            for pid in snapshot.pids_for(background_key(i)):
+                targets.append((pid, self.process_table.create_time(pid), rule.get("priority"), rule.get("affinity")))
+        changed = self.priorities.apply_all([(pid, create_time, snapshot.names.get(pid, ""), priority, affinity)
+                                             for pid, create_time, priority, affinity in targets if create_time is not None])
+        if changed:
+            print(f"Adjusted priority/affinity of {changed} processes while playing {self.games[index]['name']}")
+
+    def restore_priorities(self):
+        if self._priorities is None or not self._journal.entries:
+            return
+        restored = self.priorities.restore()
+        if restored:
+            print(f"Restored priority/affinity of {restored} processes")
+
+    def suspend_background(self):
+        # ゲームを特定できたときだけ止める。ゲーム自身の子孫と温めているランチャーは止めない
+        if not self._suspend_list or self.tracked_pid is None:
+            return
+        snapshot = self.get_snapshot()
+        spared = set(snapshot.descendants(self.tracked_pid)) | self.protected_launcher_pids(snapshot)
+        spared.add(os.getpid())
+        targets = []
+        for pid in snapshot.pids_for(SUSPEND_KEY):
+            create_time = self.process_table.create_time(pid)
+            if pid not in spared and create_time is not None:
+                targets.append((pid, create_time, snapshot.names.get(pid, "")))
+        suspended = self.suspender.suspend_all(targets)
+        if suspended:
+            print(f"Suspended {suspended} background processes while playing {self.games[self.cursor]['name']}")
+
+    def resume_background(self):
+        if self._suspender is None or not self._journal.entries:
+            return
+        resumed = self.suspender.resume_all()
+        if resumed:
+            print(f"Resumed {resumed} background processes")
+
+    def recover_processes(self):
+        """前回クラッシュなどで戻せなかった変更（優先度・一時停止）を戻す"""
+        if not os.path.exists(self.journal_path):
+            return
+        print("Restoring processes left over from the previous run...")
+        self.suspender.resume_all()
+        self.priorities.restore()
+
+    # ---- Session stats ----
+
+    def _start_session_stats(self):
+        # PID が分かり直したときにも呼ばれる。それまでの記録は PID がなく空なので作り直す
+        self.scheduler.cancel(self._stats_timer)
+        self._stats_timer = None
+        self._stats = None
+        self._stats_index = None
+        if not self.session_stats or self.stats_interval <= 0:
+            return
+        self._stats = SessionSeries(self.stats_buckets)
+        self._stats_index = self.cursor
+        self._stats_started = self.clock.wall()
+        self._stats_pid = None
+        self._stats_step()
 
+    def _stats_step(self):
+        if self.phase is not Phase.PLAYING or self._stats is None:
+            return
+        pid = self.tracked_pid
+        counters = self.provider.activity(pid) if pid is not None else None
+        if counters is not None:
+            now = self.clock.now()
+            cpu, io_bytes = counters
+            if pid != self._stats_pid:
+                # 最初の回か、別の PID に移ったときは基準点を取るだけ
+                self._stats_pid = pid
+            elif now > self._stats_time:
+                elapsed = now - self._stats_time
+                rss = self.provider.rss(pid) or 0
+                self._stats.add(
+                    (cpu - self._stats_cpu) / elapsed * 100,
+                    rss / MB,
+                    (io_bytes - self._stats_io) / elapsed / 1024,
+                    self.provider.num_threads(pid) or 0,
+                )
+            self._stats_time, self._stats_cpu, self._stats_io = now, cpu, io_bytes
+        # 読めなかった回は飛ばし、プレイが終わるまで続ける
+        self._stats_timer = self.scheduler.call_later(self.stats_interval, self._stats_step)
+
+    def _finish_session_stats(self):
+        series, index = self._stats, self._stats_index
+        self._stats = None
+        self._stats_index = None
+        if series is None or not series.samples or index >= len(self.games):
+            return
+        name = self.games[index].get("name", "")
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "game"
+        path = os.path.join(self.stats_dir, f"{self._stats_started:%Y%m%d_%H%M%S}_{safe}.dgls")
+        try:
+            series.save(path, game=name, profile=self.active_profile, interval=self.stats_interval,
+                        started=self._stats_started.isoformat(timespec="seconds"),
+                        ended=self.clock.wall().isoformat(timespec="seconds"))
+            self.last_session_file = path
+            summary = series.summary()
+            cpu, rss = summary["cpu"], summary["rss_mb"]
+            print(f"Session stats for {name}: cpu avg {cpu[2]:.1f}% / max {cpu[1]:.1f}%, "
+                  f"rss max {rss[1]:.0f} MB ({series.samples} samples) -> {path}")
+        except OSError as e:
+            print(f"Failed to save session stats: {e}")
+
+    # ---- Memory admission ----
+
+    def peak_rss_history(self, index):
+        return self.peak_rss.get(self.active_profile, {}).get(self.games[index].get("name", ""), [])
+
+    def learned_peak_mb(self, index):
+        """記録したセッションの中で最大のピーク RSS (MB)。記録がなければ None"""
+        history = self.peak_rss_history(index)
+        return max(history) if history else None
+
+    def record_peak_rss(self, index, mb):
+        history = self.peak_rss.setdefault(self.active_profile, {}).setdefault(self.games[index].get("name", ""), [])
+        history.append(round(mb))
+        del history[:-self.PEAK_RSS_HISTORY]
+        self.save_peak_rss()
+
+    def _start_rss_watch(self):
+        # PID が分かり直したときにも呼ばれる。ピークは同じプレイのものなので引き継ぐ
+        self.scheduler.cancel(self._rss_timer)
+        self._rss_timer = None
+        if self._rss_index != self.cursor:
+            self._rss_peak = 0
+        self._rss_index = self.cursor
+        self._rss_step()
+
+    def _rss_step(self):
+        if self.phase is not Phase.PLAYING:
+            return
+        # PID を特定し直している途中・読めなかった回は飛ばし、プレイが終わるまで続ける
+        rss = self.provider.rss(self.tracked_pid) if self.tracked_pid is not None else None
+        if rss is not None:
+            self._rss_peak = max(self._rss_peak, rss)
+        self._rss_timer = self.scheduler.call_later(self.RSS_STEP, self._rss_step)
+
+    def _finish_rss_watch(self):
+        index, self._rss_index = self._rss_index, None
+        if index is None or not self._rss_peak or index >= len(self.games):
+            return
+        mb = self._rss_peak / MB
+        print(f"Peak memory of {self.games[index]['name']}: {mb:.0f} MB")
+        self.record_peak_rss(index, mb)
+
+    def memory_needed_mb(self, index):
+        peak = self.learned_peak_mb(index)
+        return None if peak is None else peak + self.memory_margin_mb
+
+    def _start_admission(self):
+        # 前のゲームのメモリが解放されるまで、スマート待機（負荷検知）の前に待つ
+        needed = self.memory_needed_mb(self.cursor) if self.memory_admission else None
+        if needed is None or self.memory_available() >= needed:
+            self._start_smart_wait()
+            return
+        print(f"Waiting for {needed:.0f} MB of free memory before launching {self.games[self.cursor]['name']}...")
+        self._admission_started = self.clock.now()
+        self._smart_wait_timer = self.scheduler.call_later(self.SMART_WAIT_STEP, self._admission_step)
+
+    def _admission_step(self):
+        if self.phase is not Phase.SMART_WAIT:
+            return
+        self._snapshot = None
+        if self.is_game_running(self.cursor):
+            self.fire(Event.DETECTED)
+            return
+        needed = self.memory_needed_mb(self.cursor)
+        available = self.memory_available()
+        elapsed = self.clock.now() - self._admission_started
+        if available >= needed:
+            print(f"{available:.0f} MB free after {elapsed:.1f}s.")
+            self._start_smart_wait()
+        elif elapsed >= self.memory_timeout:
+            print(f"Memory wait timeout ({self.memory_timeout}s, {available:.0f} MB free). Continuing...")
+            self._start_smart_wait()
+        else:
+            self._smart_wait_timer = self.scheduler.call_later(self.SMART_WAIT_STEP, self._admission_step)
+
+    # ---- Prewarm ----
+
+    def prewarm_paths(self, index):
+        """実行ファイルと、ゲーム設定 prewarm_paths に書いた大きなファイル・ディレクトリ"""
+        game = self.games[index]
+        extra = game.get("prewarm_paths", [])
+        if isinstance(extra, str):
+            extra = [extra]
+        return [game.get("path")] + list(extra)
+
+    def _start_prewarm(self, index):
+        # ディスクが空いているインターバル中だけ読む。起動直前の負荷にならないよう終わったら止める
+        self._stop_prewarm()
+        if not self.prewarm_enabled:
+            return
+        self._prewarmer = Prewarmer(
+            self.prewarm_paths(index),
+            rate=self.prewarm_rate_mb * MB,
+            max_bytes=self.prewarm_max_mb * MB,
+            on_done=self._on_prewarm_done,
+            name=self.games[index].get("name", ""),
+        )
+        self._prewarmer.start()
+
+    def _stop_prewarm(self):
+        if self._prewarmer is not None:
+            self._prewarmer.cancel()
+            self._prewarmer = None
+
+    def _on_prewarm_done(self, prewarmer):
+        # 先読みスレッドから呼ばれる
+        report = prewarmer.report()
+        self.last_prewarm = dict(report, game=prewarmer.name)
+        print(f"Prewarmed {prewarmer.name}: {report['bytes'] / MB:.1f} MB in {report['files']} files, "
+              f"{report['seconds']:.1f}s" + (" (stopped early)" if report["cancelled"] else ""))
+
+    # ---- Learned interval ----
+
+    def settle_history(self, index):
+        return self.settle_times.get(self.active_profile, {}).get(self.games[index].get("name", ""), [])
+
+    def learned_interval(self, index):
+        """記録から求めた待ち時間（記録が足りなければ None）"""
+        return learned_interval(self.settle_history(index), self.adaptive_floor, self.adaptive_cap)
+
+    def interval_for(self, index):
+        # 学習が有効で十分な記録があれば、ゲームごとの待ち時間を使う
+        if self.adaptive_interval:
+            learned = self.learned_interval(index)
+            if learned is not None:
+                return round(learned, 1)
+        return self.launch_interval
+
+    def record_settle_time(self, index, seconds):
+        history = self.settle_times.setdefault(self.active_profile, {}).setdefault(self.games[index].get("name", ""), [])
+        history.append(round(seconds, 1))
+        del history[:-self.SETTLE_HISTORY]
+        self.save_settle_times()
+
+    def _start_settle_probe(self, index):
+        """前のゲームの終了時から、CPU とディスクが落ち着くまでの時間を計る
+
+        スマート待機のサンプラーとは別の読み取り関数を各ステップで直接呼ぶ。
+        """
+        self._cancel_settle_probe()
+        disk = self.readiness.get("signals", {}).get("disk_io", {}).get("threshold", self.SETTLE_DISK_THRESHOLD)
+        signals = [("cpu", self.cpu_threshold, 1), ("disk_io", disk, 1)]
+        samplers = {name: CpuSampler(read=self._probe_reader(name), interval=self.SMART_WAIT_STEP) for name, _, _ in signals}
+        self._settle_gate = ReadinessGate(signals, samplers)
+        self._settle_gate.start(threaded=False)
+        self._settle_index = index
+        self._settle_started = self.clock.now()
+        self._settle_ready_since = None
+        self._settle_timer = self.scheduler.call_later(self.SMART_WAIT_STEP, self._settle_step)
+
+    def _probe_reader(self, name):
+        # 差分を取る読み取り関数 (RateCounter / CpuPercent) はスマート待機と基準点を共有しないよう別に作る
+        read = self.sampler(name).read
+        return read.fresh() if hasattr(read, "fresh") else read
+
+    def _settle_step(self):
+        gate = self._settle_gate
+        # スキップ・リセットなどで別のゲームに移ったら記録しない
+        if gate is None or self.cursor != self._settle_index:
+            self._cancel_settle_probe()
+            return
+        gate.sample()
+        score, _ = gate.evaluate()
+        now = self.clock.now()
+        if gate.is_ready(score):
+            if self._settle_ready_since is None:
+                self._settle_ready_since = now
+            if now - self._settle_ready_since >= self.cpu_hold_time:
+                self._finish_settle_probe(self._settle_ready_since)
+                return
+        else:
+            self._settle_ready_since = None
+        if now - self._settle_started >= self.SETTLE_MAX:
+            self._finish_settle_probe(now, censored=True)
+            return
+        self._settle_timer = self.scheduler.call_later(self.SMART_WAIT_STEP, self._settle_step)
+
+    def _finish_settle_probe(self, settled_at, censored=False):
+        if self._settle_gate is None or self.cursor != self._settle_index:
+            return
+        seconds = settled_at - self._settle_started
+        if censored:
+            # 落ち着く前に打ち切った記録は実際より短いので倍にして残す（短すぎる待ち時間から抜け出せるように）
+            seconds = min(seconds * 2, self.SETTLE_MAX)
+        index = self._settle_index
+        self._cancel_settle_probe()
+        print(f"Settle time before {self.games[index]['name']}: {seconds:.1f}s" + (" (cut short)" if censored else ""))
+        self.record_settle_time(index, seconds)
+
+    def _cancel_settle_probe(self):
+        self.scheduler.cancel(self._settle_timer)
+        self._settle_timer = None
+        self._settle_gate = None
+        self._settle_index = None
+
+    def _schedule_daily_reset(self):
+        now = self.clock.wall()
+        target = now.replace(hour=self.DAILY_RESET_HOUR, minute=0, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        delay = min((target - now).total_seconds(), self.DAILY_RESET_RECHECK)
+        self.scheduler.cancel(self._reset_timer)
+        self._reset_timer = self.scheduler.call_later(delay, self._on_daily_reset)
+
+    def _on_daily_reset(self):
+        now = self.clock.wall()
+        if now.hour >= self.DAILY_RESET_HOUR and now.date() > self.last_reset_date:
+            print("5 AM reached. Resetting daily state.")
+            self._do_reset()
+            self.last_reset_date = now.date()
+        self._schedule_daily_reset()
+
+    def _tick(self):
+        # ゲームが未登録の場合は待機のみ
+        if not self.games:
+            return
+
+        if self._log_follower is not None and not self._log_follower.running:
+            self._log_follower.check()
+
+        if self.phase is Phase.STANDBY:
+            # 待機中：最初のゲームが起動したらプレイ中へ
+            if self.is_game_running(0):
+                self.fire(Event.DETECTED, 0)
+                self.kill_target_processes()
+                print(f"State changed to: 1 ({self.games[0]['process_name']})")
+            return
+
+        # インターバル待機中はプロセス確認をしない
+        if self.phase is Phase.INTERVAL:
+            return
+
+        index = self.cursor
+        if index >= len(self.games):
+            # プロファイルの変更などでゲームが減った
+            self._do_reset()
+            return
+        current_proc = self.games[index]["process_name"]
+
+        if self.phase is Phase.PLAYING:
+            alive = self.is_game_alive(index)
+            if self._awaiting_process:
+                # ログで読み込み完了を知ったが、まだプロセスを確認していない（見つかるまで終了とみなさない）
+                if alive:
+                    self._awaiting_process = False
+                    self._on_game_tracked()
+                    self.save_checkpoint()
+                return
+            # 監視中：プロセスが終了したら次のゲームへ（PID固定済みならスキャン不要）
+            if not alive:
+                print(f"{current_proc} has exited.")
+                self._on_game_exited(index)
+        elif self.is_game_running(index):
+            # 起動待機中：プロセスが立ち上がったらプレイ中へ
+            self.fire(Event.DETECTED)
+            print(f"{current_proc} is running.")
+
+    def _on_game_exited(self, index):
+        self.clear_tracked_process()
+        self.kill_target_processes()
+        if self.chain_launch_active and index + 1 < len(self.games):
+            print(f"Preparing to launch {self.games[index + 1]['name']} in {self.interval_for(index + 1)}s...")
+            self._start_settle_probe(index + 1)
+        else:
+            # これが最後のゲームだった場合、または連鎖OFF
+            print("Sequence completed or single play finished!")
+        self.fire(Event.EXITED)
+
+    def _finish_game(self, index, reason):
+        """終わったと判断したゲームを終了させ、自然に終了したときと同じように次へ進む"""
+        self._finish_reason = reason
+        self._snapshot = None
+        self.terminate_game(index)
+        self._on_game_exited(index)
+
+    # ---- Commands ----
+
+    def _post(self, name, *args):
+        future = Future()
+        self._commands.put((name, args, future))
+        self._wake.set()
+        return future
+
+    def _in_loop_thread(self):
+        # 監視スレッドが動いていない（起動前・同期駆動）か、監視スレッド自身からの呼び出し
+        return self._thread is None or not self._thread.is_alive() or threading.current_thread() is self._thread
+
+    def _call(self, name, *args):
+        """コマンドを監視スレッドで実行し、結果を待って返す（応答がなければ None）"""
+        if self._in_loop_thread():
+            return self._dispatch(name, args)
+        try:
+            return self._post(name, *args).result(timeout=self.kill_timeout + 10)
+        except FutureTimeoutError:
+            print(f"Monitor did not respond to command: {name}")
+            return None
+
+    def _dispatch(self, name, args):
+        handler = {
+            "skip": self._do_skip,
+            "reset": self._do_reset,
+            "start": self._do_start,
+            "log": self._do_log,
+        }[name]
+        return handler(*args)
+
+    def _drain_commands(self):
+        while True:
+            try:
+                name, args, future = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                future.set_result(self._dispatch(name, args))
             except Exception as e:
-                print(f"Monitor error: {e}")
-            
-            time.sleep(3)  # 3秒間隔でプロセスをチェック
+                print(f"Command {name} failed: {e}")
+                future.set_exception(e)
 
     def skip_current(self):
-        if self.state != State.STANDBY:
-            self._force_skip = True
+        # トレイ・ホットキーから呼ばれるので完了は待たない（監視スレッドが即座に処理する）
+        if self._in_loop_thread():
+            self._do_skip()
+        else:
+            self._post("skip")
+
+    def _do_skip(self):
+        if self.phase is Phase.STANDBY:
+            return
+        self._snapshot = None
+        index = self.cursor
+        if index >= len(self.games):
+            self._do_reset()
+            return
+        print(f"Force skipping {self.games[index]['name']}...")
+        self._skip(Event.SKIP)
+
+    def _skip(self, event):
+        index = self.cursor
+        self.record_history("skip", index, result=LAUNCH_OUTCOMES[event] if event is Event.GAVE_UP else "manual",
+                            detail=self.phase.value)
+        if self.games[index].get("kill_on_skip", False):
+            self.terminate_game(index)
+        self.kill_target_processes()
+        self.clear_tracked_process()
+        self.fire(event)
 
     def reset_state(self):
-        self.state = State.STANDBY
-        self.waiting_for_launch = False
-        self.launch_sleep_remaining = 0
+        self._call("reset")
+
+    def _do_reset(self):
+        # fire() がチェックポイントを書くので、先に連鎖を止めておく
         self.chain_launch_active = False
-        self._force_skip = False
+        self.fire(Event.RESET)
 
-    def start(self):
+    def reload_config(self):
+        """設定画面を閉じたときに呼ぶ。プロファイルかゲームの一覧が変わったときだけ日課をリセットする
+
+        変わっていなければ、チェックポイントから再開した日課などはそのまま続ける。
+        """
+        before = (self.active_profile, json.dumps(self.games, sort_keys=True))
+        self.load_config()
+        if (self.active_profile, json.dumps(self.games, sort_keys=True)) == before:
+            return False
+        self.reset_state()
+        return True
+
+    def start(self, background=True):
+        """background=False の場合はスレッドを起こさず、run_once / run_for で駆動する"""
         if not self._running:
             self._running = True
-            self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
-            self._thread.start()
+            self._shut_down = False
+            self.recover_processes()
+            self.open_history()
+            self.open_checkpoint()
+            if background:
+                self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            # 再開で付け直したゲームにも終了待機スレッドを使うので、スレッドを作ってから再開する
+            self.resume_from_checkpoint()
+            self._schedule_poll(0)
+            self._schedule_daily_reset()
+            if background:
+                self._thread.start()
 
     def stop(self):
+        """監視を止める。片付けは監視ループを抜けてから行う
+
+        ティックの途中で優先度や一時停止を戻しても、そのティックが後から掛け直してしまうため。
+        """
         self._running = False
-        if self._thread:
-            self._thread.join(timeout=2)
+        self._wake.set()
+        thread = self._thread
+        # 完了コールバック経由で監視スレッド自身から呼ばれることがある（そのときはここで片付けてよい）
+        if thread and thread.is_alive() and threading.current_thread() is not thread:
+            # 対象プロセスの終了待ち (kill_timeout) より長く待つ
+            thread.join(timeout=self.kill_timeout + 10)
+            if thread.is_alive():
+                print("Monitor thread is still busy. It will clean up when it stops.")
+                return
+        self._shutdown()
+
+    def _shutdown(self):
+        with self._shutdown_lock:
+            if self._shut_down:
+                return
+            self._shut_down = True
+        self.clear_tracked_process()
+        self._cancel_launch_timers()
+        self._stop_log_watch()
+        self.restore_priorities()
+        self.resume_background()
+        self.scheduler.clear()
+        self.close_history()
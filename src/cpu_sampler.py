@@ -0,0 +1,95 @@
+import threading
+from array import array
+
+import psutil
+
+
+def percentile(values, p):
+    """values の p パーセンタイル (最近傍順位)。空なら None"""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, int(round(p / 100 * (len(values) - 1)))))
+    return values[rank]
+
+
+def read_system_cpu():
+    # 前回呼び出しからの平均なのでブロックしない
+    return psutil.cpu_percent(interval=None)
+
+
+class CpuSampler:
+    """システム全体のCPU使用率を一定間隔で固定長のリングバッファに記録する
+
+    監視ループは ewma / percentile() を読むだけなので、判定のためにブロックしない。
+    start() するとバックグラウンドスレッドで sample() を繰り返す。
+    スレッドを使わない場合は呼び出し側が sample() を呼べばよい。
+    """
+
+    def __init__(self, read=None, interval=0.5, size=240, alpha=0.3):
+        self.read = read or read_system_cpu
+        self.interval = interval
+        self.alpha = alpha
+        self.samples = array('f', bytes(4 * size))
+        self.count = 0
+        self.ewma = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.ewma = None
+        # psutil は初回の値が意味を持たないので、ここで基準点を取っておく
+        self.read()
+
+    def sample(self):
+        value = self.read()
+        self.add(value)
+        return value
+
+    def add(self, value):
+        with self._lock:
+            self.samples[self.count % len(self.samples)] = value
+            self.count += 1
+            if self.ewma is None:
+                self.ewma = float(value)
+            else:
+                self.ewma += self.alpha * (value - self.ewma)
+
+    def recent(self, n=None):
+        """直近 n 個 (省略時は保持している全部) を古い順に返す"""
+        with self._lock:
+            size = len(self.samples)
+            available = min(self.count, size)
+            n = available if n is None else min(n, available)
+            start = self.count - n
+            return [self.samples[i % size] for i in range(start, self.count)]
+
+    def percentile(self, p, n=None):
+        return percentile(self.recent(n), p)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.reset()
+        # 止めたスレッドが確実に終わるよう、起動ごとに新しいイベントを渡す
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _run(self, stop):
+        while not stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"CPU sampler error: {e}")
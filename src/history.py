@@ -0,0 +1,158 @@
+import queue
+import sqlite3
+import threading
+from datetime import timedelta
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    game TEXT,
+    kind TEXT NOT NULL,
+    result TEXT,
+    duration REAL,
+    attempts INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_profile_game_day ON events (profile, game, day);
+CREATE INDEX IF NOT EXISTS idx_events_profile_kind_day ON events (profile, kind, day, game, result, duration);
+"""
+
+# 最後まで遊んだプレイの結果（スキップ・リセット・やり直しは平均プレイ時間に入れない）
+PLAYED_RESULTS = ("exited", "idle", "log")
+
+# SQL は定数にして sqlite3 の文キャッシュ (プリペアドステートメント) を使い回す
+INSERT_EVENT = ("INSERT INTO events (ts, day, profile, game, kind, result, duration, attempts, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+AVERAGE_DURATIONS = ("SELECT game, AVG(duration), COUNT(*) FROM events "
+                     "WHERE profile = ? AND kind = 'session' AND day >= ? AND duration IS NOT NULL "
+                     f"AND result IN ({', '.join(repr(r) for r in PLAYED_RESULTS)}) "
+                     "GROUP BY game")
+COMPLETION_DAYS = ("SELECT DISTINCT day FROM events "
+                   "WHERE profile = ? AND kind = 'completion' AND day <= ? ORDER BY day DESC")
+DAY_EVENTS = ("SELECT ts, game, kind, result, duration, attempts, detail FROM events "
+              "WHERE profile = ? AND kind = ? AND day = ? ORDER BY ts")
+
+
+def routine_day(dt, reset_hour):
+    """日課の日付（リセット時刻より前は前日扱い）を YYYY-MM-DD で返す"""
+    return (dt - timedelta(hours=reset_hour)).date().isoformat()
+
+
+class HistoryStore:
+    """プレイ・起動・スキップ・終了させたプロセスの記録を SQLite に残す
+
+    書き込みは専用スレッドがキューからまとめて取り出し、1トランザクションで挿入する
+    (監視ループは待たない)。WAL モードなので、読み込みは別の接続から書き込みと並行して行える。
+    """
+
+    BATCH_SIZE = 256
+    # 次の行を待つ時間。これだけ来なければ溜まった分を書き込む
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        if self._error:
+            raise self._error
+        self._reader = self._connect()
+        self._reader_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, ts, day, profile, kind, game=None, result=None, duration=None, attempts=None, detail=None):
+        self._queue.put((ts, day, profile, game, kind, result, duration, attempts, detail))
+
+    def flush(self, timeout=5):
+        """キューに入っている行がすべて書き込まれるまで待つ"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+        with self._reader_lock:
+            self._reader.close()
+
+    def _run(self):
+        try:
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            running = True
+            while running:
+                item = self._queue.get()
+                batch, waiters = [], []
+                while True:
+                    if item is None:
+                        running = False
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if not running or len(batch) >= self.BATCH_SIZE:
+                        break
+                    try:
+                        item = self._queue.get(timeout=self.FLUSH_INTERVAL if not waiters else 0)
+                    except queue.Empty:
+                        break
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(INSERT_EVENT, batch)
+                    except sqlite3.Error as e:
+                        print(f"Failed to write history: {e}")
+                for waiter in waiters:
+                    waiter.set()
+        finally:
+            conn.close()
+
+    # ---- Queries ----
+
+    def _query(self, sql, params):
+        with self._reader_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def average_durations(self, profile, today, days=30):
+        """直近 days 日のゲームごとの平均プレイ時間 {ゲーム名: (秒, 回数)}。PLAYED_RESULTS のプレイだけを数える"""
+        since = (today - timedelta(days=days - 1)).isoformat()
+        return {game: (avg, count) for game, avg, count in self._query(AVERAGE_DURATIONS, (profile, since))}
+
+    def completion_streak(self, profile, today):
+        """日課を完了した日が何日連続しているか（今日まだ完了していなければ昨日までで数える）"""
+        with self._reader_lock:
+            cursor = self._reader.execute(COMPLETION_DAYS, (profile, today.isoformat()))
+            expected = today
+            streak = 0
+            for (day,) in cursor:
+                if streak == 0 and day != expected.isoformat():
+                    expected = today - timedelta(days=1)
+                if day != expected.isoformat():
+                    break
+                streak += 1
+                expected -= timedelta(days=1)
+            return streak
+
+    def events(self, profile, kind, day):
+        return self._query(DAY_EVENTS, (profile, kind, day))
@@ -0,0 +1,160 @@
+import os
+import re
+import sys
+import select
+import ctypes
+import threading
+
+
+# inotify (Linux)。ディレクトリを監視して、書き込み・ローテーション・再作成で起こしてもらう
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+HAS_INOTIFY = sys.platform.startswith("linux")
+
+# ログ行の種類。1行が複数に一致した場合はこの順で優先する
+KINDS = ("error", "done", "loaded")
+
+
+def _inotify_watch(directory):
+    """directory を監視する inotify の fd を返す。使えなければ None"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class LogWatchRule:
+    """ゲーム設定の log_watch ({"path", "loaded", "done", "error"}) を解釈する"""
+
+    def __init__(self, config):
+        self.path = os.path.expandvars(os.path.expanduser(config.get("path", "")))
+        self.patterns = {}
+        for kind in KINDS:
+            if config.get(kind):
+                try:
+                    self.patterns[kind] = re.compile(config[kind])
+                except re.error as e:
+                    print(f"Invalid log_watch pattern for {kind}: {e}")
+
+    def classify(self, line):
+        for kind in KINDS:
+            pattern = self.patterns.get(kind)
+            if pattern is not None and pattern.search(line):
+                return kind
+        return None
+
+
+class LogFollower:
+    """ログファイルの末尾に追記された行だけを読む (tail -F 相当)
+
+    開始時点の末尾から読み始める。ファイルが置き換えられた (inode が変わった) ときや
+    切り詰められたときは先頭から読み直す。ゲームがログを回せるよう、ファイルは読むときだけ開く。
+    start() するとスレッドで追いかけ、行ごとに on_line(line) を呼ぶ。
+    スレッドを使わない場合は check() を呼ぶと新しい行のリストを返す。
+    """
+
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, path, on_line=None, poll_interval=0.5, use_inotify=HAS_INOTIFY):
+        self.path = path
+        self.on_line = on_line
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self._identity = None
+        self._offset = 0
+        self._partial = b""
+        self._stop = threading.Event()
+        self._thread = None
+        self.rotations = 0
+        try:
+            st = os.stat(path)
+            self._identity = (st.st_dev, st.st_ino)
+            self._offset = st.st_size
+        except OSError:
+            # まだ存在しない場合は、作られたら先頭から読む
+            pass
+
+    def check(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        identity = (st.st_dev, st.st_ino)
+        if identity != self._identity or st.st_size < self._offset:
+            if self._identity is not None:
+                self.rotations += 1
+            self._identity = identity
+            self._offset = 0
+            self._partial = b""
+        if st.st_size == self._offset:
+            return []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = b""
+                while True:
+                    chunk = f.read(self.READ_SIZE)
+                    if not chunk:
+                        break
+                    data += chunk
+                self._offset = f.tell()
+        except OSError:
+            return []
+        # 改行で終わっていない最後の行は次回に持ち越す
+        *complete, self._partial = (self._partial + data).split(b"\n")
+        lines = [line.rstrip(b"\r").decode("utf-8", "replace") for line in complete]
+        if self.on_line:
+            for line in lines:
+                self.on_line(line)
+        return lines
+
+    def start(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _run(self, stop):
+        fd = None
+        if self.use_inotify:
+            fd = _inotify_watch(os.path.dirname(os.path.abspath(self.path)))
+        try:
+            while not stop.is_set():
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"Log watch error ({self.path}): {e}")
+                if fd is None:
+                    stop.wait(self.poll_interval)
+                    continue
+                # イベントが来るまで待つ (stop を確認するため poll_interval ごとに起きる)
+                readable, _, _ = select.select([fd], [], [], self.poll_interval)
+                if readable:
+                    try:
+                        while os.read(fd, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+        finally:
+            if fd is not None:
+                os.close(fd)
@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+
+
+MB = 1024 * 1024
+
+# Linux では posix_fadvise(WILLNEED) でカーネルに先読みさせる（データをプロセスにコピーしない）
+HAS_FADVISE = hasattr(os, "posix_fadvise") and hasattr(os, "POSIX_FADV_WILLNEED")
+
+
+def iter_files(paths):
+    """ファイルはそのまま、ディレクトリは中のファイルを再帰的に列挙する"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in files:
+                    yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+
+
+class Prewarmer:
+    """次のゲームのファイルを OS のページキャッシュに読み込んでおく
+
+    バックグラウンドのスレッドで CHUNK_SIZE ずつ読み、rate (バイト/秒) を超えないよう間隔を空ける。
+    cancel() するとすぐに止まる。結果は report() で取得できる。
+    """
+
+    CHUNK_SIZE = MB
+
+    def __init__(self, paths, rate=64 * MB, max_bytes=None, on_done=None, use_fadvise=HAS_FADVISE, name=""):
+        self.name = name
+        self.paths = [p for p in paths if p]
+        self.rate = rate
+        self.max_bytes = max_bytes
+        self.on_done = on_done
+        self.use_fadvise = use_fadvise
+        self.bytes_warmed = 0
+        self.files = 0
+        self.elapsed = 0.0
+        self.done = False
+        self._cancelled = threading.Event()
+        self._thread = None
+        self._started = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run(self):
+        self._started = time.monotonic()
+        buffer = None if self.use_fadvise else bytearray(self.CHUNK_SIZE)
+        try:
+            for path in iter_files(self.paths):
+                if self.cancelled or self._budget() == 0:
+                    break
+                try:
+                    self._warm_file(path, buffer)
+                    self.files += 1
+                except OSError as e:
+                    print(f"Prewarm skipped {path}: {e}")
+        except Exception as e:
+            print(f"Prewarm error: {e}")
+        self.elapsed = time.monotonic() - self._started
+        self.done = True
+        if self.on_done:
+            self.on_done(self)
+
+    def _budget(self):
+        if self.max_bytes is None:
+            return None
+        return max(0, self.max_bytes - self.bytes_warmed)
+
+    def _warm_file(self, path, buffer):
+        with open(path, "rb") as f:
+            fd = f.fileno()
+            size = os.fstat(fd).st_size
+            offset = 0
+            view = memoryview(buffer) if buffer is not None else None
+            while offset < size and not self.cancelled:
+                length = min(self.CHUNK_SIZE, size - offset)
+                budget = self._budget()
+                if budget is not None:
+                    if budget == 0:
+                        return
+                    length = min(length, budget)
+                if self.use_fadvise:
+                    os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+                else:
+                    length = f.readinto(view[:length])
+                    if not length:
+                        return
+                offset += length
+                self._account(length)
+
+    def _account(self, n):
+        self.bytes_warmed += n
+        if self.rate:
+            # 予定より先に進んでいる分だけ待つ（キャンセルされたらすぐ戻る）
+            ahead = self.bytes_warmed / self.rate - (time.monotonic() - self._started)
+            if ahead > 0:
+                self._cancelled.wait(ahead)
+
+    def report(self):
+        return {
+            "bytes": self.bytes_warmed,
+            "files": self.files,
+            "seconds": round(self.elapsed, 3),
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,142 @@
+import os
+
+from checkpoint import read_json, write_json_atomic
+
+
+# 優先度の段階 -> nice 値 (Windows ではプロバイダーが優先度クラスに読み替える)
+PRIORITY_LEVELS = {
+    "idle": 19,
+    "below_normal": 10,
+    "normal": 0,
+    "above_normal": -5,
+    "high": -10,
+}
+
+
+class RestoreJournal:
+    """プロセスに加えた変更の「元の値」をファイルに残す
+
+    変更する前に書き込むので、途中でクラッシュしても次の起動時に元へ戻せる。
+    エントリは "pid:create_time" ごとに {"pid", "create_time", "name", 項目: 元の値, ...}。
+    同じ項目を何度変更しても最初に記録した値（本当の元の値）を保持する。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._load()
+
+    def _load(self):
+        entries = read_json(self.path)
+        return entries if isinstance(entries, dict) else {}
+
+    def record(self, pid, create_time, name, save=True, **original):
+        """記録が増えたら True。まとめて記録するときは save=False にして最後に save() を1回呼ぶ"""
+        key = f"{pid}:{create_time}"
+        entry = self.entries.setdefault(key, {"pid": pid, "create_time": create_time, "name": name})
+        changed = False
+        for field, value in original.items():
+            if field not in entry:
+                entry[field] = value
+                changed = True
+        if changed and save:
+            self.save()
+        return changed
+
+    def remove(self, pid, create_time, *fields, save=True):
+        """fields を省略するとエントリごと消す"""
+        key = f"{pid}:{create_time}"
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        for field in fields:
+            entry.pop(field, None)
+        if not fields or set(entry) <= {"pid", "create_time", "name"}:
+            del self.entries[key]
+        if save:
+            self.save()
+
+    def discard(self, *fields):
+        """すべてのエントリから fields を消す（戻し終えた・戻せなくなった項目）"""
+        for key, entry in list(self.entries.items()):
+            for field in fields:
+                entry.pop(field, None)
+            if set(entry) <= {"pid", "create_time", "name"}:
+                del self.entries[key]
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            if not self.entries:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            write_json_atomic(self.path, self.entries)
+        except OSError as e:
+            print(f"Failed to write restore journal: {e}")
+
+
+class PriorityManager:
+    """プレイ中だけプロセスの優先度・CPU アフィニティを変え、あとで元に戻す"""
+
+    def __init__(self, provider, journal):
+        self.provider = provider
+        self.journal = journal
+
+    def apply(self, pid, create_time, name, priority=None, affinity=None):
+        """priority は PRIORITY_LEVELS の名前、affinity は CPU 番号のリスト"""
+        return self.apply_all([(pid, create_time, name, priority, affinity)]) > 0
+
+    def apply_all(self, targets):
+        """targets: [(pid, create_time, name, priority, affinity), ...]。変更したプロセスの数を返す
+
+        変更する前に元の値をすべて記録し、ジャーナルは1回だけ書く。
+        """
+        changes = []
+        for pid, create_time, name, priority, affinity in targets:
+            value = self.provider.priority_value(priority) if priority else None
+            cpus = self._valid_cpus(affinity)
+            original = {}
+            if value is not None:
+                current = self.provider.get_priority(pid)
+                if current is not None and current != value:
+                    original["priority"] = current
+            if cpus:
+                current = self.provider.get_affinity(pid)
+                if current is not None and sorted(current) != cpus:
+                    original["affinity"] = current
+            if original:
+                self.journal.record(pid, create_time, name, save=False, **original)
+                changes.append((pid, name, original, value, cpus))
+        if not changes:
+            return 0
+        self.journal.save()
+        for pid, name, original, value, cpus in changes:
+            if "priority" in original and not self.provider.set_priority(pid, value):
+                print(f"Could not change priority of {name} (pid {pid})")
+            if "affinity" in original and not self.provider.set_affinity(pid, cpus):
+                print(f"Could not change CPU affinity of {name} (pid {pid})")
+        return len(changes)
+
+    def _valid_cpus(self, affinity):
+        if not affinity:
+            return None
+        count = os.cpu_count() or 1
+        cpus = sorted({int(cpu) for cpu in affinity if 0 <= int(cpu) < count})
+        return cpus or None
+
+    def restore(self):
+        """記録したすべての変更を戻し、戻したプロセスの数を返す（終了済みのものは捨てる）"""
+        restored = 0
+        for entry in list(self.journal.entries.values()):
+            pid, create_time = entry["pid"], entry["create_time"]
+            if not ({"priority", "affinity"} & set(entry)) or not self.provider.is_alive(pid, create_time):
+                continue
+            if "priority" in entry and not self.provider.set_priority(pid, entry["priority"]):
+                print(f"Could not restore priority of {entry['name']} (pid {pid})")
+            if "affinity" in entry and not self.provider.set_affinity(pid, entry["affinity"]):
+                print(f"Could not restore CPU affinity of {entry['name']} (pid {pid})")
+            restored += 1
+        self.journal.discard("priority", "affinity")
+        return restored
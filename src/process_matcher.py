@@ -0,0 +1,96 @@
+import re
+import fnmatch
+
+
+REGEX_PREFIX = "re:"
+GLOB_CHARS = "*?["
+
+
+def split_patterns(value):
+    """設定値 (文字列 or リスト) をパターンのリストに分解する
+
+    文字列はカンマ区切りで複数指定できる。"re:" で始まる文字列は
+    正規表現中のカンマを壊さないよう、全体を1つのパターンとして扱う。
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        patterns = []
+        for item in value:
+            patterns.extend(split_patterns(item))
+        return patterns
+    value = value.strip()
+    if value.startswith(REGEX_PREFIX):
+        return [value]
+    return [p.strip() for p in value.split(",") if p.strip()]
+
+
+def game_patterns(game):
+    # process_name (UIで編集する欄) と任意の process_names を合わせて使う
+    return split_patterns(game.get("process_name")) + split_patterns(game.get("process_names"))
+
+
+def _pattern_regex(pattern):
+    if pattern.startswith(REGEX_PREFIX):
+        return pattern[len(REGEX_PREFIX):]
+    return fnmatch.translate(pattern.casefold())
+
+
+class ProcessMatcher:
+    """全ゲーム・裏方アプリのパターンをまとめてコンパイルした照合器
+
+    完全一致の名前は dict で O(1)、グロブ/正規表現は1本の結合正規表現で
+    一次判定してから個別に照合する。"re:" の正規表現はグロブと同じくプロセス名全体に
+    一致したときだけ一致とみなす (fullmatch。"re:Game" は GameLauncher.exe に一致しない)。結果はプロセス名ごとにキャッシュするので、
+    同じ名前のプロセスは何度現れてもパターン数に関係なく dict 参照1回で済む。
+    """
+
+    CACHE_LIMIT = 4096
+
+    def __init__(self, entries):
+        # entries: {key: [pattern, ...]}
+        self.literals = {}
+        self.patterns = []
+        for key, patterns in entries.items():
+            for pattern in patterns:
+                if pattern.startswith(REGEX_PREFIX) or any(c in pattern for c in GLOB_CHARS):
+                    try:
+                        self.patterns.append((re.compile(_pattern_regex(pattern), re.IGNORECASE), key))
+                    except re.error as e:
+                        print(f"Invalid process pattern '{pattern}': {e}")
+                else:
+                    self.literals.setdefault(pattern.casefold(), set()).add(key)
+        # 単独では正しくても結合すると壊れるもの ((?i) などのフラグや同名のグループ) があるので、
+        # 結合できなければ一次判定を省いて1つずつ照合する
+        self.combined = None
+        if self.patterns:
+            try:
+                self.combined = re.compile("|".join(f"(?:{p.pattern})" for p, _ in self.patterns), re.IGNORECASE)
+            except re.error:
+                self.combined = None
+        self._cache = {}
+
+    def match(self, name):
+        """プロセス名に一致するキーの frozenset を返す"""
+        keys = self._cache.get(name)
+        if keys is not None:
+            return keys
+        folded = name.casefold()
+        found = set(self.literals.get(folded, ()))
+        if self.patterns and (self.combined is None or self.combined.fullmatch(folded)):
+            found.update(key for pattern, key in self.patterns if pattern.fullmatch(folded))
+        keys = frozenset(found)
+        if len(self._cache) >= self.CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[name] = keys
+        return keys
+
+    def index(self, processes):
+        """(pid, name) のリストから キー -> PID一覧 の索引を作る"""
+        by_key = {}
+        for pid, name in processes:
+            if not name:
+                continue
+            for key in self.match(name):
+                by_key.setdefault(key, []).append(pid)
+        return by_key
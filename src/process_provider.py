@@ -0,0 +1,655 @@
+import os
+import sys
+import time
+import select
+import signal
+import threading
+
+import psutil
+
+from priority import PRIORITY_LEVELS
+
+
+class ProcessProvider:
+    """GameMonitor が使うプロセス操作（一覧・検索・生存確認・終了）の共通インターフェース
+
+    create_time はバックエンドごとの「プロセスの同一性を示す値」で、
+    PID 再利用の判定にのみ使う。
+    """
+
+    name = "base"
+
+    def list_processes(self):
+        """(pid, name) のリストを返す"""
+        processes = []
+        for pid in self.pids():
+            info = self.describe(pid)
+            if info is not None:
+                processes.append((pid, info[0]))
+        return processes
+
+    def pids(self):
+        raise NotImplementedError
+
+    def identities(self):
+        """{pid: 同一性を示す値}。PID 再利用の検出に使う（取れないものは None で、再利用は検出しない）
+
+        値は同じプロセスの間は変わらず、PID が再利用されると変わるもの。一覧と同じくらい安く取れること。
+        """
+        return dict.fromkeys(self.pids())
+
+    def describe(self, pid):
+        """(name, create_time, ppid) を返す。取得できない場合は None"""
+        raise NotImplementedError
+
+    def create_time(self, pid):
+        info = self.describe(pid)
+        return info[1] if info else None
+
+    def is_alive(self, pid, create_time):
+        raise NotImplementedError
+
+    def rss(self, pid):
+        """常駐メモリ (バイト)。取得できない場合は None"""
+        return None
+
+    def activity(self, pid):
+        """(CPU 時間の累計 (秒), I/O の累計 (バイト))。取得できない場合は None"""
+        return None
+
+    def num_threads(self, pid):
+        return None
+
+    def priority_value(self, level):
+        """PRIORITY_LEVELS の名前をこのバックエンドの優先度の値にする"""
+        return PRIORITY_LEVELS.get(level)
+
+    def get_priority(self, pid):
+        return None
+
+    def set_priority(self, pid, value):
+        return False
+
+    def get_affinity(self, pid):
+        """使用できる CPU 番号のリスト。取得できない場合は None"""
+        return None
+
+    def set_affinity(self, pid, cpus):
+        return False
+
+    def suspend(self, pid):
+        return False
+
+    def resume(self, pid):
+        return False
+
+    def terminate(self, pid):
+        raise NotImplementedError
+
+    def kill(self, pid):
+        raise NotImplementedError
+
+    def wait_procs(self, procs, timeout):
+        """(pid, create_time) のリストの終了をまとめて待ち、生き残ったものを返す"""
+        deadline = time.monotonic() + timeout
+        alive = []
+        for pid, create_time in procs:
+            remaining = max(0.0, deadline - time.monotonic())
+            if not self.wait_for_exit(pid, create_time, remaining):
+                alive.append((pid, create_time))
+        return alive
+
+    def wait_for_exit(self, pid, create_time, timeout):
+        """プロセスの終了を最大 timeout 秒待つ。終了していれば True"""
+        deadline = time.monotonic() + timeout
+        while self.is_alive(pid, create_time):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(0.05, remaining))
+        return True
+
+
+def _wait_pidfd(pid, timeout, is_alive):
+    # Linux: pidfd は対象が終了した瞬間に読み込み可能になる
+    # 戻り値: True=終了 / False=タイムアウト / None=pidfd 非対応
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        fd = os.pidfd_open(pid)
+    except OSError:
+        return None if psutil.pid_exists(pid) else True
+    try:
+        # open 直後に create_time を照合して PID 再利用を除外する
+        if not is_alive():
+            return True
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        return bool(poller.poll(int(timeout * 1000)))
+    finally:
+        os.close(fd)
+
+
+class PsutilProcessProvider(ProcessProvider):
+    """psutil による標準バックエンド（Windows / その他）"""
+
+    name = "psutil"
+
+    def list_processes(self):
+        processes = []
+        for proc in psutil.process_iter(['name']):
+            try:
+                processes.append((proc.pid, proc.info['name']))
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+        return processes
+
+    def pids(self):
+        return psutil.pids()
+
+    def identities(self):
+        # process_iter は (pid, create_time) で Process をキャッシュするので、2回目以降は安い
+        times = {}
+        for proc in psutil.process_iter(['create_time']):
+            times[proc.pid] = proc.info['create_time']
+        return times
+
+    def describe(self, pid):
+        try:
+            proc = psutil.Process(pid)
+            return proc.name(), proc.create_time(), proc.ppid()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def is_alive(self, pid, create_time):
+        try:
+            proc = psutil.Process(pid)
+            return proc.create_time() == create_time and proc.status() != psutil.STATUS_ZOMBIE
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        except psutil.AccessDenied:
+            return psutil.pid_exists(pid)
+
+    def rss(self, pid):
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def activity(self, pid):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                times = proc.cpu_times()
+                try:
+                    io = proc.io_counters()
+                    io_bytes = io.read_bytes + io.write_bytes
+                except (AttributeError, psutil.AccessDenied):
+                    # macOS などは io_counters がない
+                    io_bytes = 0
+            return times.user + times.system, io_bytes
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def num_threads(self, pid):
+        try:
+            return psutil.Process(pid).num_threads()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def priority_value(self, level):
+        if sys.platform == "win32":
+            classes = {
+                "idle": "IDLE_PRIORITY_CLASS",
+                "below_normal": "BELOW_NORMAL_PRIORITY_CLASS",
+                "normal": "NORMAL_PRIORITY_CLASS",
+                "above_normal": "ABOVE_NORMAL_PRIORITY_CLASS",
+                "high": "HIGH_PRIORITY_CLASS",
+            }
+            return getattr(psutil, classes[level], None) if level in classes else None
+        return super().priority_value(level)
+
+    def get_priority(self, pid):
+        try:
+            return int(psutil.Process(pid).nice())
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def set_priority(self, pid, value):
+        try:
+            psutil.Process(pid).nice(value)
+            return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def get_affinity(self, pid):
+        try:
+            return psutil.Process(pid).cpu_affinity()
+        except (AttributeError, psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            # macOS には cpu_affinity がない
+            return None
+
+    def set_affinity(self, pid, cpus):
+        try:
+            psutil.Process(pid).cpu_affinity(list(cpus))
+            return True
+        except (AttributeError, ValueError, psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def suspend(self, pid):
+        try:
+            psutil.Process(pid).suspend()
+            return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def resume(self, pid):
+        try:
+            psutil.Process(pid).resume()
+            return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def terminate(self, pid):
+        try:
+            psutil.Process(pid).terminate()
+            return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def kill(self, pid):
+        try:
+            psutil.Process(pid).kill()
+            return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def wait_procs(self, procs, timeout):
+        targets = {}
+        for pid, create_time in procs:
+            try:
+                proc = psutil.Process(pid)
+                if proc.create_time() == create_time:
+                    targets[proc] = (pid, create_time)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+        if not targets:
+            return []
+        _, alive = psutil.wait_procs(list(targets), timeout=timeout)
+        return [targets[proc] for proc in alive]
+
+    def wait_for_exit(self, pid, create_time, timeout):
+        exited = _wait_pidfd(pid, timeout, lambda: self.is_alive(pid, create_time))
+        if exited is not None:
+            return exited
+        try:
+            proc = psutil.Process(pid)
+            if proc.create_time() != create_time:
+                return True
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return True
+        except psutil.AccessDenied:
+            return super().wait_for_exit(pid, create_time, timeout)
+        gone, _ = psutil.wait_procs([proc], timeout=timeout)
+        return bool(gone)
+
+
+class ProcfsProcessProvider(ProcessProvider):
+    """Linux 用の軽量バックエンド
+
+    /proc を os.scandir で列挙するだけなので pids() が軽い。
+    名前 (comm) は ProcessTable が新しい PID に対してだけ describe() で読む。
+    """
+
+    name = "procfs"
+
+    def __init__(self, root="/proc"):
+        self.root = root
+        self._clk_tck = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._boot_time = self._read_boot_time()
+
+    def _read_boot_time(self):
+        try:
+            with open(os.path.join(self.root, "stat"), "rb") as f:
+                for line in f:
+                    if line.startswith(b"btime"):
+                        return float(line.split()[1])
+        except OSError:
+            pass
+        return 0.0
+
+    def _read_comm(self, pid):
+        try:
+            with open(os.path.join(self.root, str(pid), "comm"), "rb") as f:
+                name = f.read().rstrip(b"\n").decode("utf-8", "replace")
+        except OSError:
+            return None
+        # comm は15文字で切り詰められるので、その場合だけ cmdline から補う
+        if len(name) == 15:
+            try:
+                with open(os.path.join(self.root, str(pid), "cmdline"), "rb") as f:
+                    exe = f.read().split(b"\0", 1)[0].decode("utf-8", "replace")
+                base = os.path.basename(exe.replace("\\", "/"))
+                if base.startswith(name):
+                    name = base
+            except OSError:
+                pass
+        return name
+
+    def _read_stat(self, pid):
+        # (state, create_time, ppid) を返す
+        try:
+            with open(os.path.join(self.root, str(pid), "stat"), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        fields = data[data.rfind(b")") + 2:].split()
+        starttime = int(fields[19])
+        return fields[0], self._boot_time + starttime / self._clk_tck, int(fields[1])
+
+    def pids(self):
+        with os.scandir(self.root) as it:
+            return [int(entry.name) for entry in it if entry.name.isdigit()]
+
+    def identities(self):
+        # /proc/<pid> の inode 番号は scandir が返す d_ino なのでファイルを開かずに取れる
+        # (プロセスごとに新しい inode になるので、PID が再利用されれば変わる)
+        with os.scandir(self.root) as it:
+            return {int(entry.name): entry.inode() for entry in it if entry.name.isdigit()}
+
+    def describe(self, pid):
+        name = self._read_comm(pid)
+        stat = self._read_stat(pid)
+        if name is None or stat is None:
+            return None
+        return name, stat[1], stat[2]
+
+    def is_alive(self, pid, create_time):
+        stat = self._read_stat(pid)
+        if stat is None:
+            return False
+        state, started, _ = stat
+        return state != b"Z" and abs(started - create_time) < 0.05
+
+    def rss(self, pid):
+        # statm の2番目の値が常駐ページ数
+        try:
+            with open(os.path.join(self.root, str(pid), "statm"), "rb") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def activity(self, pid):
+        # stat の utime / stime (クロック数) と io の rchar / wchar (ソケットも含む)
+        try:
+            with open(os.path.join(self.root, str(pid), "stat"), "rb") as f:
+                data = f.read()
+            fields = data[data.rfind(b")") + 2:].split()
+            cpu = (int(fields[11]) + int(fields[12])) / self._clk_tck
+        except (OSError, IndexError, ValueError):
+            return None
+        io_bytes = 0
+        try:
+            with open(os.path.join(self.root, str(pid), "io"), "rb") as f:
+                for line in f:
+                    if line.startswith((b"rchar:", b"wchar:")):
+                        io_bytes += int(line.split()[1])
+        except (OSError, IndexError, ValueError):
+            # 他ユーザーのプロセスの io は読めない
+            pass
+        return cpu, io_bytes
+
+    def num_threads(self, pid):
+        try:
+            with open(os.path.join(self.root, str(pid), "stat"), "rb") as f:
+                data = f.read()
+            return int(data[data.rfind(b")") + 2:].split()[17])
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def get_priority(self, pid):
+        try:
+            return os.getpriority(os.PRIO_PROCESS, pid)
+        except OSError:
+            return None
+
+    def set_priority(self, pid, value):
+        # nice を下げる（優先度を上げる）には権限が要る
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, value)
+            return True
+        except OSError:
+            return False
+
+    def get_affinity(self, pid):
+        try:
+            return sorted(os.sched_getaffinity(pid))
+        except OSError:
+            return None
+
+    def set_affinity(self, pid, cpus):
+        try:
+            os.sched_setaffinity(pid, cpus)
+            return True
+        except OSError:
+            return False
+
+    def suspend(self, pid):
+        return self._signal(pid, signal.SIGSTOP)
+
+    def resume(self, pid):
+        return self._signal(pid, signal.SIGCONT)
+
+    def terminate(self, pid):
+        return self._signal(pid, signal.SIGTERM)
+
+    def kill(self, pid):
+        return self._signal(pid, signal.SIGKILL)
+
+    def _signal(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+            return True
+        except OSError:
+            return False
+
+    def wait_for_exit(self, pid, create_time, timeout):
+        exited = _wait_pidfd(pid, timeout, lambda: self.is_alive(pid, create_time))
+        if exited is not None:
+            return exited
+        return super().wait_for_exit(pid, create_time, timeout)
+
+
+class FakeProcessProvider(ProcessProvider):
+    """テスト・ベンチマーク用のインメモリ実装（PID と create_time は決定的に採番）"""
+
+    name = "fake"
+
+    def __init__(self):
+        self._procs = {}
+        self._next_pid = 1000
+        self._cond = threading.Condition()
+        self.terminated = []
+        self.killed = []
+        self.stubborn = set()
+        self.memory = {}
+        # pid -> (CPU 秒, I/O バイト)。テストで値を書き換える
+        self.counters = {}
+        self.priorities = {}
+        self.affinities = {}
+        self.suspended = set()
+        self.threads = {}
+
+    def spawn(self, name, parent=0, stubborn=False, rss=0, pid=None):
+        """stubborn=True のプロセスは terminate を無視し、kill でのみ終了する
+
+        pid を指定すると、終了したプロセスの PID の再利用を再現できる (create_time は新しくなる)
+        """
+        with self._cond:
+            create_time = float(self._next_pid)
+            if pid is None:
+                pid = self._next_pid
+            self._next_pid += 1
+            self._procs[pid] = (name, create_time, parent)
+            self.memory[pid] = rss
+            if stubborn:
+                self.stubborn.add(pid)
+            return pid
+
+    def exit(self, pid):
+        with self._cond:
+            self._procs.pop(pid, None)
+            self._cond.notify_all()
+
+    def exit_name(self, name):
+        for pid in [p for p, info in list(self._procs.items()) if info[0].casefold() == name.casefold()]:
+            self.exit(pid)
+
+    def running_names(self):
+        return [info[0] for info in list(self._procs.values())]
+
+    def pids(self):
+        return list(self._procs)
+
+    def identities(self):
+        return {pid: info[1] for pid, info in list(self._procs.items())}
+
+    def describe(self, pid):
+        return self._procs.get(pid)
+
+    def is_alive(self, pid, create_time):
+        info = self._procs.get(pid)
+        return info is not None and info[1] == create_time
+
+    def rss(self, pid):
+        return self.memory.get(pid) if pid in self._procs else None
+
+    def activity(self, pid):
+        return self.counters.get(pid, (0.0, 0)) if pid in self._procs else None
+
+    def num_threads(self, pid):
+        return self.threads.get(pid, 1) if pid in self._procs else None
+
+    def get_priority(self, pid):
+        return self.priorities.get(pid, 0) if pid in self._procs else None
+
+    def set_priority(self, pid, value):
+        if pid not in self._procs:
+            return False
+        self.priorities[pid] = value
+        return True
+
+    def get_affinity(self, pid):
+        return self.affinities.get(pid, list(range(os.cpu_count() or 1))) if pid in self._procs else None
+
+    def set_affinity(self, pid, cpus):
+        if pid not in self._procs:
+            return False
+        self.affinities[pid] = sorted(cpus)
+        return True
+
+    def suspend(self, pid):
+        if pid not in self._procs:
+            return False
+        self.suspended.add(pid)
+        return True
+
+    def resume(self, pid):
+        if pid not in self._procs:
+            return False
+        self.suspended.discard(pid)
+        return True
+
+    def terminate(self, pid):
+        if pid not in self._procs:
+            return False
+        self.terminated.append(pid)
+        if pid not in self.stubborn:
+            self.exit(pid)
+        return True
+
+    def kill(self, pid):
+        if pid not in self._procs:
+            return False
+        self.killed.append(pid)
+        self.exit(pid)
+        return True
+
+    def wait_for_exit(self, pid, create_time, timeout):
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.is_alive(pid, create_time), timeout)
+
+
+class ProcessTable:
+    """PID -> (name, create_time, ppid) を保持し、ティック間の PID 集合の差分だけを調べる
+
+    新しく現れた PID と、identities() の値が変わった (再利用された) PID だけ describe() し、
+    消えた PID は捨てるので、定常時のコストは総プロセス数ではなくプロセスの入れ替わり数に比例する。
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.entries = {}
+        # pid -> describe() したときの identities() の値
+        self.identities = {}
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+        self.reused = 0
+
+    def refresh(self):
+        """最新の (pid, name) リストを返す"""
+        entries = self.entries
+        identities = self.identities
+        current = self.provider.identities()
+        for pid in entries.keys() - current.keys():
+            del entries[pid]
+            identities.pop(pid, None)
+            self.dropped += 1
+        for pid, identity in current.items():
+            if pid in entries:
+                if identity is None or identity == identities.get(pid):
+                    self.hits += 1
+                    continue
+                # ティックの間に終了して同じ PID で別のプロセスが起動した
+                del entries[pid]
+                self.reused += 1
+            info = self.provider.describe(pid)
+            self.misses += 1
+            if info is not None:
+                entries[pid] = info
+                identities[pid] = identity
+        return [(pid, info[0]) for pid, info in entries.items()]
+
+    def create_time(self, pid):
+        info = self.entries.get(pid)
+        return info[1] if info else self.provider.create_time(pid)
+
+    def parents(self):
+        return {pid: info[2] for pid, info in self.entries.items()}
+
+    def stats(self):
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "dropped": self.dropped,
+                "reused": self.reused}
+
+
+PROVIDERS = {
+    "psutil": PsutilProcessProvider,
+    "procfs": ProcfsProcessProvider,
+    "fake": FakeProcessProvider,
+}
+
+
+def create_provider(name="auto"):
+    """設定名からバックエンドを生成する。auto は環境で最も軽いものを選ぶ"""
+    if name == "auto":
+        if sys.platform.startswith("linux") and os.path.isdir("/proc"):
+            name = "procfs"
+        else:
+            name = "psutil"
+    cls = PROVIDERS.get(name)
+    if cls is None:
+        print(f"Unknown process backend: {name}. Falling back to psutil.")
+        cls = PsutilProcessProvider
+    return cls()
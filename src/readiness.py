@@ -0,0 +1,170 @@
+import time
+
+import psutil
+
+from cpu_sampler import CpuSampler, percentile
+
+
+MB = 1024 * 1024
+
+# 指標名 -> (単位, 向き)。"max" は閾値以下、"min" は閾値以上で条件を満たす
+SIGNALS = {
+    "cpu": ("%", "max"),
+    "disk_io": ("MB/s", "max"),
+    "memory": ("MB", "min"),
+    "network": ("MB/s", "max"),
+}
+
+
+class RateCounter:
+    """累積カウンタ (バイト数) を読み、前回の呼び出しからの増加量を MB/s で返す"""
+
+    def __init__(self, read_total, clock=time.monotonic):
+        self.read_total = read_total
+        self.clock = clock
+        self._last = None
+
+    def __call__(self):
+        total = self.read_total()
+        now = self.clock()
+        last, self._last = self._last, (total, now)
+        if last is None or now <= last[1]:
+            return 0.0
+        return max(0.0, (total - last[0]) / (now - last[1]) / MB)
+
+    def fresh(self):
+        """同じカウンタを読む、基準点が別の RateCounter"""
+        return RateCounter(self.read_total, self.clock)
+
+
+class CpuPercent:
+    """psutil.cpu_times() の差分から、前回の呼び出し以降のシステム全体の CPU 使用率 (%) を返す
+
+    psutil.cpu_percent(interval=None) は基準点がプロセス全体で1つしかなく、
+    複数の読み手が呼ぶとお互いの区間を縮めてしまうので、読み手ごとに基準点を持つ。
+    """
+
+    def __init__(self, read_times=psutil.cpu_times):
+        self.read_times = read_times
+        self._last = None
+
+    def __call__(self):
+        times = self.read_times()
+        # guest は user に含まれているので二重に数えない
+        total = sum(times) - getattr(times, "guest", 0) - getattr(times, "guest_nice", 0)
+        idle = times.idle + getattr(times, "iowait", 0)
+        last, self._last = self._last, (total, idle)
+        if last is None or total <= last[0]:
+            return 0.0
+        return max(0.0, min(100.0, 100.0 * (1 - (idle - last[1]) / (total - last[0]))))
+
+    def fresh(self):
+        return CpuPercent(self.read_times)
+
+
+def own_read_bytes(process=None):
+    """このプロセス自身が実際に読んだバイト数。取得できない環境では 0"""
+    try:
+        return (process or psutil.Process()).io_counters().read_bytes
+    except (AttributeError, psutil.Error, OSError):
+        return 0
+
+
+def disk_io_total():
+    counters = psutil.disk_io_counters()
+    if not counters:
+        return 0
+    # 自分の読み込み (prewarm の先読みなど) は負荷として数えない
+    return counters.read_bytes + counters.write_bytes - own_read_bytes()
+
+
+def net_io_total():
+    counters = psutil.net_io_counters()
+    return counters.bytes_sent + counters.bytes_recv if counters else 0
+
+
+def memory_available_mb():
+    return psutil.virtual_memory().available / MB
+
+
+def learned_interval(history, floor, cap, p=90, min_samples=3):
+    """記録した「負荷が落ち着くまでの秒数」から待ち時間を求める。記録が足りなければ None"""
+    if len(history) < min_samples:
+        return None
+    return min(max(percentile(history, p), floor), cap)
+
+
+def create_sampler(name, interval):
+    readers = {
+        "cpu": CpuPercent(),
+        "disk_io": RateCounter(disk_io_total),
+        "memory": memory_available_mb,
+        "network": RateCounter(net_io_total),
+    }
+    return CpuSampler(read=readers[name], interval=interval)
+
+
+class ReadinessGate:
+    """複数の指標を重み付きで合成し、次のゲームを起動してよいかを判定する
+
+    閾値を満たした指標の重みの合計を全体の重みで割った値 (0.0-1.0) をスコアとし、
+    min_score 以上なら準備完了とみなす。値は各サンプラーの EWMA
+    (percentile を指定した場合は直近 window 個のパーセンタイル) を使う。
+    """
+
+    def __init__(self, signals, samplers, min_score=1.0, percentile=None, window=None):
+        # signals: [(name, threshold, weight), ...]
+        self.signals = [(name, threshold, weight) for name, threshold, weight in signals if weight > 0]
+        self.samplers = samplers
+        self.min_score = min_score
+        self.percentile = percentile
+        self.window = window
+        self.running = False
+
+    def start(self, threaded=True):
+        """threaded=False の場合はスレッドを起こさず、呼び出し側が sample() する"""
+        for name, _, _ in self.signals:
+            if threaded:
+                self.samplers[name].start()
+            else:
+                self.samplers[name].reset()
+        self.running = threaded
+
+    def stop(self):
+        for name, _, _ in self.signals:
+            self.samplers[name].stop()
+        self.running = False
+
+    def sample(self):
+        for name, _, _ in self.signals:
+            self.samplers[name].sample()
+
+    def value(self, name):
+        sampler = self.samplers[name]
+        if self.percentile:
+            return sampler.percentile(self.percentile, self.window)
+        return sampler.ewma
+
+    def evaluate(self):
+        """(スコア, {指標名: 値}) を返す。まだ値のない指標があればスコアは None"""
+        values = {}
+        total = passed = 0.0
+        for name, threshold, weight in self.signals:
+            value = self.value(name)
+            values[name] = value
+            if value is None:
+                return None, values
+            total += weight
+            if (value <= threshold) if SIGNALS[name][1] == "max" else (value >= threshold):
+                passed += weight
+        if total == 0:
+            return 1.0, values
+        return passed / total, values
+
+    def is_ready(self, score):
+        return score is not None and score >= self.min_score
+
+    def describe(self, values):
+        return " ".join(
+            f"{name}={value:.1f}{SIGNALS[name][0]}" for name, value in values.items() if value is not None
+        )
@@ -0,0 +1,125 @@
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """本番用の時計。now() は単調増加、wall() は日付判定用の実時刻"""
+
+    def now(self):
+        return time.monotonic()
+
+    def wall(self):
+        return datetime.now()
+
+    def wait(self, event, timeout):
+        """event がセットされるか timeout 秒経つまで待つ。event がセットされたら True"""
+        return event.wait(timeout)
+
+
+class VirtualClock:
+    """テスト用の仮想時計。wait() は待たずに時刻だけを進める"""
+
+    def __init__(self, start=None):
+        self._now = 0.0
+        self._wall_start = start or datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def now(self):
+        return self._now
+
+    def wall(self):
+        return self._wall_start + timedelta(seconds=self._now)
+
+    def advance(self, seconds):
+        self._now += max(0.0, seconds)
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+        if timeout is not None:
+            self.advance(timeout)
+        return event.is_set()
+
+
+class Timer:
+    __slots__ = ("deadline", "seq", "callback", "cancelled")
+
+    def __init__(self, deadline, seq, callback):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class Scheduler:
+    """期限 (deadline) のヒープでタイマーを管理する
+
+    ループは次の期限まで待って、期限が来たタイマーを順に実行するだけでよい。
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def call_at(self, deadline, callback):
+        timer = Timer(deadline, next(self._seq), callback)
+        with self._lock:
+            heapq.heappush(self._heap, timer)
+        return timer
+
+    def call_later(self, delay, callback):
+        return self.call_at(self.clock.now() + max(0.0, delay), callback)
+
+    def cancel(self, timer):
+        # ヒープからは取り除かず、取り出したときに捨てる
+        if timer is not None:
+            timer.cancelled = True
+
+    def clear(self):
+        with self._lock:
+            for timer in self._heap:
+                timer.cancelled = True
+            self._heap = []
+
+    def next_deadline(self):
+        with self._lock:
+            while self._heap and self._heap[0].cancelled:
+                heapq.heappop(self._heap)
+            return self._heap[0].deadline if self._heap else None
+
+    def time_until_next(self):
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        return max(0.0, deadline - self.clock.now())
+
+    def has_due(self):
+        deadline = self.next_deadline()
+        return deadline is not None and deadline <= self.clock.now()
+
+    def run_due(self):
+        """期限が来たタイマーを実行し、実行した数を返す"""
+        count = 0
+        now = self.clock.now()
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0].deadline > now:
+                    break
+                timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                continue
+            timer.cancelled = True
+            # 1つのコールバックの失敗で監視ループ (スレッド) ごと止まらないようにする
+            try:
+                timer.callback()
+            except Exception as e:
+                print(f"Timer error in {getattr(timer.callback, '__name__', timer.callback)}: {e}")
+            count += 1
+        return count
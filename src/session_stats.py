@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import struct
+from array import array
+
+
+# 記録する指標 (この順で add() に渡す)
+METRICS = ("cpu", "rss_mb", "io_kb", "threads")
+
+# ファイル形式: MAGIC, ヘッダー (JSON) の長さ (uint32 LE), ヘッダー,
+# 指標ごとに min / max / mean の float32 LE 配列 (length 個ずつ), 最後に件数の uint32 LE 配列
+MAGIC = b"DGLS1\n"
+
+
+class SessionSeries:
+    """1回のプレイの時系列を固定長のバケットに記録する
+
+    各バケットは span 個のサンプルの最小・最大・平均を持つ。バケットが埋まったら
+    隣り合う2つずつをまとめて span を倍にするので、プレイが何時間続いても
+    メモリは buckets 個ぶんのまま変わらない（古い部分ほど粗くなるのではなく全体が均等に粗くなる）。
+    """
+
+    def __init__(self, buckets=720):
+        self.size = max(2, buckets)
+        zeros = bytes(4 * self.size)
+        self.mins = [array("f", zeros) for _ in METRICS]
+        self.maxs = [array("f", zeros) for _ in METRICS]
+        self.means = [array("f", zeros) for _ in METRICS]
+        self.counts = array("I", zeros)
+        self.length = 0
+        self.span = 1
+        self.samples = 0
+
+    def add(self, *values):
+        i = self.length - 1
+        if i < 0 or self.counts[i] >= self.span:
+            if self.length == self.size:
+                self._compact()
+            i = self.length
+            self.length += 1
+            self.counts[i] = 0
+        c = self.counts[i]
+        for m in range(len(METRICS)):
+            v = values[m]
+            if c == 0:
+                self.mins[m][i] = self.maxs[m][i] = self.means[m][i] = v
+            else:
+                if v < self.mins[m][i]:
+                    self.mins[m][i] = v
+                if v > self.maxs[m][i]:
+                    self.maxs[m][i] = v
+                self.means[m][i] += (v - self.means[m][i]) / (c + 1)
+        self.counts[i] = c + 1
+        self.samples += 1
+
+    def _compact(self):
+        # バケット 2j と 2j+1 を j にまとめる（書き込み先は常に読み込み元より前なのでその場で行える）
+        counts = self.counts
+        half = 0
+        for j in range(0, self.length, 2):
+            k = j + 1
+            if k < self.length:
+                a, b = counts[j], counts[k]
+                for m in range(len(METRICS)):
+                    self.mins[m][half] = min(self.mins[m][j], self.mins[m][k])
+                    self.maxs[m][half] = max(self.maxs[m][j], self.maxs[m][k])
+                    self.means[m][half] = (self.means[m][j] * a + self.means[m][k] * b) / (a + b)
+                counts[half] = a + b
+            else:
+                for m in range(len(METRICS)):
+                    self.mins[m][half] = self.mins[m][j]
+                    self.maxs[m][half] = self.maxs[m][j]
+                    self.means[m][half] = self.means[m][j]
+                counts[half] = counts[j]
+            half += 1
+        self.length = half
+        self.span *= 2
+
+    def column(self, metric, kind="mean"):
+        m = METRICS.index(metric)
+        values = {"min": self.mins, "max": self.maxs, "mean": self.means}[kind][m]
+        return values[:self.length].tolist()
+
+    def summary(self):
+        """指標ごとの (最小, 最大, 平均)"""
+        result = {}
+        total = sum(self.counts[:self.length])
+        for m, name in enumerate(METRICS):
+            if not self.length:
+                result[name] = (0.0, 0.0, 0.0)
+                continue
+            mean = sum(self.means[m][i] * self.counts[i] for i in range(self.length)) / total
+            result[name] = (min(self.mins[m][:self.length]), max(self.maxs[m][:self.length]), mean)
+        return result
+
+    def save(self, path, **meta):
+        header = dict(meta, metrics=list(METRICS), length=self.length, span=self.span, samples=self.samples)
+        header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for m in range(len(METRICS)):
+                for values in (self.mins[m], self.maxs[m], self.means[m]):
+                    f.write(_little_endian(values[:self.length]))
+            f.write(_little_endian(self.counts[:self.length]))
+
+    @classmethod
+    def load(cls, path):
+        """(ヘッダー, SessionSeries) を返す"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a session file: {path}")
+            size, = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(size).decode("utf-8"))
+            length = header["length"]
+            series = cls(max(2, length))
+            for m in range(len(METRICS)):
+                for values in (series.mins[m], series.maxs[m], series.means[m]):
+                    _read_into(values, f, length)
+            _read_into(series.counts, f, length)
+        series.length = length
+        series.span = header["span"]
+        series.samples = header["samples"]
+        return header, series
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_into(values, f, length):
+    chunk = array(values.typecode)
+    chunk.frombytes(f.read(length * values.itemsize))
+    if sys.byteorder == "big":
+        chunk.byteswap()
+    values[:length] = chunk
@@ -16,6 +16,9 @@ from PyQt6.QtCore import (
 )
 from PyQt6.QtGui import QColor, QPainter, QBrush, QPen, QFont, QCursor, QPalette
 
+from readiness import learned_interval
+from checkpoint import read_json, write_json_atomic
+
 # モダンなQSSスタイル
 MODERN_QSS = """
 QMainWindow {
@@ -253,6 +256,8 @@ class ToggleSwitch(QWidget):
         p.drawEllipse(int(self._position), 3, 18, 18)
         p.end()
 
+KILL_TARGET_OPTIONS = ["なし", "HoYoPlay (hoyoplay.exe)", "Steam (steam.exe)", "Epic Games (EpicGamesLauncher.exe)"]
+
 class ModernWindow(QMainWindow):
     def __init__(self, config_path, on_close_callback, monitor):
         super().__init__()
@@ -262,9 +267,13 @@ class ModernWindow(QMainWindow):
         
         self.games = []
         self.launch_interval = 5
-        self.kill_targets = ["なし", "なし", "なし"]
+        self.kill_targets = []
         self.run_on_startup = False
         self.auto_exit = False
+        self.adaptive_interval = False
+        self.prewarm = False
+        # 前のゲーム終了から負荷が落ち着くまでの記録（監視側が書き込む）
+        self.settle_times = {}
         self.show_on_startup = True  # 起動時に設定画面を表示するか
         self.current_selected_index = None # None means App Settings
         
@@ -276,6 +285,7 @@ class ModernWindow(QMainWindow):
         self.smart_wait_enabled = False
         self.cpu_threshold = 30
         self.smart_wait_timeout = 60
+        self.cpu_hold_time = 3
         
         self.load_config()
         self.init_ui()
@@ -310,23 +320,29 @@ class ModernWindow(QMainWindow):
                     self.smart_wait_enabled = sw_cfg.get("enabled", False)
                     self.cpu_threshold = sw_cfg.get("cpu_threshold", 30)
                     self.smart_wait_timeout = sw_cfg.get("timeout", 60)
+                    self.cpu_hold_time = sw_cfg.get("hold_time", 3)
 
                     self.show_on_startup = config.get("show_on_startup", True)
+                    # 学習した記録は learned.json にある（古い設定ファイルでは設定の中）
+                    learned = read_json(os.path.join(os.path.dirname(os.path.abspath(self.config_path)), "learned.json"))
+                    self.settle_times = (learned if isinstance(learned, dict) else config).get("settle_times", {})
                     self.run_on_startup = config.get("run_on_startup", False)
 
                     # 現在のプロファイルを反映
                     p = self.profiles.get(self.active_profile, {})
                     self.games = p.get("games", [])
                     self.launch_interval = p.get("launch_interval", 5)
-                    loaded_kills = p.get("kill_targets", [])
-                    self.kill_targets = (loaded_kills + ["なし", "なし", "なし"])[:3]
+                    self.kill_targets = list(p.get("kill_targets", []))
                     self.auto_exit = p.get("auto_exit_after_completion", False)
+                    self.adaptive_interval = p.get("adaptive_interval", False)
+                    self.prewarm = p.get("prewarm", False)
 
                 if self.monitor:
                     self.monitor.auto_exit_after_completion = self.auto_exit
                     self.monitor.smart_wait_enabled = self.smart_wait_enabled
                     self.monitor.cpu_threshold = self.cpu_threshold
                     self.monitor.smart_wait_timeout = self.smart_wait_timeout
+                    self.monitor.cpu_hold_time = self.cpu_hold_time
             except Exception as e:
                 print(f"Failed to load config: {e}")
 
@@ -337,49 +353,59 @@ class ModernWindow(QMainWindow):
                 self.launch_interval = int(self.interval_entry.text())
                 self.cpu_threshold = int(self.cpu_entry.text())
                 self.smart_wait_timeout = int(self.sw_timeout_entry.text())
+                self.cpu_hold_time = float(self.sw_hold_entry.text())
             except (ValueError, AttributeError):
                 pass
                 
-            self.kill_targets = [
-                self.kill_combo_1.currentText(),
-                self.kill_combo_2.currentText(),
-                self.kill_combo_3.currentText()
-            ]
+            self.kill_targets = self.read_kill_targets()
             self.run_on_startup = self.startup_toggle.isChecked()
             self.auto_exit = self.auto_exit_toggle.isChecked()
+            self.adaptive_interval = self.adaptive_toggle.isChecked()
+            self.prewarm = self.prewarm_toggle.isChecked()
             self.show_on_startup = self.show_on_startup_toggle.isChecked()
             self.smart_wait_enabled = self.sw_toggle.isChecked()
             
             # Sync current state to current active profile
             self.sync_current_profile_input()
             
-            self.profiles[self.active_profile] = {
+            self.profiles.setdefault(self.active_profile, {}).update({
                 "games": self.games,
                 "launch_interval": self.launch_interval,
                 "kill_targets": self.kill_targets,
-                "auto_exit_after_completion": self.auto_exit
-            }
+                "auto_exit_after_completion": self.auto_exit,
+                "adaptive_interval": self.adaptive_interval,
+                "prewarm": self.prewarm
+            })
             
-            config_data = {
+            # このクラスが扱わないキーを消さないよう、既存の設定に上書きする
+            config_data = {}
+            if os.path.exists(self.config_path):
+                try:
+                    with open(self.config_path, "r", encoding="utf-8") as f:
+                        config_data = json.load(f)
+                except (OSError, ValueError):
+                    config_data = {}
+            config_data.setdefault("smart_wait", {}).update({
+                "enabled": self.smart_wait_enabled,
+                "cpu_threshold": self.cpu_threshold,
+                "timeout": self.smart_wait_timeout,
+                "hold_time": self.cpu_hold_time
+            })
+            config_data.update({
                 "active_profile": self.active_profile,
                 "profiles": self.profiles,
-                "smart_wait": {
-                    "enabled": self.smart_wait_enabled,
-                    "cpu_threshold": self.cpu_threshold,
-                    "timeout": self.smart_wait_timeout
-                },
                 "run_on_startup": self.run_on_startup,
                 "show_on_startup": self.show_on_startup
-            }
+            })
             
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+            write_json_atomic(self.config_path, config_data, indent=2)
                 
             if self.monitor:
                 self.monitor.auto_exit_after_completion = self.auto_exit
                 self.monitor.smart_wait_enabled = self.smart_wait_enabled
                 self.monitor.cpu_threshold = self.cpu_threshold
                 self.monitor.smart_wait_timeout = self.smart_wait_timeout
+                self.monitor.cpu_hold_time = self.cpu_hold_time
                 self.monitor.profiles = self.profiles
                 self.monitor.apply_profile(self.active_profile)
                 
@@ -580,10 +606,15 @@ class ModernWindow(QMainWindow):
             self.active_profile = profile_name
             self.games = p.get("games", [])
             self.launch_interval = p.get("launch_interval", 5)
-            self.kill_targets = (p.get("kill_targets", []) + ["なし", "なし", "なし"])[:3]
+            self.kill_targets = list(p.get("kill_targets", []))
             self.auto_exit = p.get("auto_exit_after_completion", False)
+            self.adaptive_interval = p.get("adaptive_interval", False)
+            self.prewarm = p.get("prewarm", False)
             
             # UIの更新
+            self.set_kill_target_rows(self.kill_targets)
+            self.adaptive_toggle.setChecked(self.adaptive_interval)
+            self.prewarm_toggle.setChecked(self.prewarm)
             self.refresh_sidebar()
             self.show_app_settings()
             print(f"Switched profile to: {profile_name}")
@@ -603,7 +634,7 @@ class ModernWindow(QMainWindow):
         self.profiles[proposed] = {
             "games": [],
             "launch_interval": 5,
-            "kill_targets": ["なし", "なし", "なし"],
+            "kill_targets": [],
             "auto_exit_after_completion": False
         }
         self.active_profile = proposed
@@ -628,8 +659,14 @@ class ModernWindow(QMainWindow):
             p = self.profiles[self.active_profile]
             self.games = p.get("games", [])
             self.launch_interval = p.get("launch_interval", 5)
-            self.kill_targets = (p.get("kill_targets", []) + ["なし", "なし", "なし"])[:3]
+            self.kill_targets = list(p.get("kill_targets", []))
             self.auto_exit = p.get("auto_exit_after_completion", False)
+            self.adaptive_interval = p.get("adaptive_interval", False)
+            self.prewarm = p.get("prewarm", False)
+            
+            self.set_kill_target_rows(self.kill_targets)
+            self.adaptive_toggle.setChecked(self.adaptive_interval)
+            self.prewarm_toggle.setChecked(self.prewarm)
             
             self.refresh_sidebar()
             self.show_app_settings()
@@ -643,13 +680,20 @@ class ModernWindow(QMainWindow):
             self.launch_interval = int(self.interval_entry.text())
         except (ValueError, AttributeError):
             pass
+        if hasattr(self, "kill_list_layout"):
+            self.kill_targets = self.read_kill_targets()
+        if hasattr(self, "adaptive_toggle"):
+            self.adaptive_interval = self.adaptive_toggle.isChecked()
+            self.prewarm = self.prewarm_toggle.isChecked()
             
-        self.profiles[self.active_profile] = {
+        self.profiles.setdefault(self.active_profile, {}).update({
             "games": self.games,
             "launch_interval": self.launch_interval,
             "kill_targets": self.kill_targets,
-            "auto_exit_after_completion": self.auto_exit
-        }
+            "auto_exit_after_completion": self.auto_exit,
+            "adaptive_interval": self.adaptive_interval,
+            "prewarm": self.prewarm
+        })
 
     def refresh_profile_list_ui(self):
         """プロファイル選択ドロップダウンのリストを更新する"""
@@ -715,13 +759,19 @@ class ModernWindow(QMainWindow):
         kill_header.addWidget(hi("ゲーム終了時に、SteamやHoYoPlayなどの重いランチャーを自動で終了させてPCを軽くします。"))
         layout.addLayout(kill_header)
 
-        kill_opts = ["なし", "HoYoPlay (hoyoplay.exe)", "Steam (steam.exe)", "Epic Games (EpicGamesLauncher.exe)"]
-        self.kill_combo_1 = QComboBox(); self.kill_combo_1.addItems(kill_opts); self.kill_combo_1.setCurrentText(self.kill_targets[0])
-        self.kill_combo_2 = QComboBox(); self.kill_combo_2.addItems(kill_opts); self.kill_combo_2.setCurrentText(self.kill_targets[1])
-        self.kill_combo_3 = QComboBox(); self.kill_combo_3.addItems(kill_opts); self.kill_combo_3.setCurrentText(self.kill_targets[2])
-        layout.addWidget(self.kill_combo_1)
-        layout.addWidget(self.kill_combo_2)
-        layout.addWidget(self.kill_combo_3)
+        # 個数の上限なし。一覧にないアプリは「名前 (process.exe)」形式で直接入力できる
+        self.kill_combos = []
+        self.kill_list_layout = QVBoxLayout()
+        layout.addLayout(self.kill_list_layout)
+        self.set_kill_target_rows(self.kill_targets)
+
+        add_kill_btn = QPushButton("+ 裏方アプリを追加")
+        add_kill_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        add_kill_btn.clicked.connect(lambda: self.add_kill_target_row("なし"))
+        add_kill_layout = QHBoxLayout()
+        add_kill_layout.addWidget(add_kill_btn)
+        add_kill_layout.addStretch()
+        layout.addLayout(add_kill_layout)
         layout.addSpacing(10)
 
         # ── トグルの共通ヘルパー ──
@@ -743,6 +793,20 @@ class ModernWindow(QMainWindow):
             "Windows起動時に、タスクトレイに常駐するようになります。"
         ))
 
+        self.adaptive_toggle = ToggleSwitch(is_checked=self.adaptive_interval)
+        layout.addLayout(make_toggle_row(
+            self.adaptive_toggle,
+            "ゲームごとに学習した待ち時間を使う",
+            "前のゲームを閉じてからPCの負荷が落ち着くまでの時間を記録し、ゲームごとに待ち時間を自動で調整します。記録が3回分たまるまでは上の待ち時間を使います。"
+        ))
+
+        self.prewarm_toggle = ToggleSwitch(is_checked=self.prewarm)
+        layout.addLayout(make_toggle_row(
+            self.prewarm_toggle,
+            "待ち時間の間に次のゲームを先読みする",
+            "待ち時間でディスクが空いている間に、次のゲームのファイルを先に読み込んでおき、起動を速くします。"
+        ))
+
         self.auto_exit_toggle = ToggleSwitch(is_checked=self.auto_exit)
         layout.addLayout(make_toggle_row(
             self.auto_exit_toggle,
@@ -779,7 +843,11 @@ class ModernWindow(QMainWindow):
         sw_levels_lbl = QLabel("CPU負荷が ")
         self.cpu_entry = QLineEdit(str(self.cpu_threshold))
         self.cpu_entry.setFixedWidth(50)
-        sw_levels_lbl2 = QLabel(" % 以下になるまで待つ (最大 ")
+        sw_levels_lbl2 = QLabel(" % 以下が ")
+        self.sw_hold_entry = QLineEdit(f"{self.cpu_hold_time:g}")
+        self.sw_hold_entry.setFixedWidth(40)
+        self.sw_hold_entry.setToolTip("一瞬だけ負荷が下がったタイミングで起動しないよう、この秒数続けて閾値以下になるのを待ちます。")
+        sw_levels_lbl_hold = QLabel(" 秒続くまで待つ (最大 ")
         self.sw_timeout_entry = QLineEdit(str(self.smart_wait_timeout))
         self.sw_timeout_entry.setFixedWidth(50)
         sw_levels_lbl3 = QLabel(" 秒)")
@@ -787,6 +855,8 @@ class ModernWindow(QMainWindow):
         sw_params.addWidget(sw_levels_lbl)
         sw_params.addWidget(self.cpu_entry)
         sw_params.addWidget(sw_levels_lbl2)
+        sw_params.addWidget(self.sw_hold_entry)
+        sw_params.addWidget(sw_levels_lbl_hold)
         sw_params.addWidget(self.sw_timeout_entry)
         sw_params.addWidget(sw_levels_lbl3)
         sw_params.addStretch()
@@ -812,6 +882,40 @@ class ModernWindow(QMainWindow):
         reset_layout.addStretch()
         layout.addLayout(reset_layout)
 
+    def add_kill_target_row(self, target):
+        row = QWidget()
+        row_layout = QHBoxLayout(row)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        combo = QComboBox()
+        combo.setEditable(True)
+        combo.addItems(KILL_TARGET_OPTIONS)
+        combo.setCurrentText(target)
+        remove_btn = QPushButton("×")
+        remove_btn.setFixedSize(30, 30)
+        remove_btn.setToolTip("この裏方アプリを一覧から外します。")
+        remove_btn.clicked.connect(lambda: self.remove_kill_target_row(row, combo))
+        row_layout.addWidget(combo, 1)
+        row_layout.addWidget(remove_btn)
+        self.kill_list_layout.addWidget(row)
+        self.kill_combos.append(combo)
+
+    def remove_kill_target_row(self, row, combo):
+        self.kill_combos.remove(combo)
+        self.kill_list_layout.removeWidget(row)
+        row.deleteLater()
+
+    def set_kill_target_rows(self, targets):
+        while self.kill_list_layout.count():
+            item = self.kill_list_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        self.kill_combos = []
+        for target in (targets or ["なし"]):
+            self.add_kill_target_row(target)
+
+    def read_kill_targets(self):
+        return [c.currentText().strip() for c in self.kill_combos if c.currentText().strip() not in ("", "なし")]
+
     def init_profile_settings(self, container):
         layout = QVBoxLayout(container)
         layout.setContentsMargins(30, 30, 30, 30)
@@ -841,7 +945,9 @@ class ModernWindow(QMainWindow):
         # Process
         proc_layout = QHBoxLayout()
         proc_lbl = QLabel("プロセス名 (例: Game.exe):")
-        tt = "このプロセスが立ち上がっている間は「プレイ中」と判定し、終了したら次のゲームに行きます。"
+        tt = ("このプロセスが立ち上がっている間は「プレイ中」と判定し、終了したら次のゲームに行きます。<br>"
+              "カンマ区切りで複数指定でき、ワイルドカード (例: Game*.exe) や "
+              "「re:」で始まる正規表現も使えます。")
         proc_lbl.setToolTip(f"<div style='background-color: #ffffff; color: #333333; padding: 5px; border: 1px solid #cccccc;'>{tt}</div>")
         self.prof_proc_entry = QLineEdit()
         self.prof_proc_entry.textChanged.connect(self.on_profile_edit)
@@ -873,6 +979,11 @@ class ModernWindow(QMainWindow):
         path_layout.addLayout(path_input_lyt)
         layout.addLayout(path_layout)
         
+        # 学習した待ち時間
+        self.learned_label = QLabel()
+        self.learned_label.setStyleSheet("color: #8e8e93;")
+        layout.addWidget(self.learned_label)
+        
         # Order Control
         order_lyt = QHBoxLayout()
         up_btn = QPushButton("↑ 順番を上げる")
@@ -968,6 +1079,7 @@ class ModernWindow(QMainWindow):
         self.prof_proc_entry.setText(game.get("process_name", ""))
         self.prof_path_entry.setText(game.get("path", ""))
         self.preset_combo.setCurrentIndex(0)
+        self.learned_label.setText(self.learned_interval_text(game))
         
         self.prof_name_entry.blockSignals(False)
         self.prof_proc_entry.blockSignals(False)
@@ -976,6 +1088,17 @@ class ModernWindow(QMainWindow):
         self.stacked.setCurrentWidget(self.profile_card)
         self.del_btn.setEnabled(True)
 
+    def learned_interval_text(self, game):
+        # 監視中なら最新の記録を使う
+        settle_times = self.monitor.settle_times if self.monitor else self.settle_times
+        history = settle_times.get(self.active_profile, {}).get(game.get("name", ""), [])
+        floor = self.profiles.get(self.active_profile, {}).get("adaptive_floor", 1)
+        cap = self.profiles.get(self.active_profile, {}).get("adaptive_cap", 60)
+        learned = learned_interval(history, floor, cap)
+        if learned is None:
+            return f"学習した待ち時間: 記録中 ({len(history)}/3 回)"
+        return f"学習した待ち時間: {learned:g} 秒 ({len(history)} 回の記録から)"
+
     def sync_current_profile_input(self):
         if self.current_selected_index is not None and self.current_selected_index < len(self.games):
             game = self.games[self.current_selected_index]
@@ -1167,10 +1290,15 @@ class ModernWindow(QMainWindow):
             self.active_profile = profile_name
             self.games = p.get("games", [])
             self.launch_interval = p.get("launch_interval", 5)
-            self.kill_targets = (p.get("kill_targets", []) + ["なし", "なし", "なし"])[:3]
+            self.kill_targets = list(p.get("kill_targets", []))
             self.auto_exit = p.get("auto_exit_after_completion", False)
+            self.adaptive_interval = p.get("adaptive_interval", False)
+            self.prewarm = p.get("prewarm", False)
             
             # UIの更新
+            self.set_kill_target_rows(self.kill_targets)
+            self.adaptive_toggle.setChecked(self.adaptive_interval)
+            self.prewarm_toggle.setChecked(self.prewarm)
             self.refresh_sidebar()
             self.show_app_settings()
             print(f"Switched profile to: {profile_name}")
@@ -1187,7 +1315,7 @@ class ModernWindow(QMainWindow):
             self.profiles[proposed] = {
                 "games": [],
                 "launch_interval": 5,
-                "kill_targets": ["なし", "なし", "なし"],
+                "kill_targets": [],
                 "auto_exit_after_completion": False
             }
             self.active_profile = proposed
@@ -1212,8 +1340,14 @@ class ModernWindow(QMainWindow):
             p = self.profiles[self.active_profile]
             self.games = p.get("games", [])
             self.launch_interval = p.get("launch_interval", 5)
-            self.kill_targets = (p.get("kill_targets", []) + ["なし", "なし", "なし"])[:3]
+            self.kill_targets = list(p.get("kill_targets", []))
             self.auto_exit = p.get("auto_exit_after_completion", False)
+            self.adaptive_interval = p.get("adaptive_interval", False)
+            self.prewarm = p.get("prewarm", False)
+            
+            self.set_kill_target_rows(self.kill_targets)
+            self.adaptive_toggle.setChecked(self.adaptive_interval)
+            self.prewarm_toggle.setChecked(self.prewarm)
             
             self.refresh_sidebar()
             self.show_app_settings()
@@ -1227,13 +1361,20 @@ class ModernWindow(QMainWindow):
             self.launch_interval = int(self.interval_entry.text())
         except (ValueError, AttributeError):
             pass
+        if hasattr(self, "kill_list_layout"):
+            self.kill_targets = self.read_kill_targets()
+        if hasattr(self, "adaptive_toggle"):
+            self.adaptive_interval = self.adaptive_toggle.isChecked()
+            self.prewarm = self.prewarm_toggle.isChecked()
             
-        self.profiles[self.active_profile] = {
+        self.profiles.setdefault(self.active_profile, {}).update({
             "games": self.games,
             "launch_interval": self.launch_interval,
             "kill_targets": self.kill_targets,
-            "auto_exit_after_completion": self.auto_exit
-        }
+            "auto_exit_after_completion": self.auto_exit,
+            "adaptive_interval": self.adaptive_interval,
+            "prewarm": self.prewarm
+        })
 
     def refresh_profile_list_ui(self):
         """プロファイル選択ドロップダウンのリストを更新する"""
@@ -0,0 +1,50 @@
+class SuspendManager:
+    """プレイ中だけ裏方アプリを一時停止し、終わったら再開する
+
+    停止する前に RestoreJournal に記録するので、クラッシュしても次の起動時に必ず再開できる。
+    """
+
+    def __init__(self, provider, journal):
+        self.provider = provider
+        self.journal = journal
+
+    def suspend(self, pid, create_time, name):
+        return self.suspend_all([(pid, create_time, name)]) > 0
+
+    def suspend_all(self, targets):
+        """targets: [(pid, create_time, name), ...]。停止した数を返す
+
+        先にすべて記録してジャーナルを1回だけ書いてから停止する（プロセスごとに fsync しない）。
+        """
+        pending = [(pid, create_time, name) for pid, create_time, name in targets
+                   if not self.journal.entries.get(f"{pid}:{create_time}", {}).get("suspended")]
+        if not pending:
+            return 0
+        for pid, create_time, name in pending:
+            self.journal.record(pid, create_time, name, save=False, suspended=True)
+        self.journal.save()
+        suspended = 0
+        failed = False
+        for pid, create_time, name in pending:
+            if self.provider.suspend(pid):
+                suspended += 1
+            else:
+                print(f"Could not suspend {name} (pid {pid})")
+                self.journal.remove(pid, create_time, "suspended", save=False)
+                failed = True
+        if failed:
+            self.journal.save()
+        return suspended
+
+    def resume_all(self):
+        """記録したプロセスをすべて再開し、再開した数を返す（終了済みのものは捨てる）"""
+        resumed = 0
+        for entry in list(self.journal.entries.values()):
+            if not entry.get("suspended") or not self.provider.is_alive(entry["pid"], entry["create_time"]):
+                continue
+            if self.provider.resume(entry["pid"]):
+                resumed += 1
+            else:
+                print(f"Could not resume {entry['name']} (pid {entry['pid']})")
+        self.journal.discard("suspended")
+        return resumed
@@ -0,0 +1,63 @@
+import time
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+GAME_COUNT = 500
+
+class BenchMonitor(GameMonitor):
+    """起動と同時にプロセスが現れ、遷移1回ごとの処理時間を記録するモニター"""
+
+    def __init__(self, count):
+        super().__init__(config_path="bench_config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = [
+            {"name": f"Game {i}", "process_name": f"game{i}.exe", "path": f"g{i}"}
+            for i in range(count)
+        ]
+        self.launch_interval = 0
+        self.transition_times = []
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+    def fire(self, event, index=None):
+        start = time.perf_counter()
+        result = super().fire(event, index)
+        self.transition_times.append(time.perf_counter() - start)
+        return result
+
+def mean_us(samples):
+    return sum(samples) / len(samples) * 1e6 if samples else 0.0
+
+def run_test():
+    monitor = BenchMonitor(GAME_COUNT)
+    monitor.start(background=False)
+
+    started = time.perf_counter()
+    monitor.provider.spawn("game0.exe")
+    monitor.run_for(monitor.POLL_INTERVAL)
+    per_game = []
+    for i in range(GAME_COUNT):
+        assert monitor.state == (Phase.PLAYING, i), monitor.state
+        before = len(monitor.transition_times)
+        monitor.provider.exit_name(f"game{i}.exe")
+        # 終了検知 -> インターバル(0秒) -> 起動 -> 起動検知 の2ポーリングぶん
+        monitor.run_for(monitor.POLL_INTERVAL * 2)
+        per_game.append(monitor.transition_times[before:])
+    elapsed = time.perf_counter() - started
+
+    assert monitor.phase == Phase.STANDBY, monitor.state
+    assert monitor.provider.running_names() == []
+    monitor.stop()
+
+    head = [t for samples in per_game[:50] for t in samples]
+    tail = [t for samples in per_game[-50:] for t in samples]
+    print(f"games: {GAME_COUNT}")
+    print(f"transitions: {len(monitor.transition_times)}")
+    print(f"total: {elapsed:.3f}s ({elapsed / GAME_COUNT * 1e3:.3f}ms per game)")
+    print(f"transition mean: first 50 games {mean_us(head):.1f}us / last 50 games {mean_us(tail):.1f}us")
+    print(f"scans: {monitor.scan_count}")
+
+if __name__ == '__main__':
+    run_test()
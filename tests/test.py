@@ -1,14 +1,12 @@
-import time
-from core import GameMonitor, State
+from core import GameMonitor, Phase, RoutineState
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
 
 class MockMonitor(GameMonitor):
     def __init__(self):
-        super().__init__(config_path="config.json")
-        self.running_procs = set()
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
         self.launched = []
-
-    def is_process_running(self, process_name):
-        return process_name in self.running_procs
+        self.launch_interval = 1
 
     def launch_game(self, game_index):
         if game_index < len(self.games):
@@ -25,40 +23,40 @@ def run_test():
         {"name": "Game 2", "process_name": "game2.exe", "path": "g2"},
         {"name": "Game 3", "process_name": "game3.exe", "path": "g3"}
     ]
-    monitor.start()
+    monitor.start(background=False)
 
     print("Test: Starting game 1...")
-    monitor.running_procs.add("game1.exe")
-    time.sleep(4)
-    assert monitor.state == State.STAR_RAIL, f"Expected STAR_RAIL, got {monitor.state}"
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(4)
+    assert monitor.state == RoutineState(Phase.PLAYING, 0), monitor.state
 
     print("Test: Closing game 1...")
-    monitor.running_procs.remove("game1.exe")
-    time.sleep(4)
-    assert monitor.state == State.GENSHIN, f"Expected GENSHIN, got {monitor.state}"
+    monitor.provider.exit_name("game1.exe")
+    monitor.run_for(4)
+    assert monitor.state == RoutineState(Phase.LAUNCHING, 1), monitor.state
     assert "game2.exe" in monitor.launched, "game2.exe should be launched"
 
     # Simulate game 2 actually showing up
-    monitor.running_procs.add("game2.exe")
-    time.sleep(4)
+    monitor.provider.spawn("game2.exe")
+    monitor.run_for(4)
     # The flag should be cleared
     assert not monitor.waiting_for_launch
 
     print("Test: Closing game 2...")
-    monitor.running_procs.remove("game2.exe")
-    time.sleep(4)
-    assert monitor.state == State.WUTHERING_WAVES, f"Expected WUTHERING_WAVES, got {monitor.state}"
+    monitor.provider.exit_name("game2.exe")
+    monitor.run_for(4)
+    assert monitor.state == RoutineState(Phase.LAUNCHING, 2), monitor.state
     assert "game3.exe" in monitor.launched, "game3.exe should be launched"
 
     # Simulate game 3 showing up
-    monitor.running_procs.add("game3.exe")
-    time.sleep(4)
+    monitor.provider.spawn("game3.exe")
+    monitor.run_for(4)
     assert not monitor.waiting_for_launch
 
     print("Test: Closing game 3...")
-    monitor.running_procs.remove("game3.exe")
-    time.sleep(4)
-    assert monitor.state == State.STANDBY, f"Expected STANDBY, got {monitor.state}"
+    monitor.provider.exit_name("game3.exe")
+    monitor.run_for(4)
+    assert monitor.state == RoutineState(Phase.STANDBY, None), monitor.state
 
     print("Test passed!")
     monitor.stop()
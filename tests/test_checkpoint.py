@@ -0,0 +1,118 @@
+import os
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self, checkpoint_path, provider=None, start=None):
+        super().__init__(config_path="config.json", provider=provider or FakeProcessProvider(), clock=VirtualClock(start))
+        self.checkpoint_path = checkpoint_path
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"},
+            {"name": "Game 3", "process_name": "game3.exe", "path": "g3"}
+        ]
+        self.launch_interval = 1
+        self.launched = []
+
+    def launch_game(self, game_index):
+        self.launched.append(game_index)
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def crash_while_playing(path, index):
+    # index 番目のゲームを遊んでいる途中で (stop() を呼ばずに) 落ちる
+    if os.path.exists(path):
+        os.remove(path)
+    monitor = MockMonitor(path)
+    monitor.start(background=False)
+    monitor.start_specific_game(index)
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, index), monitor.state
+    return monitor
+
+def run_test():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "routine_state.json")
+
+        print("Test: each transition writes the checkpoint at most once...")
+        monitor = MockMonitor(path)
+        monitor.start(background=False)
+        assert monitor._checkpoint.writes == 0
+        monitor.start_specific_game(0)
+        assert monitor._checkpoint.writes == 1
+        monitor.run_for(3)
+        assert monitor.state == (Phase.PLAYING, 0), monitor.state
+        assert monitor._checkpoint.writes == 2
+        writes = monitor._checkpoint.writes
+        monitor.run_for(30)
+        assert monitor._checkpoint.writes == writes
+        # インターバル → スマート待機 → 起動 は1回の書き込みにまとまる
+        monitor.launch_interval = 10
+        monitor.smart_wait_enabled = False
+        monitor.provider.exit_name("game1.exe")
+        monitor.run_for(3)
+        assert monitor.state == (Phase.INTERVAL, 1), monitor.state
+        assert monitor._checkpoint.writes == writes + 1
+        monitor.run_for(13)
+        assert monitor.state == (Phase.PLAYING, 1), monitor.state
+        assert monitor._checkpoint.writes == writes + 3, monitor._checkpoint.writes
+        assert not os.path.exists(path + ".tmp")
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["phase"] == monitor.phase.value and state["cursor"] == 1, state
+
+        print("Test: a restart re-attaches to the running game by PID...")
+        monitor = crash_while_playing(path, 1)
+        pid = monitor.tracked_pid
+        resumed = MockMonitor(path, provider=monitor.provider)
+        resumed.launch_interval = 10
+        resumed.start(background=False)
+        assert resumed.state == (Phase.PLAYING, 1), resumed.state
+        assert resumed.tracked_pid == pid
+        assert resumed.launched == []
+        print("Test: closing the settings without changes keeps the resumed routine...")
+        assert not resumed.reload_config()
+        assert resumed.state == (Phase.PLAYING, 1), resumed.state
+        resumed.provider.exit_name("game2.exe")
+        resumed.run_for(3)
+        assert resumed.state == (Phase.INTERVAL, 2), resumed.state
+
+        print("Test: a reset saves the stopped chain...")
+        resumed.reset_state()
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["phase"] == Phase.STANDBY.value and state["chain_launch_active"] is False, state
+        resumed.stop()
+
+        print("Test: a game that exited while the monitor was down is advanced past...")
+        monitor = crash_while_playing(path, 0)
+        monitor.provider.exit_name("game1.exe")
+        resumed = MockMonitor(path, provider=monitor.provider)
+        resumed.launch_interval = 10
+        resumed.start(background=False)
+        resumed.run_for(3)
+        assert resumed.state == (Phase.INTERVAL, 1), resumed.state
+        resumed.run_for(15)
+        assert resumed.launched == [1], resumed.launched
+        resumed.stop()
+
+        print("Test: a checkpoint from an earlier reset window is ignored...")
+        crash_while_playing(path, 1)
+        tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()) + timedelta(hours=6)
+        fresh = MockMonitor(path, start=tomorrow)
+        fresh.start(background=False)
+        assert fresh.phase == Phase.STANDBY, fresh.state
+        fresh.stop()
+
+        print("Test: a restart before the reset hour still counts as the previous day...")
+        early = MockMonitor(None, start=datetime(2024, 5, 2, 3, 0))
+        assert early.last_reset_date == date(2024, 5, 1)
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
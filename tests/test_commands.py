@@ -0,0 +1,85 @@
+import os
+import time
+import tempfile
+import threading
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+
+class MockMonitor(GameMonitor):
+    def __init__(self, provider=None):
+        super().__init__(config_path="config.json", provider=provider or FakeProcessProvider())
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 60
+        self.launch_threads = []
+
+    def launch_game(self, game_index):
+        self.launch_threads.append(threading.current_thread())
+        return True, ""
+
+class SlowSuspendProvider(FakeProcessProvider):
+    """一時停止の途中で stop() が呼ばれる状況を作る"""
+
+    def __init__(self):
+        super().__init__()
+        self.suspending = threading.Event()
+
+    def suspend(self, pid):
+        self.suspending.set()
+        time.sleep(0.3)
+        return super().suspend(pid)
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+def run_test():
+    monitor = MockMonitor()
+    monitor.start()
+    time.sleep(0.05)
+
+    print("Test: start_specific_game runs on the monitor thread and returns its result...")
+    assert monitor.start_specific_game(0) == (True, "")
+    assert monitor.launch_threads == [monitor._thread]
+    assert monitor.state == (Phase.LAUNCHING, 0)
+
+    print("Test: skip is applied within milliseconds...")
+    started = time.monotonic()
+    monitor.skip_current()
+    assert wait_for(lambda: monitor.state == (Phase.INTERVAL, 1)), monitor.state
+    assert time.monotonic() - started < 0.5
+    assert monitor.launch_sleep_remaining > 0
+
+    print("Test: reset waits for the monitor thread...")
+    monitor.reset_state()
+    assert monitor.phase == Phase.STANDBY and monitor.launch_sleep_remaining == 0
+
+    print("Test: stop is instant...")
+    started = time.monotonic()
+    monitor.stop()
+    assert time.monotonic() - started < 0.5
+    assert not monitor._thread.is_alive()
+
+    print("Test: stop cleans up after the tick in progress...")
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = MockMonitor(SlowSuspendProvider())
+        monitor.journal_path = os.path.join(tmp, "journal.json")
+        monitor.suspend_list = "chrome.exe"
+        monitor.provider.spawn("chrome.exe")
+        monitor.provider.spawn("game1.exe")
+        monitor.start()
+        assert monitor.provider.suspending.wait(1)
+        monitor.stop()
+        assert not monitor._thread.is_alive()
+        assert monitor.provider.suspended == set(), monitor.provider.suspended
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
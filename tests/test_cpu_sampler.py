@@ -0,0 +1,84 @@
+from core import GameMonitor, Phase
+from cpu_sampler import CpuSampler
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class ScriptedCpu:
+    """呼ばれるたびに用意した値を順に返す（尽きたら最後の値を返し続ける）"""
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        value = self.values[min(self.calls, len(self.values) - 1)]
+        self.calls += 1
+        return value
+
+class MockMonitor(GameMonitor):
+    def __init__(self, cpu_values):
+        self.cpu = ScriptedCpu(cpu_values)
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock(),
+                         samplers={"cpu": CpuSampler(read=self.cpu, interval=0.5)})
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 0
+        self.smart_wait_enabled = True
+        self.cpu_threshold = 30
+        self.cpu_hold_time = 2
+        self.smart_wait_timeout = 60
+        self.launched_at = None
+
+    def launch_game(self, game_index):
+        self.launched_at = self.clock.now()
+        return True, ""
+
+def run_test():
+    print("Test: ring buffer keeps the newest samples in order...")
+    sampler = CpuSampler(read=lambda: 0.0, size=4)
+    for value in range(6):
+        sampler.add(value)
+    assert sampler.recent() == [2.0, 3.0, 4.0, 5.0], sampler.recent()
+    assert sampler.recent(2) == [4.0, 5.0]
+    assert sampler.percentile(50) == 4.0
+    assert sampler.percentile(100) == 5.0
+
+    print("Test: EWMA smooths a single spike...")
+    sampler = CpuSampler(read=lambda: 0.0, alpha=0.25)
+    for value in (10, 10, 90, 10):
+        sampler.add(value)
+    assert 10 < sampler.ewma < 40, sampler.ewma
+
+    print("Test: a brief dip does not launch, a sustained one does...")
+    # 0.5秒ごとに1サンプル: 高負荷 -> 一瞬の谷 -> 高負荷 -> 低負荷が続く
+    monitor = MockMonitor([95, 95, 0, 95, 95, 95] + [0] * 20)
+    monitor.cpu_sampler.alpha = 1.0
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    monitor.provider.exit_name("game1.exe")
+    monitor.run_for(4)
+    assert monitor.phase == Phase.SMART_WAIT, monitor.state
+    monitor.run_for(2)
+    assert monitor.launched_at is None, "should not launch on a single dip"
+    monitor.run_for(6)
+    assert monitor.state == (Phase.LAUNCHING, 1), monitor.state
+    assert monitor.launched_at is not None
+
+    print("Test: timeout still forces the launch...")
+    monitor = MockMonitor([95])
+    monitor.smart_wait_timeout = 5
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    monitor.provider.exit_name("game1.exe")
+    monitor.run_for(10)
+    assert monitor.state == (Phase.LAUNCHING, 1), monitor.state
+
+    monitor.stop()
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -1,14 +1,13 @@
-import time
-from core import GameMonitor, State
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
 import setup_ui
 
 class MockMonitor(GameMonitor):
     def __init__(self):
-        super().__init__(config_path="test_config.json")
-        self.running_procs = set()
+        super().__init__(config_path="test_config.json", provider=FakeProcessProvider(), clock=VirtualClock())
         self.launched = []
-        # テスト用: インターバルを最小値1秒に設定
-        # (0だとcore.pyのif launch_sleep_remaining > 0に入らず起動されない)
+        # テスト用: インターバルを1秒に設定
         self.launch_interval = 1
 
     def load_config(self):
@@ -17,40 +16,37 @@ class MockMonitor(GameMonitor):
             {"name": "App 2", "process_name": "app2.exe", "path": "path2"}
         ]
 
-    def is_process_running(self, process_name):
-        return process_name in self.running_procs
-
     def launch_game(self, game_index):
         if game_index < len(self.games):
             name = self.games[game_index]['process_name']
             self.launched.append(name)
             # テスト用: 起動と同時に「実行中」とみなす（誤検知を防ぐ）
-            self.running_procs.add(name)
+            self.provider.spawn(name)
             print(f"[Mock] Launched {name}")
 
 def run_test():
     monitor = MockMonitor()
-    monitor.start()
+    monitor.start(background=False)
 
     print("Test: Starting app 1...")
-    monitor.running_procs.add("app1.exe")
-    time.sleep(5)
-    assert monitor.state.value == 1, f"Expected 1, got {monitor.state.value}"
+    monitor.provider.spawn("app1.exe")
+    monitor.run_for(5)
+    assert monitor.cursor == 0, f"Expected 0, got {monitor.cursor}"
 
     print("Test: Closing app 1...")
-    monitor.running_procs.remove("app1.exe")
-    time.sleep(5)
-    assert monitor.state.value == 2, f"Expected 2, got {monitor.state.value}"
+    monitor.provider.exit_name("app1.exe")
+    monitor.run_for(5)
+    assert monitor.cursor == 1, f"Expected 1, got {monitor.cursor}"
     assert "app2.exe" in monitor.launched, "app2.exe should be launched"
 
-    monitor.running_procs.add("app2.exe")
-    time.sleep(5)
+    monitor.provider.spawn("app2.exe")
+    monitor.run_for(5)
     assert not monitor.waiting_for_launch
 
     print("Test: Closing app 2...")
-    monitor.running_procs.remove("app2.exe")
-    time.sleep(5)
-    assert monitor.state == State.STANDBY, f"Expected STANDBY, got {monitor.state}"
+    monitor.provider.exit_name("app2.exe")
+    monitor.run_for(5)
+    assert monitor.phase == Phase.STANDBY, f"Expected STANDBY, got {monitor.state}"
 
     print("Test passed!")
     monitor.stop()
@@ -0,0 +1,45 @@
+import time
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+
+class MockMonitor(GameMonitor):
+    def __init__(self):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider())
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 60
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+def run_test():
+    monitor = MockMonitor()
+    pid = monitor.provider.spawn("game1.exe")
+    monitor.start()
+
+    print("Test: the running game is pinned and waited on by a thread...")
+    assert wait_for(lambda: monitor.state == (Phase.PLAYING, 0)), monitor.state
+    assert monitor.tracked_pid == pid
+    assert monitor._exit_waiter is not None
+
+    print("Test: an exit is noticed without waiting for the next poll...")
+    # 次のポーリング (POLL_INTERVAL 秒後) を待たずに遷移すること
+    started = time.monotonic()
+    monitor.provider.exit(pid)
+    assert wait_for(lambda: monitor.phase != Phase.PLAYING, timeout=0.1), monitor.state
+    elapsed = time.monotonic() - started
+    assert monitor.state == (Phase.INTERVAL, 1), monitor.state
+    assert elapsed < 0.1 < monitor.POLL_INTERVAL, elapsed
+    monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,112 @@
+import os
+import time
+import sqlite3
+import tempfile
+from datetime import date, datetime, timedelta
+from core import GameMonitor, Phase
+from history import AVERAGE_DURATIONS, HistoryStore, routine_day
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+GAMES = ["Game 1", "Game 2", "Game 3", "Game 4", "Game 5"]
+
+class MockMonitor(GameMonitor):
+    def __init__(self, history_path):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.history_path = history_path
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"},
+            {"name": "Game 3", "process_name": "game3.exe", "path": "g3"}
+        ]
+        self.kill_targets = ["launcher.exe"]
+        self.kill_timeout = 0.1
+        self.launch_interval = 1
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def fill_years(store, today, years=3):
+    # 毎日5本のゲームを遊び、日課を完了した記録（途中に1日抜けがある）
+    for offset in range(365 * years, -1, -1):
+        day = today - timedelta(days=offset)
+        ts = datetime.combine(day, datetime.min.time()).timestamp() + 8 * 3600
+        for n, game in enumerate(GAMES):
+            store.record(ts + n, day.isoformat(), "デフォルト", "session", game, "exited", 600 + n * 60)
+        if offset != 10:
+            store.record(ts + 10, day.isoformat(), "デフォルト", "completion")
+    assert store.flush(30)
+
+def run_test():
+    print("Test: the routine day starts at the reset hour...")
+    assert routine_day(datetime(2024, 5, 2, 4, 59), 5) == "2024-05-01"
+    assert routine_day(datetime(2024, 5, 2, 5, 0), 5) == "2024-05-02"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Test: years of history are queried quickly...")
+        path = os.path.join(tmp, "history.db")
+        store = HistoryStore(path)
+        today = date(2024, 5, 2)
+        fill_years(store, today)
+        start = time.perf_counter()
+        averages = store.average_durations("デフォルト", today, days=30)
+        streak = store.completion_streak("デフォルト", today)
+        elapsed = time.perf_counter() - start
+        assert averages["Game 1"] == (600, 30) and averages["Game 5"] == (840, 30), averages
+        # スキップ・リセットされたプレイは平均に入れない
+        ts = datetime.combine(today, datetime.min.time()).timestamp() + 20 * 3600
+        store.record(ts, today.isoformat(), "デフォルト", "session", "Game 1", "skipped", 5)
+        store.record(ts + 1, today.isoformat(), "デフォルト", "session", "Game 1", "cancelled", 1)
+        store.record(ts + 2, today.isoformat(), "デフォルト", "session", "Game 1", "idle", 600)
+        assert store.flush()
+        assert store.average_durations("デフォルト", today, days=30)["Game 1"] == (600, 31)
+        assert streak == 10, streak
+        # 今日まだ完了していなければ昨日までで数える
+        assert store.completion_streak("デフォルト", today + timedelta(days=1)) == 10
+        assert store.completion_streak("デフォルト", today + timedelta(days=2)) == 0
+        assert elapsed < 0.1, f"queries took {elapsed * 1000:.1f} ms"
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            plan = " ".join(str(row) for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM events WHERE profile = ? AND game = ? AND day >= ?", ("a", "b", "c")))
+            assert "idx_events_profile_game_day" in plan, plan
+            plan = " ".join(str(row) for row in conn.execute("EXPLAIN QUERY PLAN " + AVERAGE_DURATIONS, ("a", "b")))
+            assert "COVERING INDEX idx_events_profile_kind_day" in plan, plan
+        store.close()
+
+        print("Test: the monitor records sessions, launches, skips, kills and completion...")
+        monitor = MockMonitor(os.path.join(tmp, "monitor.db"))
+        monitor.start(background=False)
+        provider = monitor.provider
+        provider.spawn("launcher.exe")
+        provider.spawn("game1.exe")
+        monitor.run_for(3)
+        monitor.run_for(60)
+        provider.exit_name("game1.exe")
+        monitor.run_for(8)
+        assert monitor.state == (Phase.PLAYING, 1), monitor.state
+        monitor.skip_current()
+        monitor.run_for(8)
+        provider.exit_name("game3.exe")
+        monitor.run_for(3)
+        assert monitor.phase == Phase.STANDBY, monitor.state
+        assert monitor.history.flush()
+
+        day = routine_day(monitor.clock.wall(), monitor.DAILY_RESET_HOUR)
+        sessions = monitor.history.events("デフォルト", "session", day)
+        assert [(s[1], s[3]) for s in sessions] == [("Game 1", "exited"), ("Game 2", "skipped"), ("Game 3", "exited")], sessions
+        assert 60 <= sessions[0][4] <= 66, sessions[0]
+        launches = monitor.history.events("デフォルト", "launch", day)
+        assert [(l[1], l[3], l[5]) for l in launches] == [("Game 2", "started", 1), ("Game 3", "started", 1)], launches
+        assert [(k[3], k[6]) for k in monitor.history.events("デフォルト", "kill", day)] == [("terminated", "launcher.exe")]
+        assert len(monitor.history.events("デフォルト", "skip", day)) == 1
+        assert monitor.completion_streak() == 1
+        assert set(monitor.average_durations()) == {"Game 1", "Game 3"}
+        monitor.stop()
+        assert monitor.history is None
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,105 @@
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2", "idle_seconds": 60}
+        ]
+        self.launch_interval = 1
+        self.idle_complete = True
+        self.idle_seconds = 30
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def add_activity(monitor, cpu_seconds, io_bytes):
+    pid = monitor.tracked_pid
+    cpu, io = monitor.provider.counters.get(pid, (0.0, 0))
+    monitor.provider.counters[pid] = (cpu + cpu_seconds, io + io_bytes)
+
+def run_test():
+    print("Test: a busy game is not completed...")
+    monitor = MockMonitor()
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+    for _ in range(6):
+        # 10秒ごとに CPU 5秒 (50%)
+        add_activity(monitor, 5, 0)
+        monitor.run_for(10)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+
+    print("Test: I/O alone keeps the game alive...")
+    for _ in range(6):
+        add_activity(monitor, 0, 10 * 1024 * 1024)
+        monitor.run_for(10)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+
+    print("Test: an idle game is terminated and the chain advances...")
+    pid = monitor.tracked_pid
+    while monitor.state != (Phase.PLAYING, 1):
+        assert monitor.clock.now() < 300, monitor.state
+        monitor.run_for(1)
+    assert pid in monitor.provider.terminated
+    assert "game1.exe" not in monitor.provider.running_names()
+
+    print("Test: the per-game idle period overrides the profile...")
+    monitor.run_for(50)
+    assert monitor.state == (Phase.PLAYING, 1), "Game 2 waits for 60s"
+    monitor.run_for(30)
+    assert monitor.phase == Phase.STANDBY, monitor.state
+    monitor.stop()
+
+    print("Test: a failed read does not stop the watch...")
+    monitor = MockMonitor()
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    read = monitor.provider.activity
+    failures = [2]
+    def flaky(pid):
+        if failures[0]:
+            failures[0] -= 1
+            return None
+        return read(pid)
+    monitor.provider.activity = flaky
+    for _ in range(3):
+        add_activity(monitor, 5, 0)
+        monitor.run_for(10)
+    assert failures[0] == 0 and monitor.state == (Phase.PLAYING, 0), monitor.state
+
+    print("Test: a new PID starts a new baseline...")
+    add_activity(monitor, 100, 0)
+    monitor.run_for(10)
+    monitor.provider.exit_name("game1.exe")
+    pid = monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    assert monitor.tracked_pid == pid
+    pinned = monitor.clock.now()
+    while monitor.state == (Phase.PLAYING, 0):
+        assert monitor.clock.now() < 300, monitor.state
+        monitor.run_for(1)
+    # 前のプロセスとの差分 (マイナス) を無操作として数えない
+    assert monitor.clock.now() - pinned >= 30, monitor.clock.now() - pinned
+    monitor.stop()
+
+    print("Test: nothing happens when the feature is off...")
+    monitor = MockMonitor()
+    monitor.idle_complete = False
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(200)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+    assert monitor.provider.terminated == []
+    monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
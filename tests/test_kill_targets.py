@@ -0,0 +1,29 @@
+from core import GameMonitor, compile_kill_targets
+from process_provider import FakeProcessProvider
+
+def run_test():
+    print("Test: display strings are compiled once...")
+    names = compile_kill_targets(["なし", "HoYoPlay (hoyoplay.exe)", "Steam (steam.exe)", "custom.exe", ""])
+    assert names == frozenset({"hoyoplay.exe", "steam.exe", "custom.exe"}), names
+
+    provider = FakeProcessProvider()
+    monitor = GameMonitor(config_path="config.json", provider=provider)
+    monitor.kill_targets = ["HoYoPlay (hoyoplay.exe)", "Steam (steam.exe)", "a.exe", "b.exe", "c.exe"]
+    monitor.kill_timeout = 0.1
+
+    polite = provider.spawn("HoYoPlay.exe")
+    stubborn = provider.spawn("steam.exe", stubborn=True)
+    extra = provider.spawn("c.exe")
+    other = provider.spawn("game.exe")
+
+    print("Test: terminate all, then kill survivors...")
+    report = {r["pid"]: r["result"] for r in monitor.kill_target_processes()}
+    assert report == {polite: "terminated", stubborn: "killed", extra: "terminated"}, report
+    assert provider.killed == [stubborn]
+    assert provider.running_names() == ["game.exe"]
+    assert other not in report
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
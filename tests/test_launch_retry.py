@@ -0,0 +1,92 @@
+from core import GameMonitor, Phase
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self, appear_on=None, fail=False):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"},
+            {"name": "Game 3", "process_name": "game3.exe", "path": "g3"}
+        ]
+        self.launch_interval = 1
+        self.launch_timeout = 10
+        self.launch_retries = 2
+        self.launch_retry_delay = 2
+        # 何回目の起動でプロセスが現れるか（None なら現れない: UAC の確認待ちなど）
+        self.appear_on = appear_on
+        self.fail = fail
+        self.attempts = []
+
+    def launch_game(self, game_index):
+        self.attempts.append((game_index, self.clock.now()))
+        if self.fail:
+            return False, "not found"
+        if game_index == 0 or len(self.attempts) == self.appear_on:
+            self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def start_routine(monitor):
+    monitor.start(background=False)
+    ok, _ = monitor.start_specific_game(0)
+    assert ok
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+    monitor.attempts.clear()
+    monitor.provider.exit_name("game1.exe")
+    monitor.run_for(4)
+    assert monitor.state == (Phase.LAUNCHING, 1), monitor.state
+
+def run_test():
+    print("Test: a launch that shows up on the second attempt is retried...")
+    monitor = MockMonitor(appear_on=2)
+    start_routine(monitor)
+    monitor.run_for(9)
+    assert len(monitor.attempts) == 1, "deadline has not passed yet"
+    monitor.run_for(8)
+    assert monitor.state == (Phase.PLAYING, 1), monitor.state
+    assert len(monitor.attempts) == 2
+    # 1回目の期限 (10秒) + 待ち時間 (2秒) の後に起動し直す
+    assert monitor.attempts[1][1] - monitor.attempts[0][1] == 12, monitor.attempts
+    last = monitor.launch_history[-1]
+    assert last["game"] == "Game 2" and last["result"] == "started" and last["attempts"] == 2, last
+    monitor.stop()
+
+    print("Test: retries back off exponentially, then the game is skipped...")
+    monitor = MockMonitor(appear_on=None)
+    start_routine(monitor)
+    monitor.run_for(60)
+    times = [t for _, t in monitor.attempts if _ == 1]
+    assert len(times) == 3, monitor.attempts
+    assert [b - a for a, b in zip(times, times[1:])] == [12, 14], times
+    assert monitor.cursor == 2, monitor.state
+    outcome = [e for e in monitor.launch_history if e["game"] == "Game 2"][0]
+    assert outcome["result"] == "timed_out" and outcome["attempts"] == 3, outcome
+    assert outcome["seconds"] == 36, outcome
+    assert "started" not in [e["result"] for e in monitor.launch_history if e["game"] == "Game 2"]
+    monitor.stop()
+
+    print("Test: a failed launch call is retried without waiting for the deadline...")
+    monitor = MockMonitor(fail=True)
+    monitor.start(background=False)
+    ok, _ = monitor.start_specific_game(1, chain_launch=False)
+    assert not ok
+    monitor.run_for(7)
+    assert len(monitor.attempts) == 3, monitor.attempts
+    assert monitor.phase == Phase.STANDBY, monitor.state
+    assert monitor.launch_history[-1]["result"] == "timed_out"
+    monitor.stop()
+
+    print("Test: a manual skip while waiting is recorded...")
+    monitor = MockMonitor(appear_on=None)
+    start_routine(monitor)
+    monitor.skip_current()
+    assert monitor.launch_history[-1]["result"] == "skipped"
+    assert monitor._launch_timer is None
+    monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,99 @@
+from core import GameMonitor, Phase
+from prewarm import MB
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+LAUNCHERS = {"hoyo": "hoyoplay.exe", "steam": "steam.exe", "epic": "epic.exe"}
+
+class MockMonitor(GameMonitor):
+    def __init__(self):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2",
+             "launcher_path": "hoyo", "launcher_process": "hoyoplay.exe"},
+            {"name": "Game 3", "process_name": "game3.exe", "path": "g3",
+             "launcher_path": "steam", "launcher_process": "steam.exe"},
+            {"name": "Game 4", "process_name": "game4.exe", "path": "g4",
+             "launcher_path": "epic", "launcher_process": "epic.exe"},
+        ]
+        self.kill_targets = ["HoYoPlay (hoyoplay.exe)", "Steam (steam.exe)", "epic.exe"]
+        self.kill_timeout = 0.1
+        self.launch_interval = 1
+        self.warm_launchers = "all"
+        self.launcher_rss = 100 * MB
+        self.warm_calls = []
+
+    def launch_launcher(self, index):
+        self.warm_calls.append(index)
+        pid = self.provider.spawn(LAUNCHERS[self.games[index]["launcher_path"]], rss=self.launcher_rss)
+        # ランチャーがアップデーターを子プロセスとして起動する
+        self.provider.spawn("updater.exe", parent=pid, rss=self.launcher_rss)
+        return pid
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def play_until(monitor, index):
+    monitor.provider.exit_name(f"game{index}.exe")
+    monitor.run_for(8)
+    assert monitor.state == (Phase.PLAYING, index), monitor.state
+
+def run_test():
+    print("Test: launchers are warmed up to the concurrency cap...")
+    monitor = MockMonitor()
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+    assert monitor.warm_calls == [1, 2], monitor.warm_calls
+    assert sorted(monitor.warmed) == [1, 2]
+
+    print("Test: kill targets spare the warmed launchers and their children...")
+    play_until(monitor, 1)
+    running = monitor.provider.running_names()
+    assert "hoyoplay.exe" in running and "steam.exe" in running, running
+    # Game 2 のランチャーの子プロセスも残っている (3つ目は Game 4 用に温めたもの)
+    assert running.count("updater.exe") == 3, running
+
+    print("Test: the next free slot is used once a game starts...")
+    # Game 2 がプレイ中になったので、そのランチャーは温め中に数えず Game 4 を温める
+    assert monitor.warm_calls == [1, 2, 3], monitor.warm_calls
+
+    print("Test: a launcher is killed once no upcoming game needs it...")
+    play_until(monitor, 2)
+    running = monitor.provider.running_names()
+    assert "hoyoplay.exe" not in running and "steam.exe" in running and "epic.exe" in running, running
+
+    play_until(monitor, 3)
+    monitor.provider.exit_name("game4.exe")
+    monitor.run_for(4)
+    assert monitor.phase == Phase.STANDBY
+    assert not {"hoyoplay.exe", "steam.exe", "epic.exe"} & set(monitor.provider.running_names())
+    assert monitor.warmed == {}
+    monitor.stop()
+
+    print("Test: the memory budget stops further warm-ups...")
+    monitor = MockMonitor()
+    monitor.warm_memory_mb = 150
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    # 1つ目 (ランチャー + アップデーターで 200MB) で予算を超えるので2つ目は起動しない
+    assert monitor.warm_calls == [1], monitor.warm_calls
+    monitor.stop()
+
+    print("Test: \"next\" only warms the following game...")
+    monitor = MockMonitor()
+    monitor.warm_launchers = "next"
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    assert monitor.warm_calls == [1], monitor.warm_calls
+    monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
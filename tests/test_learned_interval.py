@@ -0,0 +1,109 @@
+import os
+import json
+import tempfile
+from core import GameMonitor, Phase
+from cpu_sampler import CpuSampler
+from readiness import learned_interval
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class Values:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+class MockMonitor(GameMonitor):
+    def __init__(self, config_path):
+        self.cpu = Values(5)
+        self.disk = Values(0)
+        super().__init__(config_path=config_path, provider=FakeProcessProvider(), clock=VirtualClock(), samplers={
+            "cpu": CpuSampler(read=self.cpu),
+            "disk_io": CpuSampler(read=self.disk),
+        })
+        self.games = [
+            {"name": "Game A", "process_name": "a.exe", "path": "a"},
+            {"name": "Game B", "process_name": "b.exe", "path": "b"}
+        ]
+        self.launch_interval = 30
+        self.cpu_hold_time = 1
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def play_round(monitor, busy_seconds):
+    monitor.provider.spawn("a.exe")
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+    # 終了直後はしばらく高負荷が続く
+    monitor.cpu.value = 90
+    monitor.provider.exit_name("a.exe")
+    monitor.run_for(3 + busy_seconds)
+    monitor.cpu.value = 5
+    monitor.run_for(40)
+    assert monitor.state == (Phase.PLAYING, 1), monitor.state
+    monitor.provider.exit_name("b.exe")
+    monitor.run_for(3)
+    assert monitor.phase == Phase.STANDBY, monitor.state
+
+def run_test():
+    print("Test: learned interval is a clamped percentile...")
+    assert learned_interval([3, 4], 1, 60) is None
+    assert learned_interval([3, 4, 50], 1, 60) == 50
+    assert learned_interval([3, 4, 500], 1, 60) == 60
+    assert learned_interval([0.2, 0.2, 0.3], 1, 60) == 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, "config.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({"active_profile": "デフォルト", "profiles": {}}, f)
+
+        monitor = MockMonitor(config_path)
+        monitor.start(background=False)
+
+        print("Test: settle time is recorded for the next game...")
+        play_round(monitor, busy_seconds=4)
+        history = monitor.settle_history(1)
+        assert len(history) == 1 and 4 <= history[0] <= 9, history
+        assert monitor.interval_for(1) == 30, "adaptive interval is off"
+
+        print("Test: enough history switches to the learned interval...")
+        play_round(monitor, busy_seconds=4)
+        play_round(monitor, busy_seconds=4)
+        monitor.adaptive_interval = True
+        learned = monitor.interval_for(1)
+        assert 4 <= learned <= 9, learned
+
+        print("Test: a shorter interval is used on the next transition...")
+        monitor.provider.spawn("a.exe")
+        monitor.run_for(3)
+        monitor.provider.exit_name("a.exe")
+        monitor.run_for(3)
+        assert monitor.phase == Phase.INTERVAL and 0 < monitor.launch_sleep_remaining <= learned, monitor.launch_sleep_remaining
+
+        print("Test: history is persisted next to the config without touching it...")
+        with open(os.path.join(tmp, "learned.json"), encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["settle_times"]["デフォルト"]["Game B"] == monitor.settle_history(1)
+        with open(config_path, encoding="utf-8") as f:
+            assert json.load(f) == {"active_profile": "デフォルト", "profiles": {}}
+        monitor.stop()
+
+        print("Test: records in an old config are moved to learned.json...")
+        os.remove(os.path.join(tmp, "learned.json"))
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({"active_profile": "デフォルト", "profiles": {}, "settle_times": saved["settle_times"]}, f)
+        monitor = MockMonitor(config_path)
+        assert monitor.settle_history(1) == saved["settle_times"]["デフォルト"]["Game B"]
+        monitor.save_config()
+        with open(config_path, encoding="utf-8") as f:
+            assert "settle_times" not in json.load(f)
+        with open(os.path.join(tmp, "learned.json"), encoding="utf-8") as f:
+            assert json.load(f)["settle_times"] == saved["settle_times"]
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,98 @@
+import os
+import time
+import tempfile
+import threading
+from core import GameMonitor, Phase
+from log_watch import LogFollower, LogWatchRule
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+class MockMonitor(GameMonitor):
+    def __init__(self, log_path):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        log_watch = {"path": log_path, "loaded": r"World loaded", "done": r"Session ended", "error": r"FATAL"}
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1", "log_watch": log_watch},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 1
+        self.launch_retry_delay = 2
+        self.launches = 0
+
+    def launch_game(self, game_index):
+        # ランチャー経由なので、ゲーム本体のプロセスはしばらく見つからない
+        self.launches += 1
+        return True, ""
+
+def run_test():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "game.log")
+        append(path, "old session\n")
+
+        print("Test: only lines appended after start are read...")
+        follower = LogFollower(path, use_inotify=False)
+        assert follower.check() == []
+        append(path, "first\nsecond\npart")
+        assert follower.check() == ["first", "second"]
+        append(path, "ial\r\n")
+        assert follower.check() == ["partial"]
+
+        print("Test: rotation and truncation start over from the top...")
+        os.rename(path, path + ".1")
+        append(path, "new file\n")
+        assert follower.check() == ["new file"]
+        assert follower.rotations == 1
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("x\n")
+        assert follower.check() == ["x"]
+
+        print("Test: rules classify lines, errors first...")
+        rule = LogWatchRule({"path": path, "loaded": "loaded", "done": "ended", "error": "FATAL"})
+        assert rule.classify("[info] world loaded") == "loaded"
+        assert rule.classify("FATAL: session ended") == "error"
+        assert rule.classify("nothing") is None
+
+        print("Test: the threaded follower wakes up on appended lines...")
+        lines = []
+        got = threading.Event()
+        follower = LogFollower(path, on_line=lambda line: (lines.append(line), got.set()), poll_interval=0.2)
+        follower.start()
+        time.sleep(0.1)
+        append(path, "hello\n")
+        assert got.wait(3), "follower did not pick up the line"
+        follower.stop()
+        assert lines == ["hello"], lines
+
+        print("Test: an error line retries the launch...")
+        monitor = MockMonitor(path)
+        monitor.start(background=False)
+        monitor.start_specific_game(0)
+        assert monitor.state == (Phase.LAUNCHING, 0), monitor.state
+        append(path, "FATAL could not connect\n")
+        monitor.run_for(6)
+        assert monitor.launches == 2, monitor.launches
+
+        print("Test: a loaded line moves to playing before the process is seen...")
+        append(path, "World loaded in 12.3s\n")
+        monitor.run_for(4)
+        assert monitor.state == (Phase.PLAYING, 0), monitor.state
+        assert [e["kind"] for e in monitor.log_events] == ["error", "loaded"]
+
+        print("Test: a done line advances without waiting for the process to exit...")
+        monitor.provider.spawn("game1.exe")
+        monitor.run_for(4)
+        append(path, "Session ended\n")
+        monitor.run_for(4)
+        assert "game1.exe" not in monitor.provider.running_names()
+        assert monitor.cursor == 1, monitor.state
+        assert monitor._log_follower is None
+        monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
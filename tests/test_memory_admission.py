@@ -0,0 +1,105 @@
+from core import GameMonitor, Phase
+from prewarm import MB
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class Values:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+class MockMonitor(GameMonitor):
+    def __init__(self):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = [
+            {"name": "Game A", "process_name": "a.exe", "path": "a"},
+            {"name": "Game B", "process_name": "b.exe", "path": "b"}
+        ]
+        self.launch_interval = 1
+        self.memory_admission = True
+        self.memory_margin_mb = 1000
+        self.memory_timeout = 30
+        self.memory_available = Values(16000)
+        self.launched = []
+
+    def launch_game(self, game_index):
+        self.launched.append((game_index, self.clock.now()))
+        self.provider.spawn(self.games[game_index]["process_name"], rss=6000 * MB)
+        return True, ""
+
+def play_round(monitor):
+    monitor.start_specific_game(0)
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 0), monitor.state
+    monitor.provider.exit_name("a.exe")
+
+def run_test():
+    print("Test: the peak RSS of the pinned process is recorded...")
+    monitor = MockMonitor()
+    monitor.start(background=False)
+    monitor.start_specific_game(1, chain_launch=False)
+    monitor.run_for(3)
+    pid = monitor.tracked_pid
+    monitor.provider.memory[pid] = 9000 * MB
+    monitor.run_for(10)
+    monitor.provider.memory[pid] = 7000 * MB
+    monitor.run_for(10)
+    monitor.provider.exit_name("b.exe")
+    monitor.run_for(3)
+    assert monitor.peak_rss_history(1) == [9000], monitor.peak_rss_history(1)
+    assert monitor.memory_needed_mb(1) == 10000
+
+    print("Test: the launch waits until the learned peak fits...")
+    monitor.memory_available.value = 4000
+    play_round(monitor)
+    monitor.launched.clear()
+    monitor.run_for(10)
+    assert monitor.state == (Phase.SMART_WAIT, 1), monitor.state
+    assert monitor.launched == []
+    monitor.memory_available.value = 12000
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 1), monitor.state
+    assert len(monitor.launched) == 1
+
+    print("Test: the wait gives up after the timeout...")
+    monitor.provider.exit_name("b.exe")
+    monitor.run_for(3)
+    monitor.memory_available.value = 4000
+    play_round(monitor)
+    monitor.launched.clear()
+    monitor.run_for(25)
+    assert monitor.launched == []
+    monitor.run_for(15)
+    assert monitor.launched and monitor.launched[0][0] == 1, monitor.launched
+
+    print("Test: a failing memory read does not stop the monitor...")
+    def broken():
+        raise OSError("temporarily unavailable")
+    monitor.provider.exit_name("b.exe")
+    monitor.run_for(3)
+    monitor.memory_available = broken
+    play_round(monitor)
+    monitor.launched.clear()
+    monitor.run_for(10)
+    assert monitor.state == (Phase.SMART_WAIT, 1), monitor.state
+    # 手動で起動したゲームは引き続き検出される
+    monitor.provider.spawn("b.exe")
+    monitor.run_for(3)
+    assert monitor.state == (Phase.PLAYING, 1), monitor.state
+
+    print("Test: games without a record launch right away...")
+    monitor.stop()
+    monitor = MockMonitor()
+    monitor.memory_available.value = 100
+    monitor.start(background=False)
+    play_round(monitor)
+    monitor.run_for(8)
+    assert monitor.state == (Phase.PLAYING, 1), monitor.state
+    monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,85 @@
+import os
+import time
+import tempfile
+from core import GameMonitor, Phase
+from prewarm import Prewarmer, MB
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self, games):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = games
+        self.launch_interval = 10
+        self.prewarm_enabled = True
+        self.prewarm_rate_mb = 0
+
+    def launch_game(self, game_index):
+        return True, ""
+
+def write_file(path, size):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+
+def run_test():
+    with tempfile.TemporaryDirectory() as tmp:
+        exe = os.path.join(tmp, "game.exe")
+        assets = os.path.join(tmp, "assets")
+        os.makedirs(os.path.join(assets, "sub"))
+        write_file(exe, 3 * MB + 123)
+        write_file(os.path.join(assets, "a.pak"), 2 * MB)
+        write_file(os.path.join(assets, "sub", "b.pak"), MB // 2)
+
+        for use_fadvise in (True, False):
+            print(f"Test: warms files and directories (fadvise={use_fadvise})...")
+            warmer = Prewarmer([exe, assets, os.path.join(tmp, "missing")], rate=None, use_fadvise=use_fadvise)
+            warmer.run()
+            report = warmer.report()
+            assert report["bytes"] == 3 * MB + 123 + 2 * MB + MB // 2, report
+            assert report["files"] == 3 and not report["cancelled"], report
+
+        print("Test: max_bytes caps the amount read...")
+        warmer = Prewarmer([exe, assets], rate=None, max_bytes=4 * MB, use_fadvise=False)
+        warmer.run()
+        assert warmer.bytes_warmed == 4 * MB, warmer.bytes_warmed
+
+        print("Test: the rate limit spaces out the reads...")
+        warmer = Prewarmer([exe], rate=10 * MB, use_fadvise=False)
+        started = time.monotonic()
+        warmer.run()
+        assert time.monotonic() - started >= 0.25
+
+        print("Test: cancel stops a slow warm-up promptly...")
+        warmer = Prewarmer([exe, assets], rate=MB, use_fadvise=False)
+        warmer.start()
+        time.sleep(0.1)
+        started = time.monotonic()
+        warmer.cancel()
+        warmer.join(1)
+        assert warmer.done and warmer.report()["cancelled"]
+        assert time.monotonic() - started < 0.5
+        assert warmer.bytes_warmed < 3 * MB
+
+        print("Test: the monitor prewarms the next game during the interval...")
+        monitor = MockMonitor([
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": exe, "prewarm_paths": [assets]}
+        ])
+        monitor.start(background=False)
+        monitor.provider.spawn("game1.exe")
+        monitor.run_for(3)
+        monitor.provider.exit_name("game1.exe")
+        monitor.run_for(3)
+        assert monitor.phase == Phase.INTERVAL
+        prewarmer = monitor._prewarmer
+        prewarmer.join(5)
+        assert monitor.last_prewarm["game"] == "Game 2"
+        assert monitor.last_prewarm["bytes"] == 3 * MB + 123 + 2 * MB + MB // 2, monitor.last_prewarm
+        monitor.run_for(10)
+        assert monitor.state == (Phase.LAUNCHING, 1) and monitor._prewarmer is None
+        monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
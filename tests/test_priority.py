@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import subprocess
+from core import GameMonitor, Phase
+from priority import PriorityManager, RestoreJournal, PRIORITY_LEVELS
+from process_provider import FakeProcessProvider, ProcfsProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self, journal_path, provider=None):
+        super().__init__(config_path="config.json", provider=provider or FakeProcessProvider(), clock=VirtualClock())
+        self.journal_path = journal_path
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2", "priority": "normal"}
+        ]
+        self.launch_interval = 1
+        self.background_policy = [{"process": "discord.exe, chrome.exe", "priority": "idle", "affinity": [0]}]
+        self.game_priority = "high"
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def check_linux(tmp):
+    print("Test: nice and affinity are changed and restored on Linux...")
+    provider = ProcfsProcessProvider()
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        pid = child.pid
+        create_time = provider.create_time(pid)
+        before = (provider.get_priority(pid), provider.get_affinity(pid))
+        path = os.path.join(tmp, "journal.json")
+        manager = PriorityManager(provider, RestoreJournal(path))
+        assert manager.apply(pid, create_time, "sleep", "below_normal", [0])
+        assert os.getpriority(os.PRIO_PROCESS, pid) == PRIORITY_LEVELS["below_normal"]
+        if (os.cpu_count() or 1) > 1:
+            assert os.sched_getaffinity(pid) == {0}
+        assert os.path.exists(path)
+
+        # クラッシュしたことにして、新しいインスタンスがジャーナルから戻す
+        manager = PriorityManager(provider, RestoreJournal(path))
+        assert manager.restore() == 1
+        assert provider.get_affinity(pid) == before[1]
+        if os.geteuid() == 0:
+            # nice を下げ戻すには権限が要る
+            assert provider.get_priority(pid) == before[0]
+        assert not os.path.exists(path)
+    finally:
+        child.kill()
+        child.wait()
+
+def run_test():
+    with tempfile.TemporaryDirectory() as tmp:
+        if sys.platform.startswith("linux"):
+            check_linux(tmp)
+
+        print("Test: a batch is journaled with one write before anything is changed...")
+        provider = FakeProcessProvider()
+        journal = RestoreJournal(os.path.join(tmp, "batch.json"))
+        saves = []
+        save = journal.save
+        journal.save = lambda: saves.append(len(journal.entries)) or save()
+        pids = [provider.spawn("Discord.exe") for _ in range(30)]
+        change = provider.set_priority
+        def set_priority(pid, value):
+            # 変更する時点ですべて記録済み
+            assert saves == [30], saves
+            return change(pid, value)
+        provider.set_priority = set_priority
+        manager = PriorityManager(provider, journal)
+        targets = [(pid, provider.create_time(pid), "Discord.exe", "idle", None) for pid in pids]
+        assert manager.apply_all(targets) == 30
+        assert saves == [30] and all(provider.priorities[pid] == PRIORITY_LEVELS["idle"] for pid in pids)
+        assert manager.restore() == 30
+
+        print("Test: background apps are de-prioritized only while a game is played...")
+        journal_path = os.path.join(tmp, "restore_journal.json")
+        monitor = MockMonitor(journal_path)
+        provider = monitor.provider
+        discord = provider.spawn("Discord.exe")
+        other = provider.spawn("explorer.exe")
+        monitor.start(background=False)
+        game = provider.spawn("game1.exe")
+        monitor.run_for(3)
+        assert monitor.state == (Phase.PLAYING, 0), monitor.state
+        assert provider.priorities[discord] == PRIORITY_LEVELS["idle"]
+        assert provider.priorities[game] == PRIORITY_LEVELS["high"]
+        assert other not in provider.priorities
+        if (os.cpu_count() or 1) > 1:
+            assert provider.affinities[discord] == [0]
+        assert os.path.exists(journal_path)
+
+        print("Test: everything is restored on the transition...")
+        provider.exit_name("game1.exe")
+        monitor.run_for(3)
+        assert provider.priorities[discord] == 0
+        assert provider.get_affinity(discord) == list(range(os.cpu_count() or 1))
+        assert not os.path.exists(journal_path)
+
+        print("Test: the per-game priority overrides the profile...")
+        monitor.run_for(8)
+        assert monitor.state == (Phase.PLAYING, 1), monitor.state
+        assert provider.priorities[discord] == PRIORITY_LEVELS["idle"]
+        assert provider.priorities.get(monitor.tracked_pid, 0) == 0
+
+        print("Test: a crash is recovered on the next start...")
+        # stop() せずに監視を捨て、同じプロセス一覧で新しい監視を開始する
+        assert os.path.exists(journal_path)
+        monitor = MockMonitor(journal_path, provider=provider)
+        monitor.background_policy = []
+        monitor.start(background=False)
+        assert provider.priorities[discord] == 0
+        assert not os.path.exists(journal_path)
+        monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,46 @@
+from process_matcher import ProcessMatcher, game_patterns, split_patterns
+
+def run_test():
+    print("Test: splitting process_name / process_names...")
+    assert split_patterns("Launcher.exe, Game*.exe") == ["Launcher.exe", "Game*.exe"]
+    assert split_patterns("re:^game(64|32)?\\.exe$") == ["re:^game(64|32)?\\.exe$"]
+    game = {"process_name": "Stub.exe", "process_names": ["Client-*.exe", "re:crash_?handler\\.exe"]}
+    assert game_patterns(game) == ["Stub.exe", "Client-*.exe", "re:crash_?handler\\.exe"]
+
+    matcher = ProcessMatcher({
+        ("game", 0): game_patterns(game),
+        ("game", 1): ["Other.exe"],
+        "kill": ["hoyoplay.exe", "steam*.exe"],
+    })
+
+    print("Test: literals, globs and regexes are case-insensitive...")
+    assert matcher.match("stub.EXE") == {("game", 0)}
+    assert matcher.match("Client-Win64.exe") == {("game", 0)}
+    assert matcher.match("CrashHandler.exe") == {("game", 0)}
+    assert matcher.match("HoYoPlay.exe") == {"kill"}
+    assert matcher.match("steamwebhelper.exe") == {"kill"}
+    assert matcher.match("explorer.exe") == frozenset()
+
+    print("Test: regexes must match the whole name...")
+    assert ProcessMatcher({"g": ["re:Game"]}).match("GameLauncher.exe") == frozenset()
+    assert ProcessMatcher({"g": ["re:Game.*"]}).match("GameLauncher.exe") == {"g"}
+
+    print("Test: regexes that cannot be combined are matched one by one...")
+    odd = ProcessMatcher({
+        ("game", 0): ["re:(?i)game.*", "re:(?P<n>a)1\\.exe"],
+        ("game", 1): ["re:(?P<n>b)2\\.exe", "Other*.exe"],
+    })
+    assert odd.combined is None
+    assert odd.match("Game64.exe") == {("game", 0)}
+    assert odd.match("b2.exe") == {("game", 1)}
+    assert odd.match("Other1.exe") == {("game", 1)}
+    assert odd.match("explorer.exe") == frozenset()
+
+    print("Test: one pass builds the key index...")
+    index = matcher.index([(1, "Stub.exe"), (2, "Client-1.exe"), (3, "steam.exe"), (4, "explorer.exe"), (5, "Other.exe")])
+    assert index == {("game", 0): [1, 2], "kill": [3], ("game", 1): [5]}, index
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
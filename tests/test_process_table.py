@@ -0,0 +1,65 @@
+import os
+from process_provider import FakeProcessProvider, ProcfsProcessProvider, ProcessTable
+
+class CountingProvider(FakeProcessProvider):
+    def __init__(self):
+        super().__init__()
+        self.describe_calls = 0
+
+    def describe(self, pid):
+        self.describe_calls += 1
+        return super().describe(pid)
+
+def run_test():
+    provider = CountingProvider()
+    for i in range(400):
+        provider.spawn(f"proc{i}.exe")
+    table = ProcessTable(provider)
+
+    print("Test: first refresh describes every PID...")
+    assert len(table.refresh()) == 400
+    assert provider.describe_calls == 400
+
+    print("Test: steady state does not describe anything...")
+    table.refresh()
+    assert provider.describe_calls == 400
+    assert table.hits == 400
+
+    print("Test: churn only describes new PIDs...")
+    provider.exit_name("proc0.exe")
+    provider.exit_name("proc1.exe")
+    new_pid = provider.spawn("game.exe")
+    processes = dict(table.refresh())
+    assert provider.describe_calls == 401
+    assert processes[new_pid] == "game.exe"
+    assert len(processes) == 399
+    stats = table.stats()
+    assert stats["misses"] == 401 and stats["dropped"] == 2, stats
+
+    print("Test: a reused PID is described again...")
+    reused = min(table.entries)
+    provider.exit(reused)
+    provider.spawn("game1.exe", pid=reused)
+    processes = dict(table.refresh())
+    assert processes[reused] == "game1.exe", processes[reused]
+    assert provider.describe_calls == 402
+    assert table.create_time(reused) == provider.describe(reused)[1]
+    assert table.stats()["reused"] == 1
+
+    if os.path.isdir("/proc"):
+        print("Test: procfs steady state reads no per-process files...")
+        procfs = ProcfsProcessProvider()
+        table = ProcessTable(procfs)
+        table.refresh()
+        misses = table.misses
+        reads = []
+        procfs._read_stat = lambda pid: reads.append(pid)
+        procfs._read_comm = lambda pid: reads.append(pid)
+        table.refresh()
+        # 間に起動したプロセス (comm と stat) の分だけ読む
+        assert table.misses - misses <= 5 and len(reads) == 2 * (table.misses - misses), reads
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
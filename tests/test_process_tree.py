@@ -0,0 +1,37 @@
+from core import GameMonitor
+from process_provider import FakeProcessProvider
+
+class MockMonitor(GameMonitor):
+    def __init__(self):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider())
+        self.games = [{"name": "Game", "process_name": "game.exe", "path": "g", "kill_tree": True}]
+        self.kill_timeout = 0.1
+
+    def launch_game(self, game_index):
+        # ランチャー -> ゲーム本体 の順に起動されるケースを再現
+        self.launched_pid = self.provider.spawn("launcher.exe")
+        return True, ""
+
+def run_test():
+    monitor = MockMonitor()
+    provider = monitor.provider
+    stale = provider.spawn("game.exe")
+
+    monitor.launch_game(0)
+    game = provider.spawn("game.exe", parent=provider.spawn("bootstrap.exe", parent=monitor.launched_pid))
+    helper = provider.spawn("webhelper.exe", parent=game)
+
+    print("Test: the launched process's descendant wins over an unrelated match...")
+    assert monitor.find_launched_game(0) == game
+    assert monitor.pin_game_process(0)
+    assert monitor.tracked_pid == game and monitor.tracked_pid != stale
+
+    print("Test: killing the game takes down its subtree...")
+    report = {r["pid"]: r["result"] for r in monitor.terminate_game(0)}
+    assert report == {game: "terminated", helper: "terminated"}, report
+    assert sorted(provider.running_names()) == ["bootstrap.exe", "game.exe", "launcher.exe"]
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
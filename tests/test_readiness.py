@@ -0,0 +1,128 @@
+from core import GameMonitor, Phase
+from cpu_sampler import CpuSampler
+from collections import namedtuple
+import readiness
+from readiness import CpuPercent, RateCounter, ReadinessGate
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class Values:
+    """テストから値を書き換えられる読み取り関数"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+class MockMonitor(GameMonitor):
+    def __init__(self):
+        self.cpu = Values(5)
+        self.disk = Values(200)
+        self.memory = Values(8192)
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock(), samplers={
+            "cpu": CpuSampler(read=self.cpu, alpha=1.0),
+            "disk_io": CpuSampler(read=self.disk, alpha=1.0),
+            "memory": CpuSampler(read=self.memory, alpha=1.0),
+        })
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 0
+        self.smart_wait_enabled = True
+        self.cpu_hold_time = 1
+        self.readiness = {"signals": {
+            "disk_io": {"threshold": 50, "weight": 1},
+            "memory": {"threshold": 4096, "weight": 1},
+        }}
+        self.launched = False
+
+    def launch_game(self, game_index):
+        self.launched = True
+        return True, ""
+
+def run_test():
+    print("Test: RateCounter converts a byte counter into MB/s...")
+    now = [0.0]
+    total = [0]
+    rate = RateCounter(lambda: total[0], clock=lambda: now[0])
+    assert rate() == 0.0
+    now[0], total[0] = 2.0, 20 * 1024 * 1024
+    assert rate() == 10.0
+
+    print("Test: fresh readers keep their own baseline...")
+    other = rate.fresh()
+    assert other() == 0.0
+    now[0], total[0] = 4.0, 40 * 1024 * 1024
+    assert rate() == 10.0 and other() == 10.0
+    now[0] = 4.5
+    assert rate() == 0.0
+    now[0], total[0] = 6.0, 60 * 1024 * 1024
+    assert other() == 10.0
+
+    print("Test: our own reads (prewarm) are not counted as disk load...")
+    Disk = namedtuple("Disk", "read_bytes write_bytes")
+    disk = [Disk(100 * 1024 * 1024, 0)]
+    own = [30 * 1024 * 1024]
+    original = readiness.psutil.disk_io_counters, readiness.own_read_bytes
+    readiness.psutil.disk_io_counters = lambda: disk[0]
+    readiness.own_read_bytes = lambda: own[0]
+    try:
+        now = [0.0]
+        rate = RateCounter(readiness.disk_io_total, clock=lambda: now[0])
+        assert rate() == 0.0
+        # 1秒で 40MB 読まれたうち 30MB は自分の先読み
+        now[0], own[0] = 1.0, 60 * 1024 * 1024
+        disk[0] = Disk(140 * 1024 * 1024, 0)
+        assert abs(rate() - 10.0) < 1e-6
+    finally:
+        readiness.psutil.disk_io_counters, readiness.own_read_bytes = original
+    assert readiness.own_read_bytes() >= 0
+
+    print("Test: CpuPercent uses cpu_times deltas...")
+    Times = namedtuple("Times", "user system idle")
+    times = [Times(0, 0, 0)]
+    cpu = CpuPercent(read_times=lambda: times[0])
+    probe = cpu.fresh()
+    assert cpu() == 0.0 and probe() == 0.0
+    times[0] = Times(30, 10, 60)
+    assert abs(cpu() - 40.0) < 1e-6
+    times[0] = Times(30, 10, 160)
+    assert cpu() == 0.0 and abs(probe() - 20.0) < 1e-6
+
+    print("Test: score is the weighted share of satisfied signals...")
+    samplers = {name: CpuSampler(read=lambda: 0.0) for name in ("cpu", "disk_io", "memory")}
+    gate = ReadinessGate([("cpu", 30, 1), ("disk_io", 50, 2), ("memory", 4096, 1)], samplers, min_score=0.75)
+    assert gate.evaluate()[0] is None, "no samples yet"
+    samplers["cpu"].add(10)
+    samplers["disk_io"].add(80)
+    samplers["memory"].add(8000)
+    score, values = gate.evaluate()
+    assert score == 0.5 and not gate.is_ready(score), score
+    samplers["disk_io"].alpha = 1.0
+    samplers["disk_io"].add(10)
+    samplers["memory"].alpha = 1.0
+    samplers["memory"].add(1000)
+    score, _ = gate.evaluate()
+    assert score == 0.75 and gate.is_ready(score), score
+
+    print("Test: Smart Wait holds the launch while the disk is busy...")
+    monitor = MockMonitor()
+    monitor.start(background=False)
+    monitor.provider.spawn("game1.exe")
+    monitor.run_for(3)
+    monitor.provider.exit_name("game1.exe")
+    monitor.run_for(10)
+    assert monitor.phase == Phase.SMART_WAIT and not monitor.launched, monitor.state
+
+    monitor.disk.value = 5
+    monitor.run_for(3)
+    assert monitor.state == (Phase.LAUNCHING, 1), monitor.state
+    assert monitor.launched
+
+    monitor.stop()
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
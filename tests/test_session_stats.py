@@ -0,0 +1,77 @@
+import os
+import tempfile
+from core import GameMonitor, Phase
+from prewarm import MB
+from session_stats import SessionSeries
+from process_provider import FakeProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self, stats_dir):
+        super().__init__(config_path="config.json", provider=FakeProcessProvider(), clock=VirtualClock())
+        self.games = [
+            {"name": "Game: One", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 1
+        self.session_stats = True
+        self.stats_interval = 1
+        self.stats_buckets = 8
+        self.stats_dir = stats_dir
+
+def run_test():
+    print("Test: buckets are merged so memory stays bounded...")
+    series = SessionSeries(buckets=4)
+    for value in range(1, 101):
+        series.add(value, value * 2, 0, 1)
+    assert series.length <= 4 and series.samples == 100
+    assert series.span == 32, series.span
+    assert sum(series.counts[:series.length]) == 100
+    lo, hi, mean = series.summary()["cpu"]
+    assert (lo, hi) == (1, 100) and abs(mean - 50.5) < 0.01, (lo, hi, mean)
+    assert series.column("rss_mb", "max")[-1] == 200
+    assert len(series.mins[0]) == 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Test: the compact file round-trips...")
+        path = os.path.join(tmp, "s.dgls")
+        series.save(path, game="x")
+        header, loaded = SessionSeries.load(path)
+        assert header["game"] == "x" and header["samples"] == 100
+        assert loaded.column("cpu", "min") == series.column("cpu", "min")
+        assert loaded.summary() == series.summary()
+        assert os.path.getsize(path) < 400, os.path.getsize(path)
+
+        print("Test: a played session is sampled and written on exit...")
+        monitor = MockMonitor(os.path.join(tmp, "sessions"))
+        monitor.start(background=False)
+        provider = monitor.provider
+        provider.spawn("game1.exe", rss=500 * MB)
+        monitor.run_for(3)
+        assert monitor.state == (Phase.PLAYING, 0), monitor.state
+        pid = monitor.tracked_pid
+        provider.threads[pid] = 12
+        read = provider.activity
+        for second in range(1, 61):
+            # 毎秒 CPU 0.25秒 (25%) と 100KB の I/O。途中で一度だけ読めない時間がある
+            provider.counters[pid] = (second * 0.25, second * 100 * 1024)
+            provider.activity = (lambda pid: None) if 20 <= second < 23 else read
+            monitor.run_for(1)
+        provider.exit_name("game1.exe")
+        monitor.run_for(3)
+        path = monitor.last_session_file
+        assert path and os.path.basename(path).endswith("_Game__One.dgls"), path
+        header, loaded = SessionSeries.load(path)
+        assert header["game"] == "Game: One" and loaded.length <= 8
+        # 読めなかった回を飛ばしてプレイの最後まで記録する
+        assert header["samples"] >= 25, header["samples"]
+        cpu = loaded.summary()["cpu"]
+        assert 20 <= cpu[2] <= 30, cpu
+        assert loaded.summary()["rss_mb"][1] == 500
+        assert loaded.summary()["threads"][1] == 12
+        monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from core import GameMonitor, Phase
+from priority import RestoreJournal
+from suspend import SuspendManager
+from process_provider import FakeProcessProvider, ProcfsProcessProvider
+from scheduler import VirtualClock
+
+class MockMonitor(GameMonitor):
+    def __init__(self, journal_path, provider=None):
+        super().__init__(config_path="config.json", provider=provider or FakeProcessProvider(), clock=VirtualClock())
+        self.journal_path = journal_path
+        self.games = [
+            {"name": "Game 1", "process_name": "game1.exe", "path": "g1"},
+            {"name": "Game 2", "process_name": "game2.exe", "path": "g2"}
+        ]
+        self.launch_interval = 1
+        self.suspend_list = "OneDrive.exe, chrome.exe"
+
+    def launch_game(self, game_index):
+        self.provider.spawn(self.games[game_index]["process_name"])
+        return True, ""
+
+def proc_state(pid):
+    with open(f"/proc/{pid}/stat", "rb") as f:
+        data = f.read()
+    return data[data.rfind(b")") + 2:].split()[0]
+
+def check_linux(tmp):
+    print("Test: a real process is stopped and continued...")
+    provider = ProcfsProcessProvider()
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        time.sleep(0.2)
+        path = os.path.join(tmp, "journal.json")
+        manager = SuspendManager(provider, RestoreJournal(path))
+        assert manager.suspend(child.pid, provider.create_time(child.pid), "sleep")
+        time.sleep(0.1)
+        assert proc_state(child.pid) == b"T", proc_state(child.pid)
+        # クラッシュしたことにして、記録から再開する
+        manager = SuspendManager(provider, RestoreJournal(path))
+        assert manager.resume_all() == 1
+        time.sleep(0.1)
+        assert proc_state(child.pid) == b"S", proc_state(child.pid)
+        assert not os.path.exists(path)
+    finally:
+        child.kill()
+        child.wait()
+
+def run_test():
+    with tempfile.TemporaryDirectory() as tmp:
+        if sys.platform.startswith("linux"):
+            check_linux(tmp)
+
+        print("Test: a batch is journaled with one write before anything is stopped...")
+        provider = FakeProcessProvider()
+        journal = RestoreJournal(os.path.join(tmp, "batch.json"))
+        saves = []
+        save = journal.save
+        journal.save = lambda: saves.append(len(journal.entries)) or save()
+        pids = [provider.spawn("chrome.exe") for _ in range(30)]
+        stop = provider.suspend
+        def suspend(pid):
+            # 停止する時点ですべて記録済み
+            assert saves == [30], saves
+            return stop(pid)
+        provider.suspend = suspend
+        manager = SuspendManager(provider, journal)
+        assert manager.suspend_all([(pid, provider.create_time(pid), "chrome.exe") for pid in pids]) == 30
+        assert saves == [30] and provider.suspended == set(pids)
+        assert manager.resume_all() == 30
+
+        print("Test: listed apps are suspended while a game is tracked...")
+        journal_path = os.path.join(tmp, "restore_journal.json")
+        monitor = MockMonitor(journal_path)
+        provider = monitor.provider
+        onedrive = provider.spawn("OneDrive.exe")
+        chrome = provider.spawn("chrome.exe")
+        monitor.start(background=False)
+        game = provider.spawn("game1.exe")
+        # ゲームが内蔵ブラウザとして起動したものは止めない
+        embedded = provider.spawn("chrome.exe", parent=game)
+        monitor.run_for(3)
+        assert monitor.state == (Phase.PLAYING, 0), monitor.state
+        assert provider.suspended == {onedrive, chrome}, provider.suspended
+        assert os.path.exists(journal_path)
+
+        print("Test: they are resumed when the game exits...")
+        provider.exit(embedded)
+        provider.exit_name("game1.exe")
+        monitor.run_for(3)
+        assert provider.suspended == set()
+        assert not os.path.exists(journal_path)
+
+        print("Test: they are resumed on skip and reset...")
+        monitor.run_for(8)
+        assert monitor.state == (Phase.PLAYING, 1), monitor.state
+        assert provider.suspended == {onedrive, chrome}
+        monitor.skip_current()
+        assert provider.suspended == set()
+        monitor.start_specific_game(0)
+        monitor.run_for(3)
+        assert provider.suspended == {onedrive, chrome}
+        monitor.reset_state()
+        assert provider.suspended == set()
+
+        print("Test: a crash is recovered on the next start...")
+        monitor.start_specific_game(0)
+        monitor.run_for(3)
+        assert provider.suspended == {onedrive, chrome}
+        monitor = MockMonitor(journal_path, provider=provider)
+        monitor.start(background=False)
+        assert provider.suspended == set()
+        assert not os.path.exists(journal_path)
+        monitor.stop()
+
+    print("Test passed!")
+
+if __name__ == '__main__':
+    run_test()